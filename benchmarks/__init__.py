@@ -0,0 +1 @@
+"""Performance benchmarks for RainToday (not collected by pytest)."""
@@ -0,0 +1,84 @@
+"""Compare sync threadpool endpoints against the async pooled upstream client.
+
+Both variants serve ``/rain``-style requests against a local stub upstream with
+fixed latency. The sync variant reproduces the previous design (``def``
+endpoint, module-level ``requests.get``); the async variant awaits the shared
+``httpx.AsyncClient``.
+
+Run with::
+
+    python -m benchmarks.bench_async_upstream --requests 1000 --concurrency 200
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from typing import Any, Dict, Tuple
+
+import httpx
+from fastapi import FastAPI
+
+from benchmarks.stub_upstream import StubUpstream, UpstreamBehavior
+from src.services import http as http_client
+from src.services import weather
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/sync")
+    def sync_rain(lat: float, lon: float) -> Dict[str, Any]:
+        return weather.get_rain_forecast(lat, lon, "today")
+
+    @app.get("/async")
+    async def async_rain(lat: float, lon: float) -> Dict[str, Any]:
+        return await weather.get_rain_forecast_async(lat, lon, "today")
+
+    return app
+
+
+async def _drive(app: FastAPI, path: str, total: int, concurrency: int) -> Tuple[float, int]:
+    """Send ``total`` requests with ``concurrency`` workers.
+
+    Returns successful requests per second and the number of failed requests.
+    """
+    weather._forecast_cache.clear()
+    counter = iter(range(total))
+    failures = 0
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker() -> None:
+            nonlocal failures
+            for index in counter:
+                # Distinct grid cells so every request reaches the upstream.
+                params = {"lat": -80 + (index % 3000) * 0.05, "lon": index // 3000}
+                response = await client.get(path, params=params)
+                failures += response.status_code != 200
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    await http_client.close_async_client()
+    return (total - failures) / elapsed, failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    args = parser.parse_args()
+
+    app = build_app()
+    with StubUpstream(UpstreamBehavior(latency=args.latency_ms / 1000)) as upstream:
+        weather._WEATHER_URL = upstream.url + "/v1/forecast"
+        for path in ("/sync", "/async"):
+            rate, failures = asyncio.run(_drive(app, path, args.requests, args.concurrency))
+            print(f"{path:<7} {rate:8.1f} req/s  {failures} failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Measure the per-call cost of picking a forecast message.
+
+The "uncached" variant reproduces the previous design, which opened and parsed
+``data/messages.json`` on every call; the "cached" variant is the current
+:func:`src.services.messages.pick_message`.
+
+Run with::
+
+    python -m benchmarks.bench_messages --calls 20000
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from typing import Callable
+
+from src.services import messages
+
+
+def _uncached_pick(condition: str) -> str:
+    catalog = messages._read_catalog(messages._messages_path())
+    return random.choice(catalog.get(condition) or messages._DEFAULT_CATALOG["no_rain"])
+
+
+def _per_call_us(fn: Callable[[str], str], calls: int) -> float:
+    conditions = ("rain", "maybe", "no_rain")
+    started = time.perf_counter()
+    for index in range(calls):
+        fn(conditions[index % 3])
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=20000)
+    args = parser.parse_args()
+
+    messages.pick_message("rain")  # warm the catalog
+    uncached = _per_call_us(_uncached_pick, args.calls)
+    cached = _per_call_us(messages.pick_message, args.calls)
+    print(f"uncached {uncached:8.2f} us/call")
+    print(f"cached   {cached:8.2f} us/call  ({uncached / cached:.0f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
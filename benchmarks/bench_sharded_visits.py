@@ -0,0 +1,96 @@
+"""Measure write contention on visit counters across worker processes.
+
+Spawns ``--workers`` processes, like ``uvicorn --workers N``. Each one commits
+visits one transaction at a time, so every visit takes the write lock of its
+shard's file. The run is repeated for each shard count and reports total
+throughput, average time spent waiting for the write lock and lock timeouts.
+Worker ``i`` writes to shard ``i % shards``, the spread the server's shard
+claims give.
+
+Run with::
+
+    python -m benchmarks.bench_sharded_visits --workers 4 --shards 1 2 4
+"""
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import sqlite3
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+from typing import List, Tuple
+
+from src import db
+
+
+def _worker(path: str, shards: int, index: int, seconds: float) -> Tuple[int, int, float]:
+    """Commit visits until the deadline; return successes, failures and lock wait."""
+    db.DB_PATH = path
+    db.VISIT_SHARDS = shards
+    shard_path = db._shard_path(index % shards)
+    ok = failed = 0
+    waited = 0.0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        today = date.today().isoformat()
+        try:
+            with db._pooled_connection(shard_path) as conn:
+                started = time.perf_counter()
+                conn.execute("BEGIN IMMEDIATE")
+                waited += time.perf_counter() - started
+                conn.execute(
+                    """
+                    UPDATE visit_stats
+                    SET total_visits = total_visits + 1,
+                        today_visits = CASE
+                            WHEN last_updated = ? THEN today_visits + 1 ELSE 1
+                        END,
+                        last_updated = ?
+                    WHERE id = 1
+                    """,
+                    (today, today),
+                )
+                conn.commit()
+            ok += 1
+        except sqlite3.OperationalError:
+            failed += 1
+    return ok, failed, waited
+
+
+def _run(workers: int, shards: int, seconds: float) -> Tuple[float, int, float]:
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = str(Path(tmp) / "stats.db")
+        db.CACHE_DB_PATH = str(Path(tmp) / "cache.db")
+        db.VISIT_SHARDS = shards
+        db.init_db()
+        jobs = [(db.DB_PATH, shards, index, seconds) for index in range(workers)]
+        with multiprocessing.get_context("spawn").Pool(workers) as pool:
+            results: List[Tuple[int, int, float]] = pool.starmap(_worker, jobs)
+        stored = db.get_visit_stats()["total_visits"]
+        db.close_connections()
+    ok = sum(result[0] for result in results)
+    failed = sum(result[1] for result in results)
+    waited = sum(result[2] for result in results)
+    assert stored == ok, f"lost updates: stored {stored}, committed {ok}"
+    return ok / seconds, failed, waited / max(1, ok) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    for shards in args.shards:
+        rate, failed, wait_us = _run(args.workers, shards, args.seconds)
+        print(
+            f"shards={shards:<3} {rate:9.1f} visits/s  "
+            f"{wait_us:7.1f} us lock wait/visit  {failed} lock timeouts"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Compare the ways ``/visit`` has written to SQLite.
+
+- "per-call": a new connection opened, configured and closed per visit
+- "pooled": the per-thread pooled connection, one transaction per visit
+- "group-commit": the current :func:`src.db.increment_visits`, where a
+  single writer thread commits queued visits in batches
+
+Each variant runs against a fresh temporary database with the same number of
+worker threads and reports visits/s and the number of commits.
+
+Run with::
+
+    python -m benchmarks.bench_sqlite_visits --threads 8 --seconds 3
+"""
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import date
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from src import db
+
+_commits = 0
+
+
+def _increment(conn: sqlite3.Connection) -> Dict[str, int]:
+    global _commits
+    today = date.today().isoformat()
+    conn.execute(
+        """
+        UPDATE visit_stats
+        SET total_visits = total_visits + 1,
+            today_visits = CASE WHEN last_updated = ? THEN today_visits + 1 ELSE 1 END,
+            last_updated = ?
+        WHERE id = 1
+        """,
+        (today, today),
+    )
+    row = conn.execute("SELECT total_visits, today_visits FROM visit_stats WHERE id = 1").fetchone()
+    conn.commit()
+    _commits += 1
+    return {"total_visits": row[0], "today_visits": row[1]}
+
+
+def _per_call_increment() -> Dict[str, int]:
+    conn = sqlite3.connect(db.DB_PATH, timeout=1.0)
+    conn.execute("PRAGMA busy_timeout = 1000")
+    try:
+        return _increment(conn)
+    finally:
+        conn.close()
+
+
+def _pooled_increment() -> Dict[str, int]:
+    with db._pooled_connection() as conn:
+        return _increment(conn)
+
+
+def _count_batches() -> None:
+    apply_visits = db._apply_visits
+
+    def counting(batch: List[db._VisitRequest]) -> None:
+        global _commits
+        apply_visits(batch)
+        _commits += 1
+
+    db._apply_visits = counting
+
+
+def _run(
+    increment: Callable[[], Dict[str, int]], threads: int, seconds: float
+) -> Tuple[float, int]:
+    """Hammer ``increment`` from ``threads`` workers; return visits/s and failures."""
+    done = 0
+    failures = 0
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker() -> None:
+        nonlocal done, failures
+        ok = failed = 0
+        while time.perf_counter() < deadline:
+            try:
+                increment()
+                ok += 1
+            except sqlite3.OperationalError:
+                failed += 1
+        with lock:
+            done += ok
+            failures += failed
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return done / (time.perf_counter() - started), failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    global _commits
+    _count_batches()
+    variants = (
+        ("per-call", _per_call_increment),
+        ("pooled", _pooled_increment),
+        ("group-commit", db.increment_visits),
+    )
+    for name, increment in variants:
+        _commits = 0
+        with tempfile.TemporaryDirectory() as tmp:
+            db.DB_PATH = str(Path(tmp) / "stats.db")
+            db.CACHE_DB_PATH = str(Path(tmp) / "cache.db")
+            db.init_db()
+            rate, failures = _run(increment, args.threads, args.seconds)
+            db.close_visit_writer()
+            db.close_connections()
+        commits = _commits / args.seconds
+        print(f"{name:<13} {rate:9.1f} visits/s  {commits:8.1f} commits/s  {failures} failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""Drive a running RainToday server with concurrent clients and report latency.
+
+Each of ``--concurrency`` clients sends requests back to back for
+``--duration`` seconds, picking endpoints by the weighted ``--mix``. The report
+lists throughput, error counts and p50/p95/p99/max latency per endpoint.
+
+Against an already running server::
+
+    python -m benchmarks.loadgen --target http://127.0.0.1:8000 --concurrency 100
+
+Or let it start the stub upstream and the app (uvicorn) itself::
+
+    python -m benchmarks.loadgen --spawn --workers 2 --latency-ms 80 --error-rate 0.01
+
+``visit`` is left out of the default mix because it writes to ``data/stats.db``.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+from typing import Callable, Dict, List, Tuple
+
+import httpx
+
+from benchmarks.stub_upstream import (
+    StubUpstream,
+    add_behavior_arguments,
+    behavior_from_args,
+    free_port,
+    wait_for_port,
+)
+
+Request = Tuple[str, str, Dict[str, str]]
+
+
+def parse_mix(raw: str) -> Dict[str, float]:
+    """Parse ``"rain=7,geocode=2"`` into endpoint weights."""
+    mix: Dict[str, float] = {}
+    for part in raw.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip():
+            mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - set(_ENDPOINTS)
+    if unknown:
+        raise ValueError(f"Unknown endpoints in mix: {', '.join(sorted(unknown))}")
+    return mix
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[rank]
+
+
+def _rain(rng: random.Random, cells: int) -> Request:
+    cell = rng.randrange(cells)
+    lat, lon = -60 + (cell % 2400) * 0.05, -170 + (cell // 2400) * 0.05
+    horizon = rng.choice(("today", "1h", "3h", "6h"))
+    return "GET", "/rain", {"lat": f"{lat:.3f}", "lon": f"{lon:.3f}", "horizon": horizon}
+
+
+def _geocode(rng: random.Random, cells: int) -> Request:
+    # Synthetic names miss the offline gazetteer, so they reach the upstream.
+    return "GET", "/geocode", {"city": f"Loadtown {rng.randrange(cells)}"}
+
+
+def _suggest(rng: random.Random, cells: int) -> Request:
+    return "GET", "/geocode/suggest", {"q": rng.choice(("lo", "san", "par", "ber", "to"))}
+
+
+def _stats(rng: random.Random, cells: int) -> Request:
+    return "GET", "/stats", {}
+
+
+def _visit(rng: random.Random, cells: int) -> Request:
+    return "POST", "/visit", {}
+
+
+_ENDPOINTS: Dict[str, Callable[[random.Random, int], Request]] = {
+    "rain": _rain,
+    "geocode": _geocode,
+    "suggest": _suggest,
+    "stats": _stats,
+    "visit": _visit,
+}
+
+
+async def run_load(
+    target: str, mix: Dict[str, float], concurrency: int, duration: float, cells: int
+) -> Tuple[Dict[str, List[float]], Dict[str, Counter[str]], float]:
+    """Return per-endpoint latencies (seconds), status counts and elapsed time."""
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    statuses: Dict[str, Counter[str]] = defaultdict(Counter)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    deadline = time.perf_counter() + duration
+
+    async with httpx.AsyncClient(base_url=target, limits=limits, timeout=30) as client:
+        async def worker(seed: int) -> None:
+            rng = random.Random(seed)
+            while time.perf_counter() < deadline:
+                name = rng.choices(names, weights)[0]
+                method, path, params = _ENDPOINTS[name](rng, cells)
+                started = time.perf_counter()
+                try:
+                    response = await client.request(method, path, params=params)
+                    status = str(response.status_code)
+                except httpx.HTTPError as exc:
+                    status = type(exc).__name__
+                latencies[name].append(time.perf_counter() - started)
+                statuses[name][status] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(seed) for seed in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return latencies, statuses, elapsed
+
+
+def report(
+    latencies: Dict[str, List[float]], statuses: Dict[str, Counter[str]], elapsed: float
+) -> None:
+    header = f"{'endpoint':<10} {'requests':>9} {'req/s':>9} {'errors':>7} " \
+             f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+    print(header)
+    combined = sorted(value for values in latencies.values() for value in values)
+    rows = [(name, sorted(values)) for name, values in sorted(latencies.items())]
+    for name, values in rows + [("total", combined)]:
+        counts = statuses[name] if name != "total" else sum(statuses.values(), Counter())
+        errors = sum(count for status, count in counts.items() if not status.startswith("2"))
+        print(
+            f"{name:<10} {len(values):>9} {len(values) / elapsed:>9.1f} {errors:>7} "
+            + " ".join(f"{percentile(values, q) * 1000:>8.1f}" for q in (0.5, 0.95, 0.99))
+            + f" {(values[-1] if values else 0) * 1000:>8.1f}"
+        )
+    for name, counts in sorted(statuses.items()):
+        print(f"  {name}: " + ", ".join(f"{status}={count}" for status, count in counts.items()))
+
+
+def _spawn_app(upstream_url: str, workers: int) -> Tuple[subprocess.Popen[bytes], str]:
+    port = free_port("127.0.0.1")
+    env = dict(
+        os.environ,
+        RAINTODAY_WEATHER_URL=f"{upstream_url}/v1/forecast",
+        RAINTODAY_GEOCODE_URL=f"{upstream_url}/v1/search",
+    )
+    command = [
+        sys.executable, "-m", "uvicorn", "src.main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning",
+    ]
+    process = subprocess.Popen(command, env=env)
+    if not wait_for_port("127.0.0.1", port, timeout=20):
+        process.terminate()
+        raise RuntimeError("app server did not start")
+    return process, f"http://127.0.0.1:{port}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--mix", default="rain=7,geocode=2,stats=1")
+    parser.add_argument("--cells", type=int, default=500,
+                        help="distinct locations/cities; fewer means more cache hits")
+    parser.add_argument("--spawn", action="store_true",
+                        help="start the stub upstream and the app instead of using --target")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers with --spawn")
+    add_behavior_arguments(parser)
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    with ExitStack() as stack:
+        target = args.target
+        if args.spawn:
+            upstream = stack.enter_context(StubUpstream(behavior_from_args(args)))
+            process, target = _spawn_app(upstream.url, args.workers)
+            stack.callback(process.wait, 10)
+            stack.callback(process.terminate)
+        results = asyncio.run(run_load(target, mix, args.concurrency, args.duration, args.cells))
+    report(*results)
+
+
+if __name__ == "__main__":
+    main()
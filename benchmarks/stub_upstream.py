@@ -0,0 +1,313 @@
+"""Local stand-in for the Open-Meteo forecast and geocoding APIs.
+
+Serves the real response shapes (including multi-location forecasts) with
+synthetic, deterministic data, and can misbehave on purpose: latency drawn
+from a distribution, random 500s, 429s beyond a request rate, and bodies
+dripped out in slow chunks. Point the app at it with::
+
+    RAINTODAY_WEATHER_URL=http://127.0.0.1:8081/v1/forecast
+    RAINTODAY_GEOCODE_URL=http://127.0.0.1:8081/v1/search
+
+Run standalone with::
+
+    python -m benchmarks.stub_upstream --port 8081 --latency-ms 80 \\
+        --latency-dist exponential --error-rate 0.02 --rate-limit 500
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import socket
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "exponential")
+
+
+@dataclass(frozen=True)
+class UpstreamBehavior:
+    """How the stub responds. Times are in seconds, rates are fractions 0..1."""
+
+    latency: float = 0.1
+    latency_dist: str = "fixed"
+    # Half-width of the ``uniform`` distribution around ``latency``.
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    # Requests per second served before answering 429 (0 disables the limit).
+    rate_limit: float = 0.0
+    drip_rate: float = 0.0
+    drip_chunks: int = 8
+    drip_interval: float = 0.05
+    # Additional synthetic hourly series, to inflate forecast payloads.
+    extra_hourly: int = 0
+    seed: Optional[int] = None
+
+    def delay(self, rng: random.Random) -> float:
+        if self.latency_dist == "uniform":
+            return max(0.0, rng.uniform(self.latency - self.jitter, self.latency + self.jitter))
+        if self.latency_dist == "exponential" and self.latency > 0:
+            return rng.expovariate(1 / self.latency)
+        return self.latency
+
+
+class _TokenBucket:
+    def __init__(self, rate: float) -> None:
+        self.rate = rate
+        self.capacity = max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+def _floats(raw: str) -> List[float]:
+    return [float(part) for part in raw.split(",") if part.strip()]
+
+
+def _rng_for(*parts: Any) -> random.Random:
+    return random.Random(zlib.crc32(repr(parts).encode()))
+
+
+def forecast_payload(
+    lat: float, lon: float, hours: int, extra_hourly: int = 0
+) -> Dict[str, Any]:
+    """One location in Open-Meteo's ``/v1/forecast`` shape, same data for same inputs."""
+    rng = _rng_for(round(float(lat), 4), round(float(lon), 4))
+    start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    wet = rng.random() < 0.3
+    hourly: Dict[str, List[Any]] = {
+        "time": [(start + timedelta(hours=h)).strftime("%Y-%m-%dT%H:%M") for h in range(hours)],
+        "precipitation_probability": [
+            rng.randint(40, 100) if wet else rng.randint(0, 35) for _ in range(hours)
+        ],
+        "precipitation": [round(rng.uniform(0, 2) if wet else 0.0, 1) for _ in range(hours)],
+    }
+    units = {"time": "iso8601", "precipitation_probability": "%", "precipitation": "mm"}
+    for index in range(extra_hourly):
+        hourly[f"synthetic_{index}"] = [round(rng.uniform(0, 100), 1) for _ in range(hours)]
+        units[f"synthetic_{index}"] = "unit"
+    return {
+        "latitude": lat,
+        "longitude": lon,
+        "generationtime_ms": round(rng.uniform(0.05, 0.5), 3),
+        "utc_offset_seconds": 0,
+        "timezone": "GMT",
+        "timezone_abbreviation": "GMT",
+        "elevation": round(rng.uniform(0, 500), 1),
+        "hourly_units": units,
+        "hourly": hourly,
+    }
+
+
+def geocode_payload(name: str, count: int) -> Dict[str, Any]:
+    """Open-Meteo ``/v1/search`` shape; names containing "nowhere" have no results."""
+    payload: Dict[str, Any] = {"generationtime_ms": 0.4}
+    if not name or "nowhere" in name.lower():
+        return payload
+    results = []
+    for index in range(max(1, min(count, 100))):
+        rng = _rng_for(name.lower(), index)
+        results.append({
+            "id": rng.randint(1, 10**7),
+            "name": name.title(),
+            "latitude": round(rng.uniform(-60, 70), 5),
+            "longitude": round(rng.uniform(-180, 180), 5),
+            "elevation": round(rng.uniform(0, 2000), 1),
+            "feature_code": "PPL",
+            "country_code": "XX",
+            "timezone": "GMT",
+            "population": rng.randint(1000, 5_000_000),
+            "country": "Testland",
+            "admin1": "Region",
+        })
+    payload["results"] = results
+    return payload
+
+
+class _Responder:
+    """Applies the configured rate limit, latency, errors and dripping."""
+
+    def __init__(self, behavior: UpstreamBehavior) -> None:
+        self.behavior = behavior
+        self.rng = random.Random(behavior.seed)
+        self.bucket = _TokenBucket(behavior.rate_limit) if behavior.rate_limit > 0 else None
+
+    async def __call__(self, payload: Any) -> Response:
+        if self.bucket is not None and not self.bucket.take():
+            return _error(429, "Too many concurrent requests", {"Retry-After": "1"})
+        await asyncio.sleep(self.behavior.delay(self.rng))
+        if self.rng.random() < self.behavior.error_rate:
+            return _error(500, "Internal error")
+        if self.rng.random() < self.behavior.drip_rate:
+            body = json.dumps(payload).encode()
+            return StreamingResponse(self._drip(body), media_type="application/json")
+        return JSONResponse(payload)
+
+    async def _drip(self, body: bytes) -> AsyncIterator[bytes]:
+        size = max(1, -(-len(body) // max(1, self.behavior.drip_chunks)))
+        for start in range(0, len(body), size):
+            if start:
+                await asyncio.sleep(self.behavior.drip_interval)
+            yield body[start:start + size]
+
+
+def _error(status: int, reason: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    return JSONResponse({"error": True, "reason": reason}, status_code=status, headers=headers)
+
+
+def _forecast_request(params: Any, extra_hourly: int) -> Any:
+    """Build the forecast payload for a query, or raise ``ValueError``."""
+    lats = _floats(params.get("latitude", ""))
+    lons = _floats(params.get("longitude", ""))
+    hours = 24 * int(params.get("forecast_days", "7"))
+    if not lats or len(lats) != len(lons):
+        raise ValueError("Latitude and longitude must have the same length")
+    payloads = [forecast_payload(lat, lon, hours, extra_hourly) for lat, lon in zip(lats, lons)]
+    return payloads if len(payloads) > 1 else payloads[0]
+
+
+def create_app(behavior: Optional[UpstreamBehavior] = None) -> Starlette:
+    """Build the stub app. Every response waits ``behavior.delay()`` first."""
+    behavior = behavior or UpstreamBehavior()
+    respond = _Responder(behavior)
+
+    async def forecast(request: Request) -> Response:
+        try:
+            payload = _forecast_request(request.query_params, behavior.extra_hourly)
+        except ValueError as exc:
+            return _error(400, str(exc))
+        return await respond(payload)
+
+    async def search(request: Request) -> Response:
+        params = request.query_params
+        count = int(params.get("count", "10")) if params.get("count", "").isdigit() else 10
+        return await respond(geocode_payload(params.get("name", ""), count))
+
+    return Starlette(routes=[
+        Route("/v1/forecast", forecast),
+        Route("/v1/search", search),
+    ])
+
+
+def _serve(behavior: UpstreamBehavior, host: str, port: int) -> None:
+    uvicorn.run(
+        create_app(behavior),
+        host=host,
+        port=port,
+        log_level="warning",
+        backlog=4096,
+        timeout_keep_alive=30,
+    )
+
+
+def free_port(host: str) -> int:
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return int(sock.getsockname()[1])
+
+
+def wait_for_port(host: str, port: int, timeout: float = 10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=0.2).close()
+            return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+
+class StubUpstream:
+    """Run the stub app with uvicorn in a child process.
+
+    A separate process keeps the stub from competing with the code under test
+    for the GIL. Usage::
+
+        with StubUpstream(UpstreamBehavior(latency=0.05)) as upstream:
+            url = upstream.url + "/v1/forecast"
+    """
+
+    def __init__(
+        self, behavior: Optional[UpstreamBehavior] = None, host: str = "127.0.0.1"
+    ) -> None:
+        self._host = host
+        self._port = free_port(host)
+        self._process = multiprocessing.Process(
+            target=_serve, args=(behavior or UpstreamBehavior(), host, self._port), daemon=True
+        )
+        self.url = f"http://{host}:{self._port}"
+
+    def __enter__(self) -> "StubUpstream":
+        self._process.start()
+        if wait_for_port(self._host, self._port):
+            return self
+        self._process.terminate()
+        raise RuntimeError("stub upstream did not start")
+
+    def __exit__(self, *exc_info: object) -> None:
+        self._process.terminate()
+        self._process.join(timeout=5)
+
+
+def add_behavior_arguments(parser: argparse.ArgumentParser) -> None:
+    """Register the ``UpstreamBehavior`` knobs on a command line parser."""
+    group = parser.add_argument_group("upstream behaviour")
+    group.add_argument("--latency-ms", type=float, default=100.0)
+    group.add_argument("--latency-dist", choices=LATENCY_DISTRIBUTIONS, default="fixed")
+    group.add_argument("--jitter-ms", type=float, default=0.0, help="uniform half-width")
+    group.add_argument("--error-rate", type=float, default=0.0, help="fraction of 500s")
+    group.add_argument("--rate-limit", type=float, default=0.0, help="req/s before 429s")
+    group.add_argument("--drip-rate", type=float, default=0.0, help="fraction dripped slowly")
+    group.add_argument("--drip-chunks", type=int, default=8)
+    group.add_argument("--drip-interval-ms", type=float, default=50.0)
+    group.add_argument("--extra-hourly", type=int, default=0, help="pad forecast payloads")
+    group.add_argument("--seed", type=int, default=None)
+
+
+def behavior_from_args(args: argparse.Namespace) -> UpstreamBehavior:
+    return UpstreamBehavior(
+        latency=args.latency_ms / 1000,
+        latency_dist=args.latency_dist,
+        jitter=args.jitter_ms / 1000,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        drip_rate=args.drip_rate,
+        drip_chunks=args.drip_chunks,
+        drip_interval=args.drip_interval_ms / 1000,
+        extra_hourly=args.extra_hourly,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    add_behavior_arguments(parser)
+    args = parser.parse_args()
+    print(f"Forecast: http://{args.host}:{args.port}/v1/forecast")
+    print(f"Geocoding: http://{args.host}:{args.port}/v1/search")
+    _serve(behavior_from_args(args), args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""Microbenchmark suite for the service hot paths, with baseline comparison.
+
+Every case reports microseconds per operation (best of ``--repeat`` runs,
+default 5, so a burst of load from elsewhere on the machine rarely decides it).
+Results are written as JSON and compared against a committed baseline; the
+run fails when a case is slower than its baseline by more than
+``--threshold`` (a fraction, default 0.5 = 50%; single runs on a shared
+machine easily vary by 20-30%). Baselines are machine specific, so
+refresh them with ``--update-baseline`` when the reference machine changes.
+
+Upstream APIs are stubbed in-process and all databases live in a temporary
+directory, so the suite needs no network and leaves ``data/`` untouched.
+
+Run with::
+
+    python -m benchmarks.suite                    # compare with the baseline
+    python -m benchmarks.suite --only weather     # cases whose name contains "weather"
+    python -m benchmarks.suite --update-baseline  # record a new baseline
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import httpx
+
+from src import db
+from src.services import conditions, gazetteer, geocode, messages, weather
+from src.services import http as http_client
+
+BENCH_DIR = Path(__file__).resolve().parent
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+DEFAULT_OUTPUT = BENCH_DIR / "results" / "latest.json"
+
+_HOURLY_PROBABILITY: List[float] = [20.0, 35.0, 10.0, 0.0] * 6
+_HOURLY_PRECIPITATION: List[float] = [0.0, 0.1, 0.0, 0.2] * 6
+_FORECAST = {
+    "utc_offset_seconds": 0,
+    "hourly": {
+        "precipitation_probability": _HOURLY_PROBABILITY,
+        "precipitation": _HOURLY_PRECIPITATION,
+    },
+}
+_GEOCODE = {"results": [{"latitude": 48.85, "longitude": 2.35, "name": "Paris"}]}
+
+
+class Case(NamedTuple):
+    """A benchmark: ``run(number)`` performs ``number`` operations."""
+
+    name: str
+    run: Callable[[int], None]
+    number: int
+
+
+class _StubResponse:
+    status_code = 200
+
+    def __init__(self, payload: Dict[str, Any]) -> None:
+        self._payload = payload
+
+    def json(self) -> Dict[str, Any]:
+        return self._payload
+
+
+def _stub_requests_get(url: str, params: Any = None, timeout: float = 0) -> _StubResponse:
+    return _StubResponse(_GEOCODE if "search" in url else _FORECAST)
+
+
+def _stub_handler(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, json=_GEOCODE if "search" in request.url.path else _FORECAST)
+
+
+def _loop(fn: Callable[[], Any]) -> Callable[[int], None]:
+    def run(number: int) -> None:
+        for _ in range(number):
+            fn()
+
+    return run
+
+
+def _unique(prefix: str) -> Callable[[], str]:
+    counter = itertools.count()
+    return lambda: f"{prefix}{next(counter)}"
+
+
+def _fresh_cells() -> Iterator[Tuple[float, float]]:
+    # Walks latitude in whole grid cells, moving one cell east after each
+    # pass, so no cell repeats and every call misses the shared cache too.
+    for index in itertools.count():
+        yield -80 + (index % 3000) * 0.05, (index // 3000) * 0.05
+
+
+def _shared_forecast() -> None:
+    # An empty in-process cache, as in a worker that has not seen the cell yet.
+    weather._forecast_cache.clear()
+    weather.get_rain_forecast(51.5, -0.12, "3h")
+
+
+def _with_writes(run: Callable[[int], None]) -> Callable[[int], None]:
+    # Waits for the shared-cache writes the run queued, so each run pays for
+    # its own and none land in the next run or case.
+    def flushed(number: int) -> None:
+        run(number)
+        db.close_forecast_writer()
+
+    return flushed
+
+
+def _in_threads(fn: Callable[[], Any], threads: int) -> Callable[[int], None]:
+    def run(number: int) -> None:
+        per_thread = max(1, number // threads)
+        workers = [
+            threading.Thread(target=_loop(fn), args=(per_thread,)) for _ in range(threads)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+    return run
+
+
+def _process_visits(path: str, count: int) -> None:
+    db.DB_PATH = path
+    for _ in range(count):
+        db.increment_visits()
+    db.close_visit_writer()
+
+
+def _in_processes(processes: int) -> Callable[[int], None]:
+    def run(number: int) -> None:
+        jobs = [(db.DB_PATH, max(1, number // processes))] * processes
+        with multiprocessing.get_context("spawn").Pool(processes) as pool:
+            pool.starmap(_process_visits, jobs)
+
+    return run
+
+
+def _asgi_case(
+    name: str, method: str, url: str, number: int, body: Optional[Any] = None
+) -> Case:
+    from src.main import app
+
+    def run(count: int) -> None:
+        async def drive() -> None:
+            _install_async_stub()
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                for _ in range(count):
+                    response = await client.request(method, url, json=body)
+                    response.raise_for_status()
+
+        asyncio.run(drive())
+
+    return Case(name, run, number)
+
+
+def _install_stubs(tmp: Path) -> None:
+    db.DB_PATH = str(tmp / "stats.db")
+    db.CACHE_DB_PATH = str(tmp / "cache.db")
+    db.init_db()
+    weather.requests.get = _stub_requests_get  # type: ignore[assignment]
+    geocode.requests.get = _stub_requests_get  # type: ignore[assignment]
+    gazetteer.get_gazetteer()
+
+
+def _install_async_stub() -> None:
+    # Pools are bound to an event loop, and every ASGI run uses a new one.
+    client = http_client.build_async_client(transport=httpx.MockTransport(_stub_handler))
+    http_client._pools[:] = [(client, asyncio.Semaphore(http_client.UPSTREAM_POOL_SIZE))]
+
+
+def build_cases() -> List[Case]:
+    """All benchmark cases, in report order."""
+    raw = [10, 20.5, "x", None, 40] * 5
+    matrix = ([_HOURLY_PROBABILITY] * 256, [_HOURLY_PRECIPITATION] * 256)
+    city = _unique("Benchville ")
+    cells = _fresh_cells()
+
+    weather.get_rain_forecast(51.5, -0.12, "today")
+    geocode.search_city("Benchtown")
+
+    return [
+        Case("conditions.determine_condition", _loop(
+            lambda: conditions.determine_condition(_HOURLY_PROBABILITY, _HOURLY_PRECIPITATION)
+        ), 20000),
+        Case("conditions.evaluate_matrix.256_rows", _loop(
+            lambda: conditions.evaluate_matrix(matrix[0], matrix[1], weather._HORIZON_MAP)
+        ), 200),
+        Case("weather.safe_sequence", _loop(
+            lambda: array("d", weather._safe_sequence(raw, weather.COMPACT_PRECIPITATION_SCALE))
+        ), 20000),
+        Case("messages.pick_message", _loop(lambda: messages.pick_message("rain")), 20000),
+        Case("messages.load_messages", _loop(messages.load_messages), 20000),
+        Case("geocode.search_city.cached", _loop(
+            lambda: geocode.search_city("Benchtown")), 5000),
+        Case("geocode.search_city.gazetteer", _loop(
+            lambda: geocode.search_city("London")), 5000),
+        Case("geocode.search_city.miss", _loop(lambda: geocode.search_city(city())), 500),
+        Case("weather.get_rain_forecast.cached", _loop(
+            lambda: weather.get_rain_forecast(51.5, -0.12, "3h")), 5000),
+        Case("weather.get_rain_forecast.shared", _loop(_shared_forecast), 2000),
+        Case("weather.get_rain_forecast.miss", _with_writes(_loop(
+            lambda: weather.get_rain_forecast(*next(cells), "3h"))), 1000),
+        Case("db.increment_visits", _loop(db.increment_visits), 2000),
+        Case("db.increment_visits.8_threads", _in_threads(db.increment_visits, 8), 4000),
+        Case("db.increment_visits.4_processes", _in_processes(4), 4000),
+        Case("db.get_visit_stats", _loop(db.get_visit_stats), 20000),
+        Case("db.get_visit_stats.8_threads", _in_threads(db.get_visit_stats, 8), 40000),
+        _asgi_case("app.GET /", "GET", "/", 500),
+        _asgi_case("app.GET /rain", "GET", "/rain?lat=51.5&lon=-0.12&horizon=3h", 500),
+        _asgi_case("app.GET /geocode", "GET", "/geocode?city=Benchtown", 500),
+        _asgi_case("app.GET /geocode/suggest", "GET", "/geocode/suggest?q=san", 500),
+        _asgi_case("app.GET /stats", "GET", "/stats", 500),
+        _asgi_case("app.POST /visit", "POST", "/visit", 500),
+        _asgi_case("app.POST /rain/batch", "POST", "/rain/batch", 100, body=[
+            {"lat": 51.5 + index * 0.1, "lon": -0.12, "horizon": "today"} for index in range(20)
+        ]),
+    ]
+
+
+def measure(case: Case, repeat: int, scale: float) -> float:
+    """Best-of-``repeat`` microseconds per operation."""
+    number = max(1, int(case.number * scale))
+    case.run(max(1, number // 10))  # warm-up
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        case.run(number)
+        best = min(best, (time.perf_counter() - started) / number)
+    return best * 1e6
+
+
+def compare(
+    results: Dict[str, float], baseline: Dict[str, float], threshold: float
+) -> List[str]:
+    """Return a description of every case slower than baseline by more than ``threshold``."""
+    regressions = []
+    for name, current in results.items():
+        reference = baseline.get(name)
+        if reference and current > reference * (1 + threshold):
+            regressions.append(
+                f"{name}: {current:.2f} us/op vs baseline {reference:.2f} "
+                f"(+{(current / reference - 1) * 100:.0f}%)"
+            )
+    return regressions
+
+
+def _environment() -> Dict[str, Any]:
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def _report(results: Dict[str, float], baseline: Dict[str, float]) -> None:
+    for name, current in results.items():
+        reference = baseline.get(name)
+        delta = f"{(current / reference - 1) * 100:+6.1f}%" if reference else "     new"
+        print(f"{name:<36} {current:12.2f} us/op  {delta}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--out", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply iteration counts")
+    parser.add_argument("--only", default="", help="run cases whose name contains this")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _install_stubs(Path(tmp))
+        results = {
+            case.name: measure(case, args.repeat, args.scale)
+            for case in build_cases()
+            if args.only in case.name
+        }
+        db.close_visit_writer()
+        db.close_forecast_writer()
+        db.close_connections()
+
+    baseline: Dict[str, float] = {}
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))["results"]
+    _report(results, baseline)
+
+    document = {"environment": _environment(), "unit": "us/op", "results": results}
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps(document, indent=2) + "\n", encoding="utf-8")
+    if args.update_baseline:
+        merged = {**baseline, **results}
+        args.baseline.write_text(
+            json.dumps({**document, "results": merged}, indent=2) + "\n", encoding="utf-8"
+        )
+        print(f"Baseline updated: {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
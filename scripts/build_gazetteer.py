@@ -0,0 +1,102 @@
+"""Build ``data/cities.tsv`` from a GeoNames city dump.
+
+Downloads ``cities15000.zip`` (every populated place with at least 15,000
+inhabitants, about 33,000 rows) unless ``--source`` names a local copy of
+the zip or of the extracted ``.txt``. Rows keep the GeoNames layout and
+``geonameid``, so ``src.services.gazetteer`` reads the result as is; the
+alternate-names column is dropped to keep the file small, since only the
+name and ASCII name are indexed. Rows are written most populous first.
+
+Run with::
+
+    python scripts/build_gazetteer.py                            # download and build
+    python scripts/build_gazetteer.py --source cities15000.zip   # from a local copy
+    python scripts/build_gazetteer.py --min-population 50000     # fewer, larger cities
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import os
+import tempfile
+import urllib.request
+import zipfile
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+GEONAMES_URL = "https://download.geonames.org/export/dump/cities15000.zip"
+DEFAULT_OUTPUT = Path(__file__).resolve().parent.parent / "data" / "cities.tsv"
+
+_GEONAME_ID, _ALTERNATE_NAMES, _FEATURE_CLASS, _POPULATION = 0, 3, 6, 14
+_COLUMNS = 19
+
+
+def extract_rows(lines: Iterable[str], min_population: int) -> List[List[str]]:
+    """Populated places with ids and at least ``min_population`` people, largest first."""
+    rows = []
+    for line in lines:
+        columns = line.rstrip("\r\n").split("\t")
+        if len(columns) != _COLUMNS or not columns[_GEONAME_ID].isdigit():
+            continue
+        if columns[_FEATURE_CLASS] != "P":
+            continue
+        try:
+            population = int(columns[_POPULATION] or 0)
+        except ValueError:
+            continue
+        if population < min_population:
+            continue
+        columns[_ALTERNATE_NAMES] = ""
+        rows.append(columns)
+    rows.sort(key=lambda columns: (-int(columns[_POPULATION]), int(columns[_GEONAME_ID])))
+    return rows
+
+
+def _read_lines(data: bytes, name: str) -> Iterator[str]:
+    if name.endswith(".zip"):
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            members = [member for member in archive.namelist() if member.endswith(".txt")]
+            if len(members) != 1:
+                raise ValueError(f"{name}: expected one .txt file in the archive")
+            data = archive.read(members[0])
+    return iter(data.decode("utf-8").splitlines())
+
+
+def _load(source: str) -> Iterator[str]:
+    if source.startswith(("http://", "https://")):
+        with urllib.request.urlopen(source, timeout=60) as response:
+            return _read_lines(response.read(), source)
+    return _read_lines(Path(source).read_bytes(), source)
+
+
+def _write(rows: Sequence[Sequence[str]], output: Path) -> None:
+    # Written next to the target and renamed, so a running server never
+    # reads a half-written file.
+    output.parent.mkdir(parents=True, exist_ok=True)
+    handle, temporary = tempfile.mkstemp(dir=output.parent, prefix=f".{output.name}.")
+    try:
+        with os.fdopen(handle, "w", encoding="utf-8", newline="\n") as out:
+            out.writelines("\t".join(columns) + "\n" for columns in rows)
+        os.replace(temporary, output)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--source", default=GEONAMES_URL, help="URL or path of the dump")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--min-population", type=int, default=15000)
+    args = parser.parse_args(argv)
+
+    rows = extract_rows(_load(args.source), args.min_population)
+    if not rows:
+        parser.error(f"{args.source}: no cities found")
+    _write(rows, args.output)
+    print(f"Wrote {len(rows)} cities to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -20,6 +20,7 @@ Commands:
   lint          Run lint checks
   types         Run mypy type checking
   coverage      Run tests with coverage report
+  bench         Run the benchmark suite and compare with benchmarks/baseline.json
   all           Run all checks (lint, types, unit, integration)
   full          Run everything including E2E (requires server)
   
@@ -57,6 +58,11 @@ case "${1:-}" in
         echo ""
         echo "Coverage report generated in htmlcov/index.html"
         ;;
+    bench)
+        echo "Running benchmarks..."
+        shift
+        python -m benchmarks.suite "$@"
+        ;;
     all)
         echo "Running full validation suite (except E2E)..."
         echo ""
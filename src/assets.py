@@ -0,0 +1,150 @@
+"""Frontend files held in memory, precompressed, with fingerprinted URLs.
+
+Every file under the static directory is read once and compressed up front
+with gzip, and with brotli when the ``brotli`` package is installed. Each
+file also gets a ``/static/<stem>.<hash><suffix>`` URL; HTML pages have
+their ``"/static/<name>"`` references rewritten to those URLs, which always
+name the same bytes and so can be cached as immutable. Pages keep their
+plain URLs and are revalidated by ETag instead.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from src.config import env_int
+
+try:
+    import brotli
+except ImportError:  # Optional: without it, gzip is the only encoding offered.
+    brotli = None
+
+# Re-read the static directory when a file in it changes, for editing the
+# frontend without restarting. Costs a directory scan per request; keep it
+# off in production.
+STATIC_RELOAD = env_int("RAINTODAY_STATIC_RELOAD", 0) > 0
+# Fingerprinted URLs never change content; plain ones must be revalidated.
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+FINGERPRINT_LENGTH = 12
+# Encodings in order of preference; "identity" is always available.
+ENCODINGS = ("br", "gzip", "identity")
+
+_ETAG_SUFFIXES = {"br": "-br", "gzip": "-gz", "identity": ""}
+
+
+def _compress(body: bytes) -> Dict[str, bytes]:
+    """The encodings worth serving for ``body``: those that make it smaller."""
+    encoded = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        encoded["br"] = brotli.compress(body, quality=11)
+    bodies = {name: data for name, data in encoded.items() if len(data) < len(body)}
+    bodies["identity"] = body
+    return bodies
+
+
+def _accepted_encodings(accept_encoding: str) -> List[str]:
+    """Encodings an ``Accept-Encoding`` header allows, ignoring any with q=0."""
+    accepted = []
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        name, _, value = params.strip().partition("=")
+        if name.strip().lower() == "q":
+            try:
+                if float(value) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.append(coding.strip().lower())
+    return accepted
+
+
+class Asset:
+    """One file's bytes in every encoding it is served in."""
+
+    __slots__ = ("url", "media_type", "digest", "_bodies")
+
+    def __init__(self, name: str, body: bytes) -> None:
+        self.digest = hashlib.sha256(body).hexdigest()[:FINGERPRINT_LENGTH]
+        stem, dot, suffix = name.rpartition(".")
+        fingerprinted = f"{stem}.{self.digest}.{suffix}" if dot else f"{name}.{self.digest}"
+        self.url = f"/static/{fingerprinted}"
+        self.media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        if self.media_type.startswith("text/") or self.media_type.endswith("javascript"):
+            self.media_type += "; charset=utf-8"
+        self._bodies = _compress(body)
+
+    @property
+    def compressed(self) -> bool:
+        return len(self._bodies) > 1
+
+    def encoded(self, accept_encoding: str) -> Tuple[str, bytes, str]:
+        """Pick ``(encoding, body, strong ETag)`` for a request's ``Accept-Encoding``."""
+        accepted = _accepted_encodings(accept_encoding)
+        for encoding in ENCODINGS:
+            if encoding in self._bodies and (
+                encoding == "identity" or encoding in accepted or "*" in accepted
+            ):
+                return encoding, self._bodies[encoding], self._etag(encoding)
+        return "identity", self._bodies["identity"], self._etag("identity")
+
+    def _etag(self, encoding: str) -> str:
+        # Each encoding is a different representation, so it gets its own tag.
+        return f'"{self.digest}{_ETAG_SUFFIXES[encoding]}"'
+
+
+def _rewrite_references(html: bytes, assets: Dict[str, Asset]) -> bytes:
+    for name, asset in assets.items():
+        html = html.replace(f'"/static/{name}"'.encode(), f'"{asset.url}"'.encode())
+    return html
+
+
+class AssetBundle:
+    """All files of a static directory, served by name or by fingerprinted URL."""
+
+    def __init__(self, directory: Path, reload: bool = False) -> None:
+        self.directory = directory
+        self.reload = reload
+        self._lock = threading.Lock()
+        self._version: Tuple[Tuple[str, int, int], ...] = ()
+        self._by_name: Dict[str, Tuple[Asset, bool]] = {}
+        self.load()
+
+    def _scan(self) -> Tuple[Tuple[str, int, int], ...]:
+        with os.scandir(self.directory) as entries:
+            files = [
+                (entry.name, entry.stat())
+                for entry in entries
+                if entry.is_file() and not entry.name.startswith(".")
+            ]
+        return tuple(sorted((name, stat.st_mtime_ns, stat.st_size) for name, stat in files))
+
+    def load(self) -> None:
+        """(Re)read every file, compress it and fingerprint it."""
+        version = self._scan()
+        raw = {name: (self.directory / name).read_bytes() for name, _, _ in version}
+        assets = {
+            name: Asset(name, body) for name, body in raw.items() if not name.endswith(".html")
+        }
+        # Pages are fingerprinted after their references are, so a changed
+        # script also changes the tag of the page that loads it.
+        for name, body in raw.items():
+            if name.endswith(".html"):
+                assets[name] = Asset(name, _rewrite_references(body, assets))
+        by_name: Dict[str, Tuple[Asset, bool]] = {}
+        for name, asset in assets.items():
+            by_name[name] = (asset, False)
+            by_name[asset.url.removeprefix("/static/")] = (asset, True)
+        with self._lock:
+            self._by_name, self._version = by_name, version
+
+    def get(self, name: str) -> Optional[Tuple[Asset, bool]]:
+        """Return ``(asset, immutable)`` for a path under ``/static/``, if it exists."""
+        if self.reload and self._scan() != self._version:
+            self.load()
+        return self._by_name.get(name)
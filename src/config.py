@@ -0,0 +1,31 @@
+"""Environment-driven settings helpers shared across the app."""
+from __future__ import annotations
+
+import os
+
+
+def env_float(name: str, default: float) -> float:
+    """Read a float setting from the environment, falling back to ``default``."""
+    raw = os.getenv(name, "").strip()
+    if not raw:
+        return default
+    try:
+        return float(raw)
+    except ValueError:
+        return default
+
+
+def env_int(name: str, default: int) -> int:
+    """Read an integer setting from the environment, falling back to ``default``."""
+    raw = os.getenv(name, "").strip()
+    if not raw:
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        return default
+
+
+def env_str(name: str, default: str) -> str:
+    """Read a string setting from the environment, falling back to ``default`` when unset."""
+    return os.getenv(name, "").strip() or default
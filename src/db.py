@@ -1,26 +1,250 @@
+import glob
+import os
+import queue
 import sqlite3
+import threading
+import time
+import weakref
+from contextlib import contextmanager
 from datetime import date
-from typing import Dict
+from itertools import groupby
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    cast,
+)
+
+from src.config import env_float, env_int
+from src.metrics import SQLITE_BUSY, SQLITE_LOCK_WAIT
+
+try:
+    import fcntl
+except ImportError:  # Not on Windows: shards are then picked by pid alone.
+    fcntl = None  # type: ignore[assignment]
 
 DB_PATH = "data/stats.db"
+# Lookup caches live in a sibling file so they never contend with the counters.
+CACHE_DB_PATH = "data/cache.db"
+
+# Per-connection tuning for pooled connections. NORMAL is durable under WAL
+# except for the last transactions before a power loss, which is fine for
+# counters and caches.
+SQLITE_MMAP_SIZE_BYTES = env_int("RAINTODAY_SQLITE_MMAP_SIZE_BYTES", 64 * 1024 * 1024)
+SQLITE_CACHE_SIZE_KIB = env_int("RAINTODAY_SQLITE_CACHE_SIZE_KIB", 8192)
+SQLITE_CACHED_STATEMENTS = 64
+# Most visit increments committed in one transaction by the writer thread.
+VISIT_BATCH_MAX = env_int("RAINTODAY_VISIT_BATCH_MAX", 512)
+# Visit counters are spread over this many stats files. Each worker process
+# claims a shard of its own to write to, and reads sum every shard. Shards are
+# separate files because SQLite locks a whole database per write.
+VISIT_SHARDS = env_int("RAINTODAY_VISIT_SHARDS", 1)
+# /stats is served from memory; this bounds how stale other workers' visits
+# can look in this process.
+STATS_REFRESH_SECONDS = env_float("RAINTODAY_STATS_REFRESH_SECONDS", 1.0)
+
+# Expired rows are deleted at startup and, on busy servers, at most this often
+# while forecasts are being written.
+CACHE_PRUNE_INTERVAL_SECONDS = 600.0
+# The forecast writer collects writes for this long before committing them
+# together. Until then, other workers may fetch the same cells themselves.
+FORECAST_WRITE_DELAY_SECONDS = 0.05
+# Stay well under SQLite's bound-parameter limit in ``IN (...)`` lookups.
+SQLITE_MAX_LOOKUP_KEYS = 500
+
+# (result, expires_at); a ``None`` result records a cached "not found".
+GeocodeEntry = Tuple[Optional[Dict[str, Any]], float]
 
 
-def _get_connection() -> sqlite3.Connection:
+def _get_connection(path: Optional[str] = None) -> sqlite3.Connection:
     """
-    Create a database connection with optimal settings for concurrency.
+    Create a short-lived database connection (used for schema setup and tests).
 
     - WAL mode allows concurrent reads during writes
     - Short timeout (1s) fails fast instead of blocking
-    - Each connection is short-lived (closed after each operation)
+    - The caller closes it; request paths use ``_pooled_connection`` instead
     """
-    conn = sqlite3.connect(DB_PATH, timeout=1.0)
+    conn = sqlite3.connect(path or DB_PATH, timeout=1.0)
     conn.execute("PRAGMA busy_timeout = 1000")
     return conn
 
 
-def init_db() -> None:
-    """Initialize database schema with WAL mode for concurrency."""
-    conn = _get_connection()
+class _PooledConnection(sqlite3.Connection):
+    """Connection subclass so the pool can track connections weakly."""
+
+
+# Each thread keeps one connection per database file, reused across calls so
+# the schema, WAL index and prepared statements stay warm. Connections are
+# tracked weakly so ones owned by exited threads are simply garbage collected.
+_local = threading.local()
+_pool_lock = threading.Lock()
+_pooled: "weakref.WeakSet[_PooledConnection]" = weakref.WeakSet()
+_pool_generation = 0
+
+
+def _open_pooled(path: str) -> _PooledConnection:
+    conn = sqlite3.connect(
+        path,
+        timeout=1.0,
+        factory=_PooledConnection,
+        cached_statements=SQLITE_CACHED_STATEMENTS,
+        # Only the owning thread uses it; shutdown may close it from another.
+        check_same_thread=False,
+    )
+    conn.execute("PRAGMA busy_timeout = 1000")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute(f"PRAGMA mmap_size = {int(SQLITE_MMAP_SIZE_BYTES)}")
+    conn.execute(f"PRAGMA cache_size = {-int(SQLITE_CACHE_SIZE_KIB)}")
+    return conn
+
+
+@contextmanager
+def _pooled_connection(path: Optional[str] = None) -> Iterator[sqlite3.Connection]:
+    """
+    Borrow this thread's persistent connection to ``path`` (default: DB_PATH).
+
+    A failed operation is rolled back so the connection is clean for reuse.
+    """
+    path = path or DB_PATH
+    connections: Dict[str, _PooledConnection] = getattr(_local, "connections", {})
+    if getattr(_local, "generation", None) != _pool_generation:
+        connections = {}
+    conn = connections.get(path)
+    if conn is None:
+        conn = _open_pooled(path)
+        with _pool_lock:
+            _pooled.add(conn)
+        connections[path] = conn
+        _local.connections = connections
+        _local.generation = _pool_generation
+
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+_write_metrics = {
+    name: (SQLITE_LOCK_WAIT.labels(name), SQLITE_BUSY.labels(name)) for name in ("stats", "cache")
+}
+
+
+def _begin_write(conn: sqlite3.Connection, db_name: str) -> None:
+    """
+    Take the write lock up front with ``BEGIN IMMEDIATE``.
+
+    The time spent waiting for it (SQLite retries internally until
+    busy_timeout) is recorded, and so are attempts that give up.
+    """
+    lock_wait, busy = _write_metrics[db_name]
+    started = time.perf_counter()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+    except sqlite3.OperationalError as exc:
+        if exc.sqlite_errorname.startswith("SQLITE_BUSY"):
+            busy.inc()
+        raise
+    lock_wait.observe(time.perf_counter() - started)
+
+
+def close_connections() -> None:
+    """Close every pooled connection; threads reconnect lazily on next use."""
+    global _pool_generation
+    with _pool_lock:
+        _pool_generation += 1
+        connections = list(_pooled)
+        _pooled.clear()
+    for conn in connections:
+        conn.close()
+
+
+def _shard_count() -> int:
+    return max(1, VISIT_SHARDS)
+
+
+def _shard_path(shard: int) -> str:
+    """Shard 0 is DB_PATH itself; shard k lives next to it as ``stats.shard<k>.db``."""
+    if shard == 0:
+        return DB_PATH
+    base, ext = os.path.splitext(DB_PATH)
+    return f"{base}.shard{shard}{ext}"
+
+
+# (pid, DB_PATH, shard count) the claim was made for, the shard, and the
+# descriptor holding its lock file, if any.
+_shard_claim: Optional[Tuple[Tuple[int, str, int], int, Optional[int]]] = None
+_shard_claim_lock = threading.Lock()
+
+
+def _lock_shard(shard: int) -> Optional[int]:
+    """Take ``shard``'s lock file without waiting; return the descriptor holding it."""
+    fd = os.open(f"{_shard_path(shard)}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _claim_shard(pid: int, count: int) -> Tuple[int, Optional[int]]:
+    preferred = pid % count
+    if count == 1 or fcntl is None:
+        return preferred, None
+    for offset in range(count):
+        shard = (preferred + offset) % count
+        fd = _lock_shard(shard)
+        if fd is not None:
+            return shard, fd
+    return preferred, None
+
+
+def _release_shard() -> None:
+    """Give up this process's shard claim, if it holds one."""
+    global _shard_claim
+    with _shard_claim_lock:
+        if _shard_claim is not None and _shard_claim[2] is not None:
+            os.close(_shard_claim[2])
+        _shard_claim = None
+
+
+def _own_shard() -> int:
+    """
+    The shard this process writes to.
+
+    A process claims a shard by holding an exclusive lock on its
+    ``<shard>.lock`` file until it exits, trying ``pid % VISIT_SHARDS``
+    first. With more workers than shards the ones left over share shard
+    ``pid % VISIT_SHARDS`` with its owner: still correct, since SQLite
+    serializes their writes, but they contend for its write lock again.
+    Without ``fcntl`` (Windows) every process takes ``pid % VISIT_SHARDS``.
+    A forked child makes its own claim, as the key includes the pid.
+    """
+    global _shard_claim
+    key = (os.getpid(), DB_PATH, _shard_count())
+    claim = _shard_claim
+    if claim is not None and claim[0] == key:
+        return claim[1]
+    with _shard_claim_lock:
+        if _shard_claim is None or _shard_claim[0] != key:
+            # A descriptor inherited across fork is closed without releasing
+            # the parent's lock, which it shares.
+            if _shard_claim is not None and _shard_claim[2] is not None:
+                os.close(_shard_claim[2])
+            _shard_claim = (key, *_claim_shard(key[0], key[2]))
+        return _shard_claim[1]
+
+
+def _init_stats_file(path: str) -> None:
+    conn = _get_connection(path)
     # WAL mode is critical for concurrent access
     conn.execute("PRAGMA journal_mode=WAL")
     cursor = conn.cursor()
@@ -40,61 +264,493 @@ def init_db() -> None:
     conn.close()
 
 
-def increment_visits() -> Dict[str, int]:
+def _orphan_shards() -> List[str]:
+    """Shard files beyond the configured count, left over from a larger setting."""
+    base, ext = os.path.splitext(DB_PATH)
+    prefix = f"{base}.shard"
+    orphans = []
+    for path in glob.glob(f"{glob.escape(prefix)}*{glob.escape(ext)}"):
+        index = path[len(prefix):len(path) - len(ext)]
+        if index.isdigit() and int(index) >= _shard_count():
+            orphans.append(path)
+    return sorted(orphans)
+
+
+def _fold_into_primary(path: str) -> None:
     """
-    Increment visit counters atomically using a single SQL statement.
+    Add an orphaned shard's counts to shard 0 and delete the shard file.
 
-    Key optimizations:
-    - Single UPDATE statement with CASE for date rollover
-    - No separate SELECT before UPDATE (eliminates race window)
-    - WAL mode allows concurrent reads
-    - SQLite busy_timeout handles lock contention automatically
+    Shard 0 is write-locked for the whole fold, so workers starting at the
+    same time cannot fold the same file twice.
     """
-    today = date.today().isoformat()
     conn = _get_connection()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        if os.path.exists(path):
+            orphan = _get_connection(path)
+            try:
+                row = orphan.execute(
+                    "SELECT total_visits, today_visits, last_updated FROM visit_stats WHERE id = 1"
+                ).fetchone()
+            finally:
+                orphan.close()
+            if row is not None:
+                total, today_count, last_updated = row
+                conn.execute(
+                    """
+                    UPDATE visit_stats
+                    SET total_visits = total_visits + ?,
+                        today_visits = CASE
+                            WHEN last_updated = ? THEN today_visits + ?
+                            WHEN last_updated < ? THEN ?
+                            ELSE today_visits
+                        END,
+                        last_updated = MAX(last_updated, ?)
+                    WHERE id = 1
+                    """,
+                    (total, last_updated, today_count, last_updated, today_count, last_updated),
+                )
+            for suffix in ("", "-wal", "-shm", ".lock"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+        conn.commit()
+    finally:
+        conn.close()
 
+
+def init_db() -> None:
+    """
+    Initialize database schema with WAL mode for concurrency.
+
+    Creates one stats file per visit shard. Shard 0 is the original
+    single-row ``DB_PATH``, so existing counts carry over unchanged when
+    sharding is enabled; shards beyond a reduced ``VISIT_SHARDS`` are folded
+    back into shard 0.
+    """
+    for shard in range(_shard_count()):
+        _init_stats_file(_shard_path(shard))
+    for path in _orphan_shards():
+        _fold_into_primary(path)
+    init_cache_db()
+
+
+def init_cache_db() -> None:
+    """Create the lookup cache schema and drop entries that have expired."""
+    conn = _get_connection(CACHE_DB_PATH)
     try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS geocode_cache (
+                query TEXT PRIMARY KEY,
+                found INTEGER NOT NULL,
+                lat REAL,
+                lon REAL,
+                name TEXT,
+                expires_at REAL NOT NULL
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS forecast_cache (
+                key TEXT PRIMARY KEY,
+                entry BLOB NOT NULL,
+                expires_at REAL NOT NULL
+            ) WITHOUT ROWID
+        """)
+        now = time.time()
+        conn.execute("DELETE FROM geocode_cache WHERE expires_at <= ?", (now,))
+        conn.execute("DELETE FROM forecast_cache WHERE expires_at <= ?", (now,))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+class _VisitRequest:
+    """One caller waiting for its increment to be committed."""
+
+    __slots__ = ("today", "done", "result", "error")
+
+    def __init__(self, today: str) -> None:
+        self.today = today
+        self.done = threading.Event()
+        self.result: Optional[Dict[str, int]] = None
+        self.error: Optional[BaseException] = None
+
+
+def _apply_visits(batch: List[_VisitRequest]) -> None:
+    """
+    Apply a batch of increments in one transaction and hand out exact counts.
+
+    Consecutive requests for the same day become one UPDATE adding ``n``
+    (a batch straddling midnight becomes two), and each caller gets the
+    counts as they were right after its own increment, plus the current
+    counts of the other shards.
+    """
+    own = _own_shard()
+    with _pooled_connection(_shard_path(own)) as conn:
+        _begin_write(conn, "stats")
         cursor = conn.cursor()
+        for today, group in groupby(batch, key=lambda request: request.today):
+            run = list(group)
+            count = len(run)
+            cursor.execute(
+                """
+                UPDATE visit_stats
+                SET total_visits = total_visits + ?,
+                    today_visits = CASE
+                        WHEN last_updated = ? THEN today_visits + ?
+                        ELSE ?
+                    END,
+                    last_updated = ?
+                WHERE id = 1
+                """,
+                (count, today, count, count, today),
+            )
+            cursor.execute(
+                "SELECT total_visits, today_visits FROM visit_stats WHERE id = 1"
+            )
+            total, today_count = cursor.fetchone()
+            other_total, other_today = _sum_shards(
+                (shard for shard in range(_shard_count()) if shard != own), today
+            )
+            total += other_total
+            today_count += other_today
+            for position, request in enumerate(run, start=1 - count):
+                request.result = {
+                    "total_visits": total + position,
+                    "today_visits": today_count + position,
+                }
+        conn.commit()
+    _stats_snapshot.publish(today, total, today_count)
 
-        # Atomic increment with conditional date rollover in one statement
-        # This eliminates the race condition between read and write
-        cursor.execute(
+
+class VisitWriter:
+    """
+    Single writer thread that group-commits visit increments.
+
+    Callers enqueue a request and block until it is committed. The writer
+    drains everything queued while the previous commit ran (up to
+    ``VISIT_BATCH_MAX``) and applies it as one transaction, so the write lock
+    is taken once per batch instead of once per visit.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._queue: Optional["queue.SimpleQueue[Optional[_VisitRequest]]"] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self) -> Dict[str, int]:
+        request = _VisitRequest(date.today().isoformat())
+        with self._lock:
+            if self._queue is None:
+                self._queue = queue.SimpleQueue()
+                self._thread = threading.Thread(
+                    target=self._run, args=(self._queue,), name="visit-writer", daemon=True
+                )
+                self._thread.start()
+            self._queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return cast(Dict[str, int], request.result)
+
+    def stop(self) -> None:
+        """Flush every pending increment and stop the writer thread."""
+        with self._lock:
+            pending, thread = self._queue, self._thread
+            self._queue = self._thread = None
+            if pending is not None:
+                pending.put(None)
+        if thread is not None:
+            thread.join()
+
+    def _run(self, pending: "queue.SimpleQueue[Optional[_VisitRequest]]") -> None:
+        stopping = False
+        while not stopping:
+            batch: List[_VisitRequest] = []
+            item = pending.get()
+            while True:
+                if item is None:
+                    stopping = True
+                else:
+                    batch.append(item)
+                if len(batch) >= max(1, VISIT_BATCH_MAX):
+                    break
+                try:
+                    item = pending.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._commit(batch)
+
+    @staticmethod
+    def _commit(batch: List[_VisitRequest]) -> None:
+        try:
+            _apply_visits(batch)
+        except BaseException as exc:  # noqa: BLE001 - handed to every caller
+            for request in batch:
+                request.error = exc
+        for request in batch:
+            request.done.set()
+
+
+_visit_writer = VisitWriter()
+
+
+def increment_visits() -> Dict[str, int]:
+    """
+    Increment visit counters and return the counts right after this visit.
+
+    Key optimizations:
+    - Increments are group-committed by a single writer thread, so there is
+      one write transaction per batch rather than per request
+    - Single UPDATE statement with CASE for date rollover, adding the batch size
+    - Per-caller counts are derived from the batch's final values
+    - WAL mode allows concurrent reads
+    """
+    return _visit_writer.submit()
+
+
+def close_visit_writer() -> None:
+    """Flush pending increments and stop the writer (called on shutdown)."""
+    _visit_writer.stop()
+
+
+def _sum_shards(shards: Iterable[int], today: str) -> Tuple[int, int]:
+    """Sum totals over ``shards``; a shard counts toward today only if updated today."""
+    total = today_count = 0
+    for shard in shards:
+        with _pooled_connection(_shard_path(shard)) as conn:
+            row = conn.execute(
+                "SELECT total_visits, today_visits, last_updated FROM visit_stats WHERE id = 1"
+            ).fetchone()
+        if row is None:
+            continue
+        total += row[0]
+        if row[2] == today:
+            today_count += row[1]
+    return total, today_count
+
+
+def _read_visit_stats(today: str) -> Tuple[int, int]:
+    return _sum_shards(range(_shard_count()), today)
+
+
+class StatsSnapshot:
+    """
+    Process-local copy of the visit counters.
+
+    The writer publishes the counts it just committed, and readers reload
+    from the database at most every ``STATS_REFRESH_SECONDS`` (or when the
+    day changes) so other workers' visits still show up. A reload that raced
+    with a publish is discarded rather than overwriting newer counts.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self._lock = threading.Lock()
+        # (day, total_visits, today_visits, refreshed_at)
+        self._value: Optional[Tuple[str, int, int, float]] = None
+        self._version = 0
+
+    def get(self) -> Dict[str, int]:
+        today = date.today().isoformat()
+        value = self._value
+        if value is None or value[0] != today or self._stale(value):
+            value = self._reload(today)
+        return {"total_visits": value[1], "today_visits": value[2]}
+
+    def publish(self, day: str, total: int, today_count: int) -> None:
+        with self._lock:
+            self._version += 1
+            self._value = (day, total, today_count, self._clock())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._version += 1
+            self._value = None
+
+    def _stale(self, value: Tuple[str, int, int, float]) -> bool:
+        return self._clock() - value[3] >= STATS_REFRESH_SECONDS
+
+    def _reload(self, today: str) -> Tuple[str, int, int, float]:
+        version = self._version
+        total, today_count = _read_visit_stats(today)
+        value = (today, total, today_count, self._clock())
+        with self._lock:
+            if self._version == version:
+                self._value = value
+                self._version += 1
+        return value
+
+
+_stats_snapshot = StatsSnapshot()
+
+
+def get_visit_stats() -> Dict[str, int]:
+    """Return the visit statistics from the in-memory snapshot, summed over shards."""
+    return _stats_snapshot.get()
+
+
+def load_geocode(query: str, now: float) -> Optional[GeocodeEntry]:
+    """Fetch an unexpired geocode cache entry for a normalized query."""
+    with _pooled_connection(CACHE_DB_PATH) as conn:
+        row = conn.execute(
             """
-            UPDATE visit_stats
-            SET total_visits = total_visits + 1,
-                today_visits = CASE
-                    WHEN last_updated = ? THEN today_visits + 1
-                    ELSE 1
-                END,
-                last_updated = ?
-            WHERE id = 1
+            SELECT found, lat, lon, name, expires_at FROM geocode_cache
+            WHERE query = ? AND expires_at > ?
             """,
-            (today, today)
-        )
+            (query, now),
+        ).fetchone()
+    if row is None:
+        return None
+    found, lat, lon, name, expires_at = row
+    result = {"lat": lat, "lon": lon, "name": name} if found else None
+    return result, expires_at
 
-        # Fetch the updated values
-        cursor.execute(
-            "SELECT total_visits, today_visits FROM visit_stats WHERE id = 1"
-        )
-        result = cursor.fetchone()
 
+def store_geocode(query: str, result: Optional[Dict[str, Any]], expires_at: float) -> None:
+    """Persist a geocode result, or a "not found" marker when ``result`` is None."""
+    found = result is not None
+    with _pooled_connection(CACHE_DB_PATH) as conn:
+        _begin_write(conn, "cache")
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO geocode_cache (query, found, lat, lon, name, expires_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (
+                query,
+                int(found),
+                result["lat"] if result else None,
+                result["lon"] if result else None,
+                result["name"] if result else None,
+                expires_at,
+            ),
+        )
         conn.commit()
-        return {"total_visits": result[0], "today_visits": result[1]}
-    finally:
-        conn.close()
 
 
-def get_visit_stats() -> Dict[str, int]:
-    """Fetch the current visit statistics without mutating the database."""
-    conn = _get_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT total_visits, today_visits FROM visit_stats WHERE id = 1"
+def load_forecasts(keys: Sequence[str], now: float) -> Dict[str, bytes]:
+    """Fetch the unexpired encoded forecasts stored under ``keys``."""
+    found: Dict[str, bytes] = {}
+    with _pooled_connection(CACHE_DB_PATH) as conn:
+        for start in range(0, len(keys), SQLITE_MAX_LOOKUP_KEYS):
+            chunk = keys[start:start + SQLITE_MAX_LOOKUP_KEYS]
+            placeholders = ", ".join("?" * len(chunk))
+            found.update(conn.execute(
+                f"""
+                SELECT key, entry FROM forecast_cache
+                WHERE key IN ({placeholders}) AND expires_at > ?
+                """,
+                (*chunk, now),
+            ))
+    return found
+
+
+_next_forecast_prune = 0.0
+
+
+def store_forecasts(entries: Sequence[Tuple[str, bytes, float]]) -> None:
+    """Persist ``(key, encoded forecast, expires_at)`` entries in one transaction.
+
+    Expired rows are deleted along the way every ``CACHE_PRUNE_INTERVAL_SECONDS``
+    so the table only holds cells that are still of use.
+    """
+    global _next_forecast_prune
+    now = time.time()
+    with _pooled_connection(CACHE_DB_PATH) as conn:
+        _begin_write(conn, "cache")
+        conn.executemany(
+            "INSERT OR REPLACE INTO forecast_cache (key, entry, expires_at) VALUES (?, ?, ?)",
+            entries,
         )
-        row = cursor.fetchone()
-        if row is None:
-            return {"total_visits": 0, "today_visits": 0}
-        return {"total_visits": row[0], "today_visits": row[1]}
-    finally:
-        conn.close()
+        if now >= _next_forecast_prune:
+            conn.execute("DELETE FROM forecast_cache WHERE expires_at <= ?", (now,))
+            _next_forecast_prune = now + CACHE_PRUNE_INTERVAL_SECONDS
+        conn.commit()
+
+
+class ForecastWriter:
+    """
+    Single writer thread that persists fetched forecasts to the shared cache.
+
+    Unlike visits, nobody waits for these writes: the worker that fetched a
+    forecast already holds it in memory, so callers enqueue their entries and
+    return. That lets the writer wait ``FORECAST_WRITE_DELAY_SECONDS`` after
+    the first entry arrives and store everything queued by then as one
+    transaction. Failed writes are dropped, since the shared tier is
+    best-effort.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._queue: Optional[
+            "queue.SimpleQueue[Optional[Sequence[Tuple[str, bytes, float]]]]"
+        ] = None
+        self._thread: Optional[threading.Thread] = None
+        # Set by ``stop`` so a flush does not sit out the collection delay.
+        self._stopping: Optional[threading.Event] = None
+
+    def submit(self, entries: Sequence[Tuple[str, bytes, float]]) -> None:
+        with self._lock:
+            if self._queue is None:
+                self._queue, self._stopping = queue.SimpleQueue(), threading.Event()
+                self._thread = threading.Thread(
+                    target=self._run,
+                    args=(self._queue, self._stopping),
+                    name="forecast-writer",
+                    daemon=True,
+                )
+                self._thread.start()
+            self._queue.put(entries)
+
+    def stop(self) -> None:
+        """Write every pending forecast and stop the writer thread."""
+        with self._lock:
+            pending, stopping, thread = self._queue, self._stopping, self._thread
+            self._queue = self._stopping = self._thread = None
+            if pending is not None:
+                pending.put(None)
+            if stopping is not None:
+                stopping.set()
+        if thread is not None:
+            thread.join()
+
+    @staticmethod
+    def _run(
+        pending: "queue.SimpleQueue[Optional[Sequence[Tuple[str, bytes, float]]]]",
+        stopping: threading.Event,
+    ) -> None:
+        stopped = False
+        while not stopped:
+            batch: List[Tuple[str, bytes, float]] = []
+            item = pending.get()
+            if item is not None:
+                stopping.wait(FORECAST_WRITE_DELAY_SECONDS)
+            while True:
+                if item is None:
+                    stopped = True
+                else:
+                    batch.extend(item)
+                try:
+                    item = pending.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    store_forecasts(batch)
+                except sqlite3.Error:
+                    pass
+
+
+_forecast_writer = ForecastWriter()
+
+
+def store_forecasts_later(entries: Sequence[Tuple[str, bytes, float]]) -> None:
+    """Queue entries for ``store_forecasts`` on the writer thread and return at once."""
+    _forecast_writer.submit(entries)
+
+
+def close_forecast_writer() -> None:
+    """Write pending forecasts and stop the writer (called on shutdown)."""
+    _forecast_writer.stop()
@@ -1,51 +1,322 @@
+import json
+import time
+import zlib
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
 
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import HTMLResponse
-from fastapi.staticfiles import StaticFiles
+import anyio.to_thread
+from fastapi import Body, FastAPI, Header, HTTPException, Query, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel
+from starlette.types import ASGIApp, Receive, Scope, Send
 
-from src.db import get_visit_stats, increment_visits, init_db
-from src.services.geocode import CityNotFoundError, GeocodeServiceError, search_city
-from src.services.weather import WeatherServiceError, get_rain_forecast
+from src import metrics
+from src.assets import (
+    IMMUTABLE_CACHE_CONTROL,
+    REVALIDATE_CACHE_CONTROL,
+    STATIC_RELOAD,
+    AssetBundle,
+)
+from src.db import (
+    STATS_REFRESH_SECONDS,
+    close_connections,
+    close_forecast_writer,
+    close_visit_writer,
+    get_visit_stats,
+    increment_visits,
+    init_db,
+)
+from src.services.gazetteer import suggest_cities
+from src.services.geocode import (
+    GEOCODE_CACHE_TTL_SECONDS,
+    GEOCODE_NEGATIVE_TTL_SECONDS,
+    CityNotFoundError,
+    GeocodeServiceError,
+    search_city_async,
+)
+from src.services.http import close_async_client
+from src.services.resilience import deadline, request_budget
+from src.services.snapshot import load_caches, save_caches
+from src.services.weather import (
+    WeatherServiceError,
+    compact_forecast_async,
+    iter_rain_forecasts_async,
+    rain_answer_async,
+)
+
+
+class RequestTimingMiddleware:
+    """
+    Record request latency per route template, up to the last body byte.
+
+    Plain ASGI rather than ``BaseHTTPMiddleware``, which would buffer
+    streaming responses. Unknown paths share the "other" route so the label
+    set stays bounded.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self._routes: Dict[str, metrics.HistogramChild] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            path = getattr(scope.get("route"), "path", "other")
+            timer = self._routes.get(path)
+            if timer is None:
+                timer = self._routes[path] = metrics.REQUEST_DURATION.labels(path)
+            timer.observe(time.perf_counter() - started)
+
+
+def _threadpool_samples() -> List[metrics.Sample]:
+    # Sync endpoints run on anyio's default limiter; only readable inside the loop.
+    try:
+        limiter = anyio.to_thread.current_default_thread_limiter()
+    except RuntimeError:
+        return []
+    return [(("busy",), limiter.borrowed_tokens), (("limit",), limiter.total_tokens)]
+
+
+metrics.THREADPOOL_THREADS.add(_threadpool_samples)
 
 app = FastAPI()
+app.add_middleware(RequestTimingMiddleware)
 
-# Serve static files
+# The landing page and its assets are read and compressed once, at import.
 static_dir = Path(__file__).parent / "static"
-app.mount("/static", StaticFiles(directory=static_dir), name="static")
+assets = AssetBundle(static_dir, reload=STATIC_RELOAD)
+
+# Upper bound on locations per POST /rain/batch request.
+RAIN_BATCH_MAX_LOCATIONS = 1000
+
+
+class RainLocation(BaseModel):
+    lat: float
+    lon: float
+    horizon: str = "today"
 
 
 @app.on_event("startup")
 def startup_event() -> None:
     init_db()
+    load_caches()
+
+
+@app.on_event("shutdown")
+async def shutdown_event() -> None:
+    try:
+        save_caches()
+    except OSError:
+        pass  # Warm restarts are best-effort; the next start is just cold.
+    await close_async_client()
+    close_visit_writer()
+    close_forecast_writer()
+    close_connections()
+
+
+# Lets a client that chains calls (geocode, then rain) pass on what is left
+# of its overall budget; the server's own budget still caps it.
+_BUDGET_HEADER = Header(
+    None,
+    alias="X-Request-Budget-Ms",
+    description="Milliseconds this request may spend on upstream calls",
+)
+
+
+_IF_NONE_MATCH = Header(None, alias="If-None-Match")
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison, as caches use for ``If-None-Match``."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def _content_etag(payload: Any) -> str:
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return f'W/"{zlib.crc32(encoded):08x}"'
+
+
+def _conditional(
+    if_none_match: Optional[str],
+    etag: str,
+    cache_control: str,
+    body: Callable[[], Any],
+) -> Response:
+    """
+    Answer 304 when the client already holds ``etag``, else the JSON ``body()``.
+    The body is only built when it is sent.
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(body(), headers=headers)
+
+
+def _city_not_found() -> HTTPException:
+    # "Not found" is cached server-side too, for the negative TTL.
+    return HTTPException(
+        status_code=404,
+        detail="City not found",
+        headers={"Cache-Control": f"public, max-age={int(GEOCODE_NEGATIVE_TTL_SECONDS)}"},
+    )
 
 
 @app.get("/geocode")
-def geocode(city: str = Query(..., description="City name to geocode")) -> Dict[str, Any]:
+async def geocode(
+    city: str = Query(..., description="City name to geocode"),
+    budget_ms: Optional[int] = _BUDGET_HEADER,
+    if_none_match: Optional[str] = _IF_NONE_MATCH,
+) -> Response:
     try:
-        return search_city(city)
+        with deadline(request_budget(budget_ms)):
+            result = await search_city_async(city)
     except CityNotFoundError as exc:
-        raise HTTPException(status_code=404, detail="City not found") from exc
+        raise _city_not_found() from exc
     except GeocodeServiceError as exc:
         raise HTTPException(status_code=502, detail="Geocoding API error") from exc
+    # Coordinates of a city do not change; these live as long as the server's cache.
+    cache_control = f"public, max-age={int(GEOCODE_CACHE_TTL_SECONDS)}"
+    return _conditional(if_none_match, _content_etag(result), cache_control, lambda: result)
+
+
+@app.get("/geocode/suggest")
+async def geocode_suggest(
+    q: str = Query(..., description="City name prefix"),
+    limit: int = Query(8, ge=1, le=20, description="Maximum number of suggestions"),
+) -> List[Dict[str, Any]]:
+    # Served from the in-memory gazetteer; never touches the upstream API.
+    return suggest_cities(q, limit)
 
 
 @app.get("/rain")
-def rain(
+async def rain(
     lat: float = Query(..., description="Latitude"),
     lon: float = Query(..., description="Longitude"),
-    horizon: str = Query("today", description="Forecast horizon: today, 1h, 3h, 6h")
-) -> Dict[str, Any]:
+    horizon: str = Query("today", description="Forecast horizon: today or <N>h (e.g. 1h, 3h, 12h)"),
+    budget_ms: Optional[int] = _BUDGET_HEADER,
+    if_none_match: Optional[str] = _IF_NONE_MATCH,
+) -> Response:
     try:
-        return get_rain_forecast(lat, lon, horizon)
+        with deadline(request_budget(budget_ms)):
+            answer = await rain_answer_async(lat, lon, horizon)
     except WeatherServiceError as exc:
         raise HTTPException(status_code=502, detail="Weather API error") from exc
+    # A matching ETag skips evaluating the window and picking a message.
+    return _conditional(if_none_match, answer.etag, answer.cache_control, answer.result)
+
+
+@app.get("/rain/by-city")
+async def rain_by_city(
+    city: str = Query(..., description="City name to geocode"),
+    horizon: str = Query("today", description="Forecast horizon: today or <N>h (e.g. 1h, 3h, 12h)"),
+    budget_ms: Optional[int] = _BUDGET_HEADER,
+    if_none_match: Optional[str] = _IF_NONE_MATCH,
+) -> Response:
+    """
+    Geocode ``city`` and evaluate its forecast in one request.
+    Saves the browser the serial /geocode -> /rain round trip; both steps
+    share one upstream budget. The body is the /rain result plus ``name`` and
+    the city's /forecast body as ``forecast``, so the page can evaluate other
+    horizons without asking again.
+    """
+    try:
+        with deadline(request_budget(budget_ms)):
+            place = await search_city_async(city)
+            answer = await rain_answer_async(place["lat"], place["lon"], horizon)
+    except CityNotFoundError as exc:
+        raise _city_not_found() from exc
+    except GeocodeServiceError as exc:
+        raise HTTPException(status_code=502, detail="Geocoding API error") from exc
+    except WeatherServiceError as exc:
+        raise HTTPException(status_code=502, detail="Weather API error") from exc
+    # The city's coordinates outlive the forecast, so the forecast's validators
+    # apply; they cover the embedded series, which starts at the same hour.
+    return _conditional(
+        if_none_match,
+        answer.etag,
+        answer.cache_control,
+        lambda: {
+            **answer.result(),
+            "name": place["name"],
+            "forecast": answer.compact().result(),
+        },
+    )
+
+
+@app.get("/forecast")
+async def forecast(
+    lat: float = Query(..., description="Latitude"),
+    lon: float = Query(..., description="Longitude"),
+    budget_ms: Optional[int] = _BUDGET_HEADER,
+    if_none_match: Optional[str] = _IF_NONE_MATCH,
+) -> Response:
+    """
+    Hourly series and condition rules for evaluating every horizon client-side.
+    The page fetches it once per located position (city searches get it
+    inside /rain/by-city) and evaluates the selected horizon from it, so
+    moving the horizon slider needs no request until ``valid_until``.
+    """
+    try:
+        with deadline(request_budget(budget_ms)):
+            answer = await compact_forecast_async(lat, lon)
+    except WeatherServiceError as exc:
+        raise HTTPException(status_code=502, detail="Weather API error") from exc
+    return _conditional(if_none_match, answer.etag, answer.cache_control, answer.result)
+
+
+@app.post("/rain/batch")
+async def rain_batch(
+    locations: List[RainLocation] = Body(...),
+    budget_ms: Optional[int] = _BUDGET_HEADER,
+) -> StreamingResponse:
+    """
+    Evaluate many locations in one request.
+    Streams one JSON object per line (NDJSON) as results become available;
+    each line carries the ``index`` of its location in the request body.
+    Upstream calls are only time-limited when the client sends a budget.
+    """
+    if len(locations) > RAIN_BATCH_MAX_LOCATIONS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {RAIN_BATCH_MAX_LOCATIONS} locations per batch",
+        )
+    queries = [(item.lat, item.lon, item.horizon) for item in locations]
+
+    async def lines() -> AsyncIterator[str]:
+        async for result in iter_rain_forecasts_async(queries):
+            yield json.dumps(result) + "\n"
+
+    async def budgeted_lines() -> AsyncIterator[str]:
+        with deadline(request_budget(budget_ms)):
+            async for line in lines():
+                yield line
+
+    stream = lines() if budget_ms is None else budgeted_lines()
+    return StreamingResponse(stream, media_type="application/x-ndjson")
+
+
+@app.get("/metrics")
+async def get_metrics() -> Response:
+    # Async so the threadpool gauge is read on the event loop.
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 @app.get("/stats")
-def get_stats() -> Dict[str, int]:
-    return get_visit_stats()
+def get_stats(if_none_match: Optional[str] = _IF_NONE_MATCH) -> Response:
+    stats = get_visit_stats()
+    # Counts are reloaded from SQLite about this often anyway.
+    cache_control = f"public, max-age={int(STATS_REFRESH_SECONDS)}"
+    return _conditional(if_none_match, _content_etag(stats), cache_control, lambda: stats)
 
 
 @app.post("/visit")
@@ -57,7 +328,33 @@ def record_visit() -> Dict[str, int]:
     return increment_visits()
 
 
-@app.get("/", response_class=HTMLResponse)
-def root() -> str:
-    # Serve the placeholder landing page
-    return (static_dir / "index.html").read_text(encoding="utf-8")
+def _serve_asset(request: Request, name: str, if_none_match: Optional[str]) -> Response:
+    found = assets.get(name)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    asset, immutable = found
+    encoding, body, etag = asset.encoded(request.headers.get("accept-encoding", ""))
+    headers = {
+        "ETag": etag,
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL,
+    }
+    if asset.compressed:
+        headers["Vary"] = "Accept-Encoding"
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type=asset.media_type, headers=headers)
+
+
+@app.api_route("/static/{name:path}", methods=["GET", "HEAD"], include_in_schema=False)
+async def static_asset(
+    request: Request, name: str, if_none_match: Optional[str] = _IF_NONE_MATCH
+) -> Response:
+    return _serve_asset(request, name, if_none_match)
+
+
+@app.api_route("/", methods=["GET", "HEAD"], response_class=HTMLResponse)
+async def root(request: Request, if_none_match: Optional[str] = _IF_NONE_MATCH) -> Response:
+    # Served from memory; async so it never waits for a threadpool slot.
+    return _serve_asset(request, "index.html", if_none_match)
@@ -0,0 +1,405 @@
+"""Dependency-free metrics in the Prometheus text exposition format.
+
+Recording is lock-free: each thread that touches a series gets its own list of
+cells on first use and is the only writer of that list, so ``inc()`` and
+``observe()`` are an attribute lookup and one or two list updates. A scrape
+sums the cells of every live thread and a retired total: when a thread exits,
+its cells are folded into that total, so counters never go backwards and
+recycled worker threads do not pile up. A scrape can see an observation half
+applied (bucket counted, sum not yet), which is harmless for monitoring.
+
+Values that already exist elsewhere (cache sizes, threadpool occupancy) are
+exported with :class:`Callback` families, evaluated only at scrape time.
+"""
+from __future__ import annotations
+
+import abc
+import math
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from typing import Callable, Dict, Generic, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+Labels = Tuple[str, ...]
+Sample = Tuple[Labels, float]
+C = TypeVar("C")
+
+# Request and upstream latencies, in seconds.
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+# SQLite lock waits are usually far below a millisecond and capped by busy_timeout.
+LOCK_WAIT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.01, 0.05, 0.25, 1.0)
+
+
+class Registry:
+    """An ordered set of metric families rendered together."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._families: Dict[str, "_Family"] = {}
+
+    def register(self, family: "_Family") -> None:
+        with self._lock:
+            if family.name in self._families:
+                raise ValueError(f"Metric {family.name} is already registered")
+            self._families[family.name] = family
+
+    def render(self) -> str:
+        """Return every family in the Prometheus text format (version 0.0.4)."""
+        with self._lock:
+            families = list(self._families.values())
+        lines: List[str] = []
+        for family in families:
+            lines.append(f"# HELP {family.name} {family.documentation}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            family.render(lines)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _ThreadCells:
+    """Owner of one thread's cells; collected when the thread exits."""
+
+    __slots__ = ("cells", "__weakref__")
+
+    def __init__(self, cells: List[float]) -> None:
+        self.cells = cells
+
+
+class _Cells:
+    """One series' values, split into a list per recording thread."""
+
+    __slots__ = ("_width", "_local", "_lock", "_shards", "_retired")
+
+    def __init__(self, width: int) -> None:
+        self._width = width
+        self._local = threading.local()
+        # Reentrant: a finalizer may run in a thread that is already scraping.
+        self._lock = threading.RLock()
+        # Live threads' cells, by id() since equal lists are not the same list.
+        self._shards: Dict[int, List[float]] = {}
+        self._retired = [0.0] * width
+
+    def local(self) -> List[float]:
+        try:
+            return self._local.cells  # type: ignore[no-any-return]
+        except AttributeError:
+            owner = _ThreadCells([0.0] * self._width)
+            with self._lock:
+                self._shards[id(owner.cells)] = owner.cells
+            weakref.finalize(owner, self._retire, owner.cells)
+            self._local.cells = owner.cells
+            self._local.owner = owner
+            return owner.cells
+
+    def _retire(self, cells: List[float]) -> None:
+        with self._lock:
+            del self._shards[id(cells)]
+            for index, value in enumerate(cells):
+                self._retired[index] += value
+
+    def totals(self) -> List[float]:
+        with self._lock:
+            shards = list(self._shards.values())
+            totals = list(self._retired)
+        for cells in shards:
+            for index, value in enumerate(cells):
+                totals[index] += value
+        return totals
+
+
+class _Family(abc.ABC):
+    kind = ""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: Optional[Registry] = None,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        (REGISTRY if registry is None else registry).register(self)
+
+    @abc.abstractmethod
+    def render(self, lines: List[str]) -> None:
+        """Append this family's exposition lines to ``lines``."""
+
+
+class CounterChild:
+    """A single labelled counter series."""
+
+    __slots__ = ("_cells",)
+
+    def __init__(self) -> None:
+        self._cells = _Cells(1)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._cells.local()[0] += amount
+
+    def value(self) -> float:
+        return self._cells.totals()[0]
+
+
+class HistogramChild:
+    """A single labelled histogram series."""
+
+    __slots__ = ("_cells", "_bounds")
+
+    def __init__(self, bounds: Tuple[float, ...]) -> None:
+        self._bounds = bounds
+        # One cell per bucket (the last one is +Inf), then the running sum.
+        self._cells = _Cells(len(bounds) + 2)
+
+    def observe(self, value: float) -> None:
+        cells = self._cells.local()
+        cells[bisect_left(self._bounds, value)] += 1
+        cells[-1] += value
+
+    def count(self) -> int:
+        return int(sum(self._cells.totals()[:-1]))
+
+    def sum(self) -> float:
+        return self._cells.totals()[-1]
+
+    def buckets(self) -> List[Tuple[float, int]]:
+        """Cumulative ``(upper bound, count)`` pairs, ending with ``+Inf``."""
+        totals = self._cells.totals()
+        cumulative = 0
+        result = []
+        for bound, count in zip(self._bounds + (math.inf,), totals):
+            cumulative += int(count)
+            result.append((bound, cumulative))
+        return result
+
+
+class _Labelled(_Family, Generic[C]):
+    """A family whose series are created on first use of each label set."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        registry: Optional[Registry] = None,
+    ) -> None:
+        super().__init__(name, documentation, labelnames, registry)
+        self._children_lock = threading.Lock()
+        self._children: Dict[Labels, C] = {}
+
+    def labels(self, *values: str) -> C:
+        """Return the series for ``values``. Bind it once, outside hot paths."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._children_lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    @abc.abstractmethod
+    def _new_child(self) -> C:
+        """Create the series for a label set seen for the first time."""
+
+    def _series(self) -> List[Tuple[Labels, C]]:
+        with self._children_lock:
+            return list(self._children.items())
+
+
+class Counter(_Labelled[CounterChild]):
+    """A monotonically increasing total."""
+
+    kind = "counter"
+
+    def _new_child(self) -> CounterChild:
+        return CounterChild()
+
+    def render(self, lines: List[str]) -> None:
+        for values, child in self._series():
+            labels = _label_text(self.labelnames, values)
+            lines.append(f"{self.name}{labels} {_number(child.value())}")
+
+
+class Histogram(_Labelled[HistogramChild]):
+    """Observations counted into cumulative ``le`` buckets, with their sum."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        registry: Optional[Registry] = None,
+    ) -> None:
+        super().__init__(name, documentation, labelnames, registry)
+        self._bounds = tuple(sorted(buckets))
+
+    def _new_child(self) -> HistogramChild:
+        return HistogramChild(self._bounds)
+
+    def render(self, lines: List[str]) -> None:
+        names = self.labelnames + ("le",)
+        for values, child in self._series():
+            buckets = child.buckets()
+            for bound, count in buckets:
+                labels = _label_text(names, values + (_number(bound),))
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _label_text(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_number(child.sum())}")
+            lines.append(f"{self.name}_count{labels} {buckets[-1][1]}")
+
+
+class Callback(_Family):
+    """Counter or gauge samples read from their source at scrape time."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        kind: str,
+        labelnames: Sequence[str] = (),
+        registry: Optional[Registry] = None,
+    ) -> None:
+        super().__init__(name, documentation, labelnames, registry)
+        self.kind = kind
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+
+    def add(self, collect: Callable[[], Iterable[Sample]]) -> None:
+        self._collectors.append(collect)
+
+    def render(self, lines: List[str]) -> None:
+        for collect in list(self._collectors):
+            for values, value in collect():
+                labels = _label_text(self.labelnames, values)
+                lines.append(f"{self.name}{labels} {_number(value)}")
+
+
+class UpstreamMetrics:
+    """Latency and error series for one upstream API, bound once at import."""
+
+    __slots__ = ("_duration", "_transport_errors", "_status_errors")
+
+    def __init__(self, api: str) -> None:
+        self._duration = UPSTREAM_DURATION.labels(api)
+        self._transport_errors = UPSTREAM_ERRORS.labels(api, "transport")
+        self._status_errors = UPSTREAM_ERRORS.labels(api, "status")
+
+    def record(self, started: float, status_code: Optional[int]) -> None:
+        """Record a request started at ``started`` (``perf_counter``); ``None`` if it failed."""
+        self._duration.observe(time.perf_counter() - started)
+        if status_code is None:
+            self._transport_errors.inc()
+        elif status_code >= 400:
+            self._status_errors.inc()
+
+
+def track_cache(name: str, stats: Callable[[], Tuple[int, int, int]]) -> None:
+    """Export a cache's ``(hits, misses, entries)`` under ``cache=name``."""
+
+    def lookups() -> Iterable[Sample]:
+        hits, misses, _ = stats()
+        return (((name, "hit"), hits), ((name, "miss"), misses))
+
+    CACHE_LOOKUPS.add(lookups)
+    CACHE_ENTRIES.add(lambda: (((name,), stats()[2]),))
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+REQUEST_DURATION = Histogram(
+    "raintoday_http_request_duration_seconds",
+    "Time to handle HTTP requests, by route template, until the last body byte is sent.",
+    ("route",),
+)
+UPSTREAM_DURATION = Histogram(
+    "raintoday_upstream_request_duration_seconds",
+    "Open-Meteo request latency, by API.",
+    ("api",),
+)
+UPSTREAM_ERRORS = Counter(
+    "raintoday_upstream_errors_total",
+    "Failed Open-Meteo requests, by API and reason (transport or status >= 400).",
+    ("api", "reason"),
+)
+UPSTREAM_ATTEMPTS = Counter(
+    "raintoday_upstream_extra_attempts_total",
+    "Open-Meteo requests sent beyond the first, by API and kind (hedge or retry).",
+    ("api", "kind"),
+)
+UPSTREAM_CIRCUIT_OPEN = Callback(
+    "raintoday_upstream_circuit_open",
+    "1 while the circuit breaker for an Open-Meteo API is open, else 0.",
+    "gauge",
+    ("api",),
+)
+SQLITE_LOCK_WAIT = Histogram(
+    "raintoday_sqlite_lock_wait_seconds",
+    "Time spent acquiring the SQLite write lock, by database file.",
+    ("db",),
+    buckets=LOCK_WAIT_BUCKETS,
+)
+SQLITE_BUSY = Counter(
+    "raintoday_sqlite_busy_total",
+    "SQLite writes that gave up after busy_timeout (database is locked), by database file.",
+    ("db",),
+)
+STALE_FORECASTS_SERVED = Counter(
+    "raintoday_stale_forecasts_served_total",
+    "Expired forecasts served, by reason (revalidating in the background, or upstream_error).",
+    ("reason",),
+)
+MESSAGE_RELOADS = Counter(
+    "raintoday_message_catalog_reloads_total",
+    "Reads of data/messages.json after it changed, by outcome (ok or malformed).",
+    ("outcome",),
+)
+CACHE_LOOKUPS = Callback(
+    "raintoday_cache_lookups_total",
+    "In-memory cache lookups, by cache and result.",
+    "counter",
+    ("cache", "result"),
+)
+SHARED_CACHE_LOOKUPS = Counter(
+    "raintoday_shared_cache_lookups_total",
+    "Lookups in the SQLite cache shared by all workers on the host, by cache and result.",
+    ("cache", "result"),
+)
+CACHE_ENTRIES = Callback(
+    "raintoday_cache_entries",
+    "Entries currently held by each in-memory cache.",
+    "gauge",
+    ("cache",),
+)
+THREADPOOL_THREADS = Callback(
+    "raintoday_threadpool_threads",
+    "Worker threads running sync endpoints, by state (busy or limit).",
+    "gauge",
+    ("state",),
+)
@@ -0,0 +1,99 @@
+"""Small in-process caches used by the service layer."""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, List, Optional, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """Thread-safe LRU cache whose entries carry an absolute expiry timestamp.
+
+    Expiry is expressed in the same units as ``clock`` (wall-clock seconds by
+    default) so callers can align entries with external refresh schedules.
+
+    An optional fallback is consulted on misses and returns ``(value,
+    expires_at)`` or ``None``; values it returns are cached like any other.
+    """
+
+    def __init__(self, maxsize: int, clock: Callable[[], float] = time.time) -> None:
+        self.maxsize = max(1, maxsize)
+        self._clock = clock
+        self._entries: "OrderedDict[K, Tuple[V, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._fallback: Optional[Callable[[K], Optional[Tuple[V, float]]]] = None
+
+    def get(self, key: K) -> Optional[V]:
+        """Return the cached value, or ``None`` when missing or expired."""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return value
+                del self._entries[key]
+            fallback = self._fallback
+            if fallback is None:
+                self._misses += 1
+                return None
+        return self._get_fallback(fallback, key, now)
+
+    def _get_fallback(
+        self, fallback: Callable[[K], Optional[Tuple[V, float]]], key: K, now: float
+    ) -> Optional[V]:
+        loaded = fallback(key)
+        if loaded is None or loaded[1] <= now:
+            with self._lock:
+                self._misses += 1
+            return None
+        self.set(key, *loaded)
+        with self._lock:
+            self._hits += 1
+        return loaded[0]
+
+    def set_fallback(self, fallback: Optional[Callable[[K], Optional[Tuple[V, float]]]]) -> None:
+        """Install (or with ``None`` remove) the lookup used on misses."""
+        with self._lock:
+            self._fallback = fallback
+
+    def set(self, key: K, value: V, expires_at: float) -> None:
+        """Store ``value`` until ``expires_at``, evicting the least recently used."""
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every entry and the fallback."""
+        with self._lock:
+            self._entries.clear()
+            self._fallback = None
+
+    def items(self) -> List[Tuple[K, V, float]]:
+        """Unexpired ``(key, value, expires_at)`` entries, least recently used first."""
+        now = self._clock()
+        with self._lock:
+            return [
+                (key, value, expires_at)
+                for key, (value, expires_at) in self._entries.items()
+                if expires_at > now
+            ]
+
+    def stats(self) -> Tuple[int, int, int]:
+        """Return ``(hits, misses, entries)``; hits and misses count since creation."""
+        with self._lock:
+            return self._hits, self._misses, len(self._entries)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
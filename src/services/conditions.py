@@ -0,0 +1,198 @@
+"""Rain condition rules, for one hourly series, any window of it, or a matrix.
+
+A window is "rain" when any hour's probability exceeds 60% or the total
+precipitation exceeds 0.5 mm, "maybe" when the peak probability is above 30%,
+and "no_rain" otherwise. :func:`evaluate_matrix` applies the same rules to
+many locations and every horizon at once, with NumPy when it is installed and
+a pure-Python loop otherwise; both give exactly the scalar results.
+
+Totals use correctly rounded summation (``math.fsum``), so a window of
+0.1 + 0.2 + 0.2 mm is exactly 0.5 mm on every Python version (``sum()``
+changed its rounding in 3.12). The NumPy path sums sequentially and re-sums
+with ``fsum`` only the rows whose total is within rounding error of the
+threshold. :class:`WindowIndex` answers any ``[start, stop)`` window of one
+series in constant time the same way. Inputs must be finite.
+"""
+from __future__ import annotations
+
+import math
+import sys
+from array import array
+from typing import Any, Dict, Iterable, List, Mapping, Sequence, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised when NumPy is absent
+    np = None  # type: ignore[assignment]
+
+RAIN_PROBABILITY = 60.0
+MAYBE_PROBABILITY = 30.0
+RAIN_MM = 0.5
+CONDITIONS = ("rain", "maybe", "no_rain")
+
+# Rows per ``evaluate_matrix`` call below which plain Python is faster than
+# building arrays.
+NUMPY_MIN_ROWS = 32
+
+# Hours per horizon: one count for every row, or one per row.
+Hours = Union[int, Sequence[int]]
+
+
+def _classify(max_prob: float, total_mm: float) -> str:
+    if max_prob > RAIN_PROBABILITY or total_mm > RAIN_MM:
+        return "rain"
+    if MAYBE_PROBABILITY < max_prob <= RAIN_PROBABILITY:
+        return "maybe"
+    return "no_rain"
+
+
+def determine_condition(
+    precip_prob: Iterable[float],
+    precip_mm: Iterable[float],
+) -> Tuple[bool, str]:
+    """Return ``(will_rain, condition)`` for one window of hourly values."""
+    condition = _classify(max(precip_prob, default=0.0), math.fsum(precip_mm))
+    return condition == "rain", condition
+
+
+class WindowIndex:
+    """
+    Constant-time conditions for any window of one pair of hourly series.
+
+    Peak probabilities come from a sparse table (``levels[k][i]`` is the
+    maximum of ``probability[i:i + 2**k]``) and totals from prefix sums; a
+    total within rounding error of the threshold is re-summed exactly, so
+    ``condition(start, stop)`` always equals
+    ``determine_condition(probability[start:stop], precipitation[start:stop])[1]``.
+    """
+
+    __slots__ = ("_probability", "_precipitation", "_levels", "_prefix", "_magnitude")
+
+    def __init__(self, probability: Sequence[float], precipitation: Sequence[float]) -> None:
+        self._probability = probability
+        self._precipitation = precipitation
+        levels: List[Sequence[float]] = [probability]
+        span = 1
+        while 2 * span <= len(probability):
+            previous, count = levels[-1], len(probability) - 2 * span + 1
+            levels.append(array("d", map(max, previous[:count], previous[span:span + count])))
+            span *= 2
+        self._levels = levels
+        prefix = array("d", [0.0])
+        running = 0.0
+        for value in precipitation:
+            running += value
+            prefix.append(running)
+        self._prefix = prefix
+        self._magnitude = math.fsum(map(abs, precipitation))
+
+    def _peak(self, start: int, stop: int) -> float:
+        stop = min(stop, len(self._probability))
+        if stop <= start:
+            return 0.0
+        level = (stop - start).bit_length() - 1
+        values = self._levels[level]
+        return max(values[start], values[stop - (1 << level)])
+
+    def _total(self, start: int, stop: int) -> float:
+        stop = min(stop, len(self._precipitation))
+        if stop <= start:
+            return 0.0
+        total = self._prefix[stop] - self._prefix[start]
+        # Both prefixes are off by at most k * eps/2 * sum(|x|), the difference by one more.
+        if abs(total - RAIN_MM) <= (start + stop + 1) * sys.float_info.epsilon * self._magnitude:
+            return math.fsum(self._precipitation[start:stop])
+        return total
+
+    def condition(self, start: int, stop: int) -> str:
+        """Condition for the hours ``[start, stop)`` (``start >= 0``)."""
+        return _classify(self._peak(start, stop), self._total(start, stop))
+
+
+def _row_hours(hours: Hours, rows: int) -> Sequence[int]:
+    if isinstance(hours, int):
+        return [hours] * rows
+    if len(hours) != rows:
+        raise ValueError("Per-row hours need one entry per location")
+    return hours
+
+
+def _evaluate_python(
+    probability: Sequence[Sequence[float]],
+    precipitation: Sequence[Sequence[float]],
+    horizons: Mapping[str, Hours],
+) -> Dict[str, List[str]]:
+    rows = len(probability)
+    return {
+        name: [
+            _classify(max(prob[:limit], default=0.0), math.fsum(mm[:limit]))
+            for prob, mm, limit in zip(probability, precipitation, _row_hours(hours, rows))
+        ]
+        for name, hours in horizons.items()
+    }
+
+
+def _padded(rows: Sequence[Sequence[float]], width: int, fill: float) -> Any:
+    if all(length == width for length in map(len, rows)):
+        return np.array(rows, dtype=float).reshape(len(rows), width)
+    matrix = np.full((len(rows), width), fill)
+    for index, row in enumerate(rows):
+        matrix[index, :len(row)] = row
+    return matrix
+
+
+def _evaluate_numpy(
+    probability: Sequence[Sequence[float]],
+    precipitation: Sequence[Sequence[float]],
+    horizons: Mapping[str, Hours],
+) -> Dict[str, List[str]]:
+    rows = len(probability)
+    width = max(max(map(len, probability), default=0), max(map(len, precipitation), default=0))
+    # Padding: -inf never wins a max (and classifies like the empty default
+    # of 0), zeros add nothing to a total. The extra leading column is the
+    # empty window.
+    peaks = np.maximum.accumulate(_padded(probability, width, -np.inf), axis=1)
+    amounts = _padded(precipitation, width, 0.0)
+    totals = np.cumsum(amounts, axis=1)
+    magnitudes = np.cumsum(np.abs(amounts), axis=1)
+    peaks, totals, magnitudes = (
+        np.hstack([np.full((rows, 1), fill), matrix])
+        for fill, matrix in ((-np.inf, peaks), (0.0, totals), (0.0, magnitudes))
+    )
+    labels = np.array(["no_rain", "maybe", "rain"])
+    every_row = np.arange(rows)
+
+    results: Dict[str, List[str]] = {}
+    for name, hours in horizons.items():
+        limits = np.clip(np.asarray(_row_hours(hours, rows), dtype=int), 0, width)
+        peak = peaks[every_row, limits]
+        total = totals[every_row, limits]
+        # Sequential summation is off by at most n * eps * sum(|x|).
+        bound = limits * sys.float_info.epsilon * magnitudes[every_row, limits]
+        for row in np.flatnonzero(np.abs(total - RAIN_MM) <= bound):
+            total[row] = math.fsum(precipitation[row][:int(limits[row])])
+        rain = (peak > RAIN_PROBABILITY) | (total > RAIN_MM)
+        maybe = (peak > MAYBE_PROBABILITY) & (peak <= RAIN_PROBABILITY)
+        results[name] = labels[np.where(rain, 2, np.where(maybe, 1, 0))].tolist()
+    return results
+
+
+def evaluate_matrix(
+    probability: Sequence[Sequence[float]],
+    precipitation: Sequence[Sequence[float]],
+    horizons: Mapping[str, Hours],
+) -> Dict[str, List[str]]:
+    """
+    Classify every location for every horizon in one pass.
+
+    ``probability`` and ``precipitation`` hold one hourly row per location
+    (rows may differ in length); a horizon is a number of hours for every
+    row or a sequence with one count per row. Returns
+    ``{horizon: [condition per row]}``, each entry equal to
+    ``determine_condition(prob[:hours], mm[:hours])[1]``.
+    """
+    if len(probability) != len(precipitation):
+        raise ValueError("probability and precipitation need one row per location")
+    if np is None or len(probability) < NUMPY_MIN_ROWS:
+        return _evaluate_python(probability, precipitation, horizons)
+    return _evaluate_numpy(probability, precipitation, horizons)
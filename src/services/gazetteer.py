@@ -0,0 +1,157 @@
+"""Offline city gazetteer with a sorted prefix index for instant lookups.
+
+The index is built from a GeoNames ``cities15000``-style TSV (tab-separated,
+no header; name, ASCII name, latitude, longitude, country code and population
+in columns 2, 3, 5, 6, 9 and 15). A small sample ships in ``data/cities.tsv``;
+``scripts/build_gazetteer.py`` replaces it with the GeoNames extract (the
+Docker image does this at build time), or point ``RAINTODAY_GAZETTEER_PATH``
+at any file in that format. The file is read lazily on first use.
+"""
+from __future__ import annotations
+
+import heapq
+import os
+import threading
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from text_unidecode import unidecode
+
+_NAME, _ASCII_NAME, _LAT, _LON, _COUNTRY, _POPULATION = 1, 2, 4, 5, 8, 14
+
+# (name, ascii_name, lat, lon, country_code, population)
+CityRow = Tuple[str, str, float, float, str, int]
+
+
+def normalize_city_name(city: str) -> str:
+    """Normalize a city name for matching and cache keys.
+
+    Transliterates to ASCII, casefolds and collapses whitespace, so "Zürich",
+    " zurich " and "ZURICH" all map to "zurich".
+    """
+    return " ".join(unidecode(city).casefold().split())
+
+
+def _gazetteer_path() -> Path:
+    default = Path(__file__).resolve().parent.parent.parent / "data" / "cities.tsv"
+    return Path(os.getenv("RAINTODAY_GAZETTEER_PATH", "") or default)
+
+
+class Gazetteer:
+    """Cities in packed parallel arrays plus a sorted list of normalized keys.
+
+    ``_keys[i]`` is a normalized name and ``_refs[i]`` the city it belongs to;
+    keys are ordered by name, then by descending population, so an exact
+    lookup is one bisect and prefix matches form a contiguous slice.
+    """
+
+    def __init__(self, rows: List[CityRow]) -> None:
+        self._names = [row[0] for row in rows]
+        self._countries = [row[4] for row in rows]
+        self._lats = array("d", (row[2] for row in rows))
+        self._lons = array("d", (row[3] for row in rows))
+        self._populations = array("q", (row[5] for row in rows))
+
+        # Both the display name and the ASCII name are searchable.
+        entries = sorted(
+            {
+                (normalize_city_name(alias), -row[5], index)
+                for index, row in enumerate(rows)
+                for alias in (row[0], row[1])
+                if alias
+            }
+        )
+        self._keys = [key for key, _, _ in entries]
+        self._refs = array("l", (index for _, _, index in entries))
+
+    @classmethod
+    def from_tsv(cls, path: Path) -> "Gazetteer":
+        rows: List[CityRow] = []
+        with path.open("r", encoding="utf-8") as handle:
+            for line in handle:
+                row = _parse_line(line)
+                if row is not None:
+                    rows.append(row)
+        return cls(rows)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def lookup(self, query: str) -> Optional[Dict[str, Any]]:
+        """Return the most populous city whose name matches ``query`` exactly."""
+        key = normalize_city_name(query)
+        position = bisect_left(self._keys, key)
+        if position < len(self._keys) and self._keys[position] == key:
+            return self._city(self._refs[position])
+        return None
+
+    def suggest(self, prefix: str, limit: int = 8) -> List[Dict[str, Any]]:
+        """Return up to ``limit`` cities whose names start with ``prefix``.
+
+        Each city lists the normalized names that matched under ``matches``:
+        a city found by its ASCII name may not start with the prefix in its
+        display name, so clients narrowing the list locally filter on these.
+        """
+        key = normalize_city_name(prefix)
+        if not key or limit <= 0:
+            return []
+        matches: Dict[int, List[str]] = {}
+        for position in self._prefix_range(key):
+            matches.setdefault(self._refs[position], []).append(self._keys[position])
+        ranked = heapq.nlargest(limit, matches, key=lambda ref: self._populations[ref])
+        return [{**self._city(ref), "matches": matches[ref]} for ref in ranked]
+
+    def _prefix_range(self, key: str) -> Iterator[int]:
+        position = bisect_left(self._keys, key)
+        while position < len(self._keys) and self._keys[position].startswith(key):
+            yield position
+            position += 1
+
+    def _city(self, ref: int) -> Dict[str, Any]:
+        return {
+            "name": self._names[ref],
+            "country": self._countries[ref],
+            "lat": self._lats[ref],
+            "lon": self._lons[ref],
+            "population": self._populations[ref],
+        }
+
+
+def _parse_line(line: str) -> Optional[CityRow]:
+    columns = line.rstrip("\n").split("\t")
+    if len(columns) <= _POPULATION:
+        return None
+    try:
+        lat, lon = float(columns[_LAT]), float(columns[_LON])
+        population = int(columns[_POPULATION] or 0)
+    except ValueError:
+        return None
+    return (columns[_NAME], columns[_ASCII_NAME], lat, lon, columns[_COUNTRY], population)
+
+
+_index: Optional[Gazetteer] = None
+_index_lock = threading.Lock()
+
+
+def get_gazetteer() -> Gazetteer:
+    """Return the process-wide gazetteer, loading it on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                try:
+                    _index = Gazetteer.from_tsv(_gazetteer_path())
+                except OSError:
+                    _index = Gazetteer([])
+    return _index
+
+
+def lookup_city(query: str) -> Optional[Dict[str, Any]]:
+    """Resolve a city name locally; ``None`` means fall back to the upstream API."""
+    return get_gazetteer().lookup(query)
+
+
+def suggest_cities(prefix: str, limit: int = 8) -> List[Dict[str, Any]]:
+    return get_gazetteer().suggest(prefix, limit)
@@ -1,10 +1,28 @@
 """Geocoding service that wraps calls to the Open-Meteo search API."""
 from __future__ import annotations
 
-from typing import Any, Dict
+import asyncio
+import sqlite3
+import struct
+import time
+from typing import Any, Dict, Optional
 
 import requests
 
+from src import db
+from src.config import env_float, env_int, env_str
+from src.metrics import SHARED_CACHE_LOOKUPS, track_cache
+from src.services import snapshot
+from src.services.cache import TTLCache
+from src.services.gazetteer import lookup_city, normalize_city_name
+from src.services.resilience import (
+    DeadlineExceeded,
+    Upstream,
+    server_deadline,
+    wait_within_deadline,
+)
+from src.services.singleflight import AsyncSingleFlight, SingleFlight
+
 
 class GeocodeServiceError(RuntimeError):
     """Raised when the geocoding service is unavailable or returns invalid data."""
@@ -14,31 +32,64 @@ class CityNotFoundError(GeocodeServiceError):
     """Raised when no results are returned for the provided city name."""
 
 
-_GEOCODE_URL = "https://geocoding-api.open-meteo.com/v1/search"
+_GEOCODE_URL = env_str("RAINTODAY_GEOCODE_URL", "https://geocoding-api.open-meteo.com/v1/search")
 
+# City coordinates practically never change; misses expire sooner so new
+# spellings and upstream fixes are picked up.
+GEOCODE_CACHE_TTL_SECONDS = env_float("RAINTODAY_GEOCODE_CACHE_TTL_SECONDS", 30 * 86400.0)
+GEOCODE_NEGATIVE_TTL_SECONDS = env_float("RAINTODAY_GEOCODE_NEGATIVE_TTL_SECONDS", 3600.0)
+GEOCODE_CACHE_SIZE = env_int("RAINTODAY_GEOCODE_CACHE_SIZE", 4096)
 
-def search_city(city: str) -> Dict[str, Any]:
-    """Lookup city coordinates via Open-Meteo.
+# Cached "city not found" marker, compared by identity.
+_NOT_FOUND: Dict[str, Any] = {}
 
-    Args:
-        city: The name of the city to search for.
+_lookup_cache: TTLCache[str, Dict[str, Any]] = TTLCache(GEOCODE_CACHE_SIZE)
+_lookup_flight: SingleFlight[str, Dict[str, Any]] = SingleFlight()
+_async_lookup_flight: AsyncSingleFlight[str, Dict[str, Any]] = AsyncSingleFlight()
+_upstream = Upstream("geocode")
+_shared_hits = SHARED_CACHE_LOOKUPS.labels("geocode", "hit")
+_shared_misses = SHARED_CACHE_LOOKUPS.labels("geocode", "miss")
+track_cache("geocode", _lookup_cache.stats)
 
-    Raises:
-        CityNotFoundError: When no results are returned.
-        GeocodeServiceError: For network or parsing failures.
-    """
-    params: Dict[str, str | int] = {
+_SNAPSHOT_COORDINATES = struct.Struct("<dd")
+
+
+def _encode_snapshot_entry(entry: Dict[str, Any]) -> bytes:
+    """Coordinates followed by the UTF-8 name; "not found" is an empty value."""
+    if entry is _NOT_FOUND:
+        return b""
+    coordinates = _SNAPSHOT_COORDINATES.pack(float(entry["lat"]), float(entry["lon"]))
+    return coordinates + str(entry["name"]).encode("utf-8")
+
+
+def _decode_snapshot_entry(raw: bytes) -> Dict[str, Any]:
+    if not raw:
+        return _NOT_FOUND
+    lat, lon = _SNAPSHOT_COORDINATES.unpack_from(raw)
+    name = raw[_SNAPSHOT_COORDINATES.size:].decode("utf-8")
+    return {"lat": lat, "lon": lon, "name": name}
+
+
+snapshot.register(snapshot.CacheSection(
+    "geocode",
+    _lookup_cache,
+    lambda key: key.encode("utf-8"),
+    _encode_snapshot_entry,
+    _decode_snapshot_entry,
+))
+
+
+def _build_params(city: str) -> Dict[str, str | int]:
+    return {
         "name": city,
         "count": 1,
         "language": "auto",
         "format": "json",
     }
 
-    try:
-        response = requests.get(_GEOCODE_URL, params=params, timeout=5)
-    except Exception as exc:  # noqa: BLE001
-        raise GeocodeServiceError("Geocoding API error") from exc
 
+def _decode_geocode_response(response: Any, city: str) -> Dict[str, Any]:
+    """Validate an upstream response (requests or httpx) and extract the first match."""
     status_code = getattr(response, "status_code", 200)
     if status_code == 404:
         raise CityNotFoundError(f"City '{city}' not found")
@@ -66,3 +117,123 @@ def search_city(city: str) -> Dict[str, Any]:
         "lon": longitude,
         "name": result.get("name", city),
     }
+
+
+def _load_persisted(key: str) -> Optional[Dict[str, Any]]:
+    """Read the persistent tier and promote hits into the in-memory tier."""
+    try:
+        stored = db.load_geocode(key, time.time())
+    except sqlite3.Error:
+        stored = None
+    if stored is None:
+        _shared_misses.inc()
+        return None
+    _shared_hits.inc()
+    result, expires_at = stored
+    entry = _NOT_FOUND if result is None else result
+    _lookup_cache.set(key, entry, expires_at)
+    return entry
+
+
+def _remember(key: str, entry: Dict[str, Any]) -> None:
+    """Store an upstream outcome in both tiers."""
+    ttl = GEOCODE_NEGATIVE_TTL_SECONDS if entry is _NOT_FOUND else GEOCODE_CACHE_TTL_SECONDS
+    expires_at = time.time() + ttl
+    _lookup_cache.set(key, entry, expires_at)
+    try:
+        db.store_geocode(key, None if entry is _NOT_FOUND else entry, expires_at)
+    except sqlite3.Error:
+        pass  # The persistent tier is best-effort; the in-memory entry still helps.
+
+
+def _unwrap(entry: Dict[str, Any], city: str) -> Dict[str, Any]:
+    if entry is _NOT_FOUND:
+        raise CityNotFoundError(f"City '{city}' not found")
+    return dict(entry)
+
+
+def _decode_or_not_found(response: Any, city: str) -> Dict[str, Any]:
+    try:
+        return _decode_geocode_response(response, city)
+    except CityNotFoundError:
+        return _NOT_FOUND
+
+
+def _lookup_city(key: str, city: str) -> Dict[str, Any]:
+    entry = _load_persisted(key)
+    if entry is not None:
+        return entry
+    try:
+        response = _upstream.call_sync(
+            lambda timeout: requests.get(_GEOCODE_URL, params=_build_params(city), timeout=timeout)
+        )
+    except Exception as exc:  # noqa: BLE001
+        raise GeocodeServiceError("Geocoding API error") from exc
+
+    entry = _decode_or_not_found(response, city)
+    _remember(key, entry)
+    return entry
+
+
+async def _lookup_city_async(key: str, city: str) -> Dict[str, Any]:
+    entry = await asyncio.to_thread(_load_persisted, key)
+    if entry is not None:
+        return entry
+    try:
+        # Shared by every request waiting for the key, so not bound by any one's deadline.
+        with server_deadline():
+            response = await _upstream.get(_GEOCODE_URL, _build_params(city))
+    except Exception as exc:  # noqa: BLE001
+        raise GeocodeServiceError("Geocoding API error") from exc
+
+    entry = _decode_or_not_found(response, city)
+    await asyncio.to_thread(_remember, key, entry)
+    return entry
+
+
+def _local_result(city: str) -> Optional[Dict[str, Any]]:
+    local = lookup_city(city)
+    if local is None:
+        return None
+    return {"lat": local["lat"], "lon": local["lon"], "name": local["name"]}
+
+
+def search_city(city: str) -> Dict[str, Any]:
+    """Lookup city coordinates via the offline gazetteer, then Open-Meteo.
+
+    Upstream results, including "not found", are cached in memory and in
+    SQLite under the normalized name. Concurrent lookups share one upstream
+    request.
+
+    Args:
+        city: The name of the city to search for.
+
+    Raises:
+        CityNotFoundError: When no results are returned.
+        GeocodeServiceError: For network or parsing failures.
+    """
+    local = _local_result(city)
+    if local is not None:
+        return local
+    key = normalize_city_name(city)
+    entry = _lookup_cache.get(key)
+    if entry is None:
+        entry = _lookup_flight.do(key, lambda: _lookup_city(key, city))
+    return _unwrap(entry, city)
+
+
+async def search_city_async(city: str) -> Dict[str, Any]:
+    """Async variant of :func:`search_city` using the shared upstream pools."""
+    local = _local_result(city)
+    if local is not None:
+        return local
+    key = normalize_city_name(city)
+    entry = _lookup_cache.get(key)
+    if entry is None:
+        try:
+            entry = await wait_within_deadline(
+                lambda: _async_lookup_flight.do(key, lambda: _lookup_city_async(key, city))
+            )
+        except DeadlineExceeded as exc:
+            raise GeocodeServiceError("Geocoding API error") from exc
+    return _unwrap(entry, city)
@@ -0,0 +1,84 @@
+"""Shared, connection-pooled HTTP clients for upstream API calls."""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import math
+from typing import Any, List, Mapping, Optional, Tuple
+
+import httpx
+
+from src.config import env_float, env_int
+
+UPSTREAM_TIMEOUT_SECONDS = env_float("RAINTODAY_UPSTREAM_TIMEOUT_SECONDS", 5.0)
+UPSTREAM_CONNECT_TIMEOUT_SECONDS = env_float("RAINTODAY_UPSTREAM_CONNECT_TIMEOUT_SECONDS", 2.0)
+UPSTREAM_MAX_CONNECTIONS = env_int("RAINTODAY_UPSTREAM_MAX_CONNECTIONS", 128)
+# httpcore rescans every connection in a pool for every active request, so the
+# cost per request grows with pool size. Several small pools scale far better
+# than one large one.
+UPSTREAM_POOL_SIZE = env_int("RAINTODAY_UPSTREAM_POOL_SIZE", 8)
+# Drop idle connections before typical server keep-alive timeouts close them.
+UPSTREAM_KEEPALIVE_EXPIRY_SECONDS = env_float("RAINTODAY_UPSTREAM_KEEPALIVE_EXPIRY_SECONDS", 4.0)
+
+Pool = Tuple[httpx.AsyncClient, asyncio.Semaphore]
+
+_pools: List[Pool] = []
+_round_robin = itertools.count()
+
+
+def build_async_client(
+    max_connections: Optional[int] = None,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+) -> httpx.AsyncClient:
+    """Create an async client with the configured pool limits and timeouts."""
+    size = max_connections or UPSTREAM_POOL_SIZE
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(
+            UPSTREAM_TIMEOUT_SECONDS,
+            connect=UPSTREAM_CONNECT_TIMEOUT_SECONDS,
+        ),
+        limits=httpx.Limits(
+            max_connections=size,
+            max_keepalive_connections=size,
+            keepalive_expiry=UPSTREAM_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        transport=transport,
+    )
+
+
+def _get_pools() -> List[Pool]:
+    """Return the app-wide pools, creating them on first use."""
+    if not _pools:
+        size = max(1, UPSTREAM_POOL_SIZE)
+        count = max(1, math.ceil(UPSTREAM_MAX_CONNECTIONS / size))
+        _pools.extend(
+            (build_async_client(size), asyncio.Semaphore(size)) for _ in range(count)
+        )
+    return _pools
+
+
+async def upstream_get(
+    url: str,
+    params: Mapping[str, Any],
+    timeout: Optional[float] = None,
+) -> httpx.Response:
+    """GET through one of the shared pools, optionally with a shorter ``timeout``.
+
+    Callers beyond a pool's size wait on its semaphore, which is cheap, rather
+    than inside the httpx pool queue, which is not.
+    """
+    pools = _get_pools()
+    client, slots = pools[next(_round_robin) % len(pools)]
+    async with slots:
+        if timeout is None:
+            return await client.get(url, params=params)
+        limit = httpx.Timeout(timeout, connect=min(UPSTREAM_CONNECT_TIMEOUT_SECONDS, timeout))
+        return await client.get(url, params=params, timeout=limit)
+
+
+async def close_async_client() -> None:
+    """Close the shared clients and release their pooled connections."""
+    pools = list(_pools)
+    _pools.clear()
+    for client, _ in pools:
+        await client.aclose()
@@ -3,8 +3,13 @@ from __future__ import annotations
 
 import json
 import random
+import threading
+import time
 from pathlib import Path
-from typing import Dict, List
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.config import env_float
+from src.metrics import MESSAGE_RELOADS
 
 _DEFAULT_MESSAGES: Dict[str, List[str]] = {
     "rain": ["YES. Bring an umbrella."],
@@ -12,37 +17,117 @@ _DEFAULT_MESSAGES: Dict[str, List[str]] = {
     "maybe": ["Maybe. The clouds are indecisive."],
 }
 
+# How often the messages file is stat()ed for changes; edits show up within
+# this many seconds without restarting the app.
+MESSAGES_CHECK_INTERVAL_SECONDS = env_float("RAINTODAY_MESSAGES_CHECK_INTERVAL_SECONDS", 2.0)
+
+Catalog = Dict[str, Tuple[str, ...]]
+
+_DEFAULT_CATALOG: Catalog = {key: tuple(value) for key, value in _DEFAULT_MESSAGES.items()}
+_reloads_ok = MESSAGE_RELOADS.labels("ok")
+_reloads_malformed = MESSAGE_RELOADS.labels("malformed")
+_MESSAGES_FILE = Path(__file__).resolve().parent.parent.parent / "data" / "messages.json"
+
+
+class MalformedMessagesError(ValueError):
+    """Raised when the messages file exists but cannot be used."""
+
 
 def _messages_path() -> Path:
     """Resolve the path to the messages configuration file."""
-    return Path(__file__).resolve().parent.parent / "data" / "messages.json"
+    return _MESSAGES_FILE
 
 
-def load_messages() -> Dict[str, List[str]]:
-    """Load condition-specific messages from disk, falling back to defaults."""
+def _read_catalog(path: Path) -> Catalog:
+    """Parse and validate a messages file.
+
+    Entries that are not lists of strings are dropped. A missing file yields
+    the defaults; unreadable or non-object JSON raises
+    :class:`MalformedMessagesError`.
+    """
     try:
-        with _messages_path().open("r", encoding="utf-8") as handle:
+        with path.open("r", encoding="utf-8") as handle:
             data = json.load(handle)
-    except Exception:
-        return _DEFAULT_MESSAGES
+    except FileNotFoundError:
+        return _DEFAULT_CATALOG
+    except (OSError, ValueError) as exc:
+        raise MalformedMessagesError(f"Cannot read {path}") from exc
 
     if not isinstance(data, dict):
-        return _DEFAULT_MESSAGES
+        raise MalformedMessagesError(f"{path} must contain a JSON object")
 
-    filtered: Dict[str, List[str]] = {
-        key: value
+    filtered: Catalog = {
+        key: tuple(value)
         for key, value in data.items()
         if isinstance(value, list) and all(isinstance(item, str) for item in value)
     }
-    return filtered or _DEFAULT_MESSAGES
+    return filtered or _DEFAULT_CATALOG
+
+
+class MessageCatalog:
+    """Parsed messages, revalidated against the file's mtime and size.
+
+    Between checks a lookup is a couple of attribute reads. After the interval
+    one caller stats the file and re-parses it only if it changed; if the new
+    contents are malformed the last good catalog stays in service.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._catalog: Catalog = _DEFAULT_CATALOG
+        self._path: Optional[Path] = None
+        self._signature: Optional[Tuple[int, int]] = None
+        self._next_check = 0.0
+
+    def get(self) -> Catalog:
+        path = _messages_path()
+        if path != self._path or self._clock() >= self._next_check:
+            with self._lock:
+                if path != self._path or self._clock() >= self._next_check:
+                    self._refresh(path)
+        return self._catalog
+
+    def clear(self) -> None:
+        """Forget the loaded catalog so the next lookup reads the file again."""
+        with self._lock:
+            self._catalog = _DEFAULT_CATALOG
+            self._path = None
+            self._signature = None
+            self._next_check = 0.0
+
+    def _refresh(self, path: Path) -> None:
+        try:
+            stat = path.stat()
+            signature: Optional[Tuple[int, int]] = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            signature = None
+
+        if path != self._path or signature != self._signature:
+            try:
+                self._catalog = _read_catalog(path)
+                _reloads_ok.inc()
+            except MalformedMessagesError:
+                _reloads_malformed.inc()  # Keep serving the last good catalog.
+            self._path = path
+            self._signature = signature
+        self._next_check = self._clock() + MESSAGES_CHECK_INTERVAL_SECONDS
+
+
+_catalog = MessageCatalog()
+
+
+def load_messages() -> Dict[str, List[str]]:
+    """Return condition-specific messages from the cached catalog."""
+    return {key: list(value) for key, value in _catalog.get().items()}
 
 
 def pick_message(condition: str) -> str:
     """Return a random message for the provided weather condition."""
-    messages = load_messages()
+    messages = _catalog.get()
     pool = (
         messages.get(condition)
-        or _DEFAULT_MESSAGES.get(condition)
-        or _DEFAULT_MESSAGES["no_rain"]
+        or _DEFAULT_CATALOG.get(condition)
+        or _DEFAULT_CATALOG["no_rain"]
     )
     return random.choice(pool)
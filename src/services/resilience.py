@@ -0,0 +1,355 @@
+"""Deadline budgets, hedged requests and circuit breakers for upstream APIs.
+
+A request handler opens a :func:`deadline` scope; every upstream call made
+under it, including from worker threads (which copy the context), only gets
+the time that is left, so a geocode -> forecast chain shares one budget.
+Work shared between requests (single-flight fetches, background refreshes)
+runs under :func:`server_deadline` instead, and each caller only bounds its
+own wait with :func:`wait_within_deadline`, so an impatient client cannot cut
+a fetch short for everyone else.
+
+Async calls are hedged: when the first attempt has not answered within the
+API's recent p95 latency, another is sent and the first good answer wins.
+Attempts that fail are retried after a jittered, exponentially growing
+backoff while budget remains. Each API has a circuit breaker that opens after
+consecutive failures and fails fast, so callers can fall back to cached data,
+until a single probe request succeeds. Running out of a budget the client
+chose is not held against the upstream: only errors, and timeouts within the
+server's own budget, count as failures.
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Deque,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Set,
+    TypeVar,
+    Union,
+)
+
+import httpx
+
+from src.config import env_float, env_int
+from src.metrics import UPSTREAM_ATTEMPTS, UPSTREAM_CIRCUIT_OPEN, UpstreamMetrics
+from src.services.http import UPSTREAM_TIMEOUT_SECONDS, upstream_get
+
+# Total upstream time one API request may spend; clients can ask for less.
+REQUEST_BUDGET_SECONDS = env_float("RAINTODAY_REQUEST_BUDGET_SECONDS", 4.0)
+# Attempts per upstream call, counting hedges and retries; 1 disables both.
+HEDGE_MAX_ATTEMPTS = env_int("RAINTODAY_HEDGE_MAX_ATTEMPTS", 2)
+# Bounds on the p95-derived hedge delay; the maximum also applies until
+# enough latencies have been seen.
+HEDGE_MIN_DELAY_SECONDS = env_float("RAINTODAY_HEDGE_MIN_DELAY_SECONDS", 0.05)
+HEDGE_MAX_DELAY_SECONDS = env_float("RAINTODAY_HEDGE_MAX_DELAY_SECONDS", 1.0)
+# Consecutive failures that open a breaker (0 disables it), and how long it
+# stays open before one probe request is let through.
+BREAKER_FAILURE_THRESHOLD = env_int("RAINTODAY_BREAKER_FAILURES", 5)
+BREAKER_RESET_SECONDS = env_float("RAINTODAY_BREAKER_RESET_SECONDS", 30.0)
+
+LATENCY_WINDOW = 256
+LATENCY_MIN_SAMPLES = 20
+
+T = TypeVar("T")
+
+
+class _Scope(NamedTuple):
+    expires: float
+    # Set when a client asked for less than the server's budget.
+    caller_bound: bool
+
+
+_deadline: ContextVar[Optional[_Scope]] = ContextVar("raintoday_deadline", default=None)
+
+
+class UpstreamUnavailable(RuntimeError):
+    """Raised when an upstream call is not attempted at all."""
+
+
+class DeadlineExceeded(UpstreamUnavailable):
+    """Raised when the request's time budget has run out."""
+
+
+class CircuitOpenError(UpstreamUnavailable):
+    """Raised while an upstream API's circuit breaker is open."""
+
+
+def request_budget(requested_ms: Optional[int]) -> float:
+    """Seconds allowed for a request, honouring a smaller client-supplied budget."""
+    if requested_ms is None:
+        return REQUEST_BUDGET_SECONDS
+    return min(REQUEST_BUDGET_SECONDS, max(requested_ms, 0) / 1000)
+
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[None]:
+    """Limit upstream calls inside the block to ``seconds``; nested scopes only shrink it."""
+    scope = _Scope(time.monotonic() + seconds, seconds < REQUEST_BUDGET_SECONDS)
+    current = _deadline.get()
+    token = _deadline.set(scope if current is None or scope.expires < current.expires else current)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def server_deadline() -> Iterator[None]:
+    """Run the block on the server's own full budget, whatever the caller's deadline."""
+    token = _deadline.set(_Scope(time.monotonic() + REQUEST_BUDGET_SECONDS, False))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current deadline scope, or ``None`` outside of one."""
+    scope = _deadline.get()
+    return None if scope is None else scope.expires - time.monotonic()
+
+
+def _caller_out_of_time() -> bool:
+    """Whether a budget the client chose has run out, which makes a failure now its doing."""
+    scope = _deadline.get()
+    return scope is not None and scope.caller_bound and scope.expires <= time.monotonic()
+
+
+async def wait_within_deadline(start: Callable[[], Awaitable[T]]) -> T:
+    """
+    Await shared work, ``start()``, for no longer than the current deadline.
+
+    The work itself is not cancelled when the wait gives up, so it must run
+    as its own task (``AsyncSingleFlight`` does). With no budget left it is
+    not started at all.
+    """
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded("Request budget exhausted")
+    scope = asyncio.timeout(left)
+    try:
+        async with scope:
+            return await start()
+    except TimeoutError as exc:
+        if not scope.expired():
+            raise
+        raise DeadlineExceeded("Request budget exhausted") from exc
+
+
+def attempt_timeout() -> float:
+    """Timeout for one upstream attempt: the configured one, cut to the budget left."""
+    left = remaining()
+    if left is None:
+        return UPSTREAM_TIMEOUT_SECONDS
+    if left <= 0:
+        raise DeadlineExceeded("Request budget exhausted")
+    return min(UPSTREAM_TIMEOUT_SECONDS, left)
+
+
+def _jittered(seconds: float) -> float:
+    return seconds * random.uniform(0.5, 1.5)
+
+
+def _discard_outcome(task: asyncio.Task[Any]) -> None:
+    # Losing hedges are cancelled; mark any error they raised first as seen.
+    if not task.cancelled():
+        task.exception()
+
+
+def _retryable(status_code: int) -> bool:
+    return status_code >= 500 or status_code == 429
+
+
+class CircuitBreaker:
+    """Opens after ``threshold`` consecutive failures; probes once every ``reset_seconds``."""
+
+    def __init__(self, threshold: int, reset_seconds: float) -> None:
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return self._opened_at is not None
+
+    def allow(self) -> None:
+        """Raise :class:`CircuitOpenError` unless a request may go out now."""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if self._probing or time.monotonic() - self._opened_at < self.reset_seconds:
+                raise CircuitOpenError("Upstream circuit is open")
+            self._probing = True
+
+    def record(self, ok: bool) -> None:
+        with self._lock:
+            self._probing = False
+            if ok:
+                self._failures, self._opened_at = 0, None
+                return
+            self._failures += 1
+            probe_failed = self._opened_at is not None
+            if self.threshold > 0 and (probe_failed or self._failures >= self.threshold):
+                self._opened_at = time.monotonic()
+
+    def abandon(self) -> None:
+        """Forget an allowed request that was cancelled before it had an outcome."""
+        with self._lock:
+            self._probing = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self._failures, self._opened_at, self._probing = 0, None, False
+
+
+class Upstream:
+    """Deadline-aware, hedged and circuit-broken access to one upstream API."""
+
+    def __init__(self, api: str) -> None:
+        self.api = api
+        self.breaker = CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_SECONDS)
+        self._metrics = UpstreamMetrics(api)
+        self._hedges = UPSTREAM_ATTEMPTS.labels(api, "hedge")
+        self._retries = UPSTREAM_ATTEMPTS.labels(api, "retry")
+        self._lock = threading.Lock()
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        UPSTREAM_CIRCUIT_OPEN.add(lambda: (((api,), int(self.breaker.is_open)),))
+
+    def hedge_delay(self) -> float:
+        """Recent p95 latency of successful calls, clamped to the configured bounds."""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < LATENCY_MIN_SAMPLES:
+            return HEDGE_MAX_DELAY_SECONDS
+        rank = -(-len(samples) * 95 // 100)  # Nearest rank, ceil(0.95 * n).
+        return min(max(samples[rank - 1], HEDGE_MIN_DELAY_SECONDS), HEDGE_MAX_DELAY_SECONDS)
+
+    def _record_failure(self) -> None:
+        if _caller_out_of_time():
+            self.breaker.abandon()
+        else:
+            self.breaker.record(False)
+
+    def _observe(self, started: float, status_code: Optional[int]) -> None:
+        self._metrics.record(started, status_code)
+        if status_code is not None and not _retryable(status_code):
+            with self._lock:
+                self._latencies.append(time.perf_counter() - started)
+
+    def call_sync(self, send: Callable[[float], Any]) -> Any:
+        """Make one blocking request, ``send(timeout)``, within the deadline and the breaker."""
+        timeout = attempt_timeout()
+        self.breaker.allow()
+        started = time.perf_counter()
+        try:
+            response = send(timeout)
+        except Exception:
+            self._observe(started, None)
+            self._record_failure()
+            raise
+        except BaseException:
+            self.breaker.abandon()
+            raise
+        status_code = getattr(response, "status_code", 200)
+        self._observe(started, status_code)
+        self.breaker.record(not _retryable(status_code))
+        return response
+
+    async def get(self, url: str, params: Mapping[str, Any]) -> httpx.Response:
+        """GET through the shared pools, hedged and retried within the deadline."""
+        attempt_timeout()
+        self.breaker.allow()
+        try:
+            async with asyncio.timeout(remaining()):
+                response = await self._hedged(url, params)
+        except asyncio.CancelledError:
+            self.breaker.abandon()
+            raise
+        except TimeoutError as exc:
+            self._record_failure()
+            raise DeadlineExceeded("Request budget exhausted") from exc
+        except Exception:
+            self._record_failure()
+            raise
+        self.breaker.record(not _retryable(response.status_code))
+        return response
+
+    async def _attempt(self, url: str, params: Mapping[str, Any]) -> httpx.Response:
+        started = time.perf_counter()
+        try:
+            response = await upstream_get(url, params, timeout=attempt_timeout())
+        except Exception:
+            self._observe(started, None)
+            raise
+        self._observe(started, response.status_code)
+        return response
+
+    async def _hedged(self, url: str, params: Mapping[str, Any]) -> httpx.Response:
+        attempts = max(1, HEDGE_MAX_ATTEMPTS)
+        delay = self.hedge_delay()
+        pending: Set[asyncio.Task[httpx.Response]] = set()
+        failures: List[Union[httpx.Response, BaseException]] = []
+        try:
+            for attempt in range(attempts):
+                if attempt:
+                    if not pending:
+                        # Everything in flight failed: back off, then retry.
+                        await asyncio.sleep(_jittered(HEDGE_MIN_DELAY_SECONDS * 2 ** attempt))
+                        self._retries.inc()
+                    else:
+                        self._hedges.inc()
+                pending.add(asyncio.ensure_future(self._attempt(url, params)))
+                last = attempt + 1 == attempts
+                hedge_after = None if last else _jittered(delay * 2 ** attempt)
+                response = await self._first_success(pending, hedge_after, failures)
+                if response is not None:
+                    return response
+        finally:
+            for task in pending:
+                task.cancel()
+                task.add_done_callback(_discard_outcome)
+        outcome = failures[-1]
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    @staticmethod
+    async def _first_success(
+        pending: Set[asyncio.Task[httpx.Response]],
+        timeout: Optional[float],
+        failures: List[Union[httpx.Response, BaseException]],
+    ) -> Optional[httpx.Response]:
+        """Wait for a good response; ``None`` on timeout or once everything pending failed."""
+        stop_at = None if timeout is None else time.monotonic() + timeout
+        while pending:
+            wait = None if stop_at is None else max(0.0, stop_at - time.monotonic())
+            done, _ = await asyncio.wait(pending, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                return None
+            for task in done:
+                pending.discard(task)
+                error = task.exception()
+                if error is not None:
+                    failures.append(error)
+                elif _retryable(task.result().status_code):
+                    failures.append(task.result())
+                else:
+                    return task.result()
+        return None
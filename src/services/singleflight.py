@@ -0,0 +1,80 @@
+"""Coalesce concurrent identical upstream calls into one in-flight request."""
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Awaitable, Callable, Dict, Generic, Hashable, Optional, TypeVar, cast
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class _Call(Generic[V]):
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Optional[V] = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight(Generic[K, V]):
+    """Thread-based single-flight group.
+
+    The first caller for a key runs ``fn``; callers arriving while it is in
+    flight block and receive the same result, or the same exception.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[K, _Call[V]] = {}
+
+    def do(self, key: K, fn: Callable[[], V]) -> V:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return cast(V, call.result)
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class AsyncSingleFlight(Generic[K, V]):
+    """Event-loop single-flight group.
+
+    The shared call runs as its own task, so a cancelled caller (for example a
+    disconnected client) does not cancel the fetch for everyone else.
+    """
+
+    def __init__(self) -> None:
+        self._tasks: Dict[K, "asyncio.Task[V]"] = {}
+
+    async def do(self, key: K, fn: Callable[[], Awaitable[V]]) -> V:
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: K, task: "asyncio.Task[V]") -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved even if every waiter went away.
+            task.exception()
@@ -0,0 +1,240 @@
+"""Warm restarts: save the in-memory caches on shutdown, reload them on startup.
+
+File layout (little endian), version 1::
+
+    header   magic b"RTCS", version u16, section count u16, created_at f64
+    section  name length u16, name (UTF-8), entry count u32, entries
+    entry    expires_at f64, key length u16, value length u32, key, value
+
+Each cache registers a :class:`CacheSection` that encodes its keys and values.
+Loading memory-maps the file and only indexes it, skipping expired entries;
+an entry is decoded the first time its cache misses on that key. Startup
+cost is therefore one pass over small fixed-size headers, however many
+entries the snapshot holds. The snapshot is a best-effort optimization: a
+missing, truncated or foreign file is ignored.
+"""
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Any, Callable, Dict, Generic, Hashable, List, Optional, Tuple, TypeVar
+
+from src.services.cache import TTLCache
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+CACHE_SNAPSHOT_PATH = "data/cache.snapshot"
+
+MAGIC = b"RTCS"
+VERSION = 1
+_HEADER = struct.Struct("<4sHHd")
+_NAME_LENGTH = struct.Struct("<H")
+_ENTRY_COUNT = struct.Struct("<I")
+_ENTRY = struct.Struct("<dHI")
+
+# value offset, value length, expires_at
+_Location = Tuple[int, int, float]
+
+
+class SnapshotError(ValueError):
+    """Raised when a snapshot file has the wrong format or version."""
+
+
+class _MappedFile:
+    """A read-only mapping shared by every section, closed when all are done."""
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as handle:
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        self._lock = threading.Lock()
+        self._users = 0
+
+    def __len__(self) -> int:
+        return len(self._map)
+
+    def unpack(self, layout: struct.Struct, offset: int) -> Tuple[Any, ...]:
+        return layout.unpack_from(self._map, offset)
+
+    def read(self, offset: int, length: int) -> bytes:
+        if offset + length > len(self._map):
+            raise SnapshotError("Snapshot is truncated")
+        return self._map[offset:offset + length]
+
+    def acquire(self) -> None:
+        with self._lock:
+            self._users += 1
+
+    def release(self) -> None:
+        with self._lock:
+            self._users -= 1
+            if self._users <= 0:
+                self._map.close()
+
+    def close(self) -> None:
+        self._map.close()
+
+
+class CacheSection(Generic[K, V]):
+    """How one :class:`TTLCache` is written to and lazily restored from a snapshot."""
+
+    def __init__(
+        self,
+        name: str,
+        cache: TTLCache[K, V],
+        encode_key: Callable[[K], bytes],
+        encode_value: Callable[[V], bytes],
+        decode_value: Callable[[bytes], V],
+    ) -> None:
+        self.name = name
+        self.cache = cache
+        self._encode_key = encode_key
+        self._encode_value = encode_value
+        self._decode_value = decode_value
+        self._lock = threading.Lock()
+        self._file: Optional[_MappedFile] = None
+        self._index: Dict[bytes, _Location] = {}
+
+    def attach(self, mapped: _MappedFile, index: Dict[bytes, _Location]) -> None:
+        """Serve misses from ``index`` until every indexed entry has been taken."""
+        self.detach()
+        if not index:
+            return
+        mapped.acquire()
+        with self._lock:
+            self._file, self._index = mapped, index
+        self.cache.set_fallback(self._take)
+
+    def detach(self) -> None:
+        with self._lock:
+            mapped, self._file, self._index = self._file, None, {}
+        if mapped is not None:
+            self.cache.set_fallback(None)
+            mapped.release()
+
+    def _take(self, key: K) -> Optional[Tuple[V, float]]:
+        raw_key = self._encode_key(key)
+        with self._lock:
+            location = self._index.pop(raw_key, None)
+            mapped, exhausted = self._file, not self._index
+            if location is None or mapped is None:
+                return None
+            try:
+                raw_value = mapped.read(location[0], location[1])
+            except (SnapshotError, ValueError):
+                return None
+        if exhausted:
+            self.detach()
+        try:
+            return self._decode_value(raw_value), location[2]
+        except (SnapshotError, ValueError, struct.error):
+            return None
+
+    def entries(self, now: float) -> List[Tuple[bytes, bytes, float]]:
+        """Encoded unexpired entries: untouched snapshot ones, then the live cache."""
+        merged: Dict[bytes, Tuple[bytes, float]] = {}
+        with self._lock:
+            if self._file is not None:
+                for raw_key, (offset, length, expires_at) in self._index.items():
+                    if expires_at > now:
+                        merged[raw_key] = (self._file.read(offset, length), expires_at)
+        for key, value, expires_at in self.cache.items():
+            merged[self._encode_key(key)] = (self._encode_value(value), expires_at)
+        return [(raw_key, value[0], value[1]) for raw_key, value in merged.items()]
+
+
+_sections: Dict[str, CacheSection[Any, Any]] = {}
+
+
+def register(section: CacheSection[Any, Any]) -> None:
+    """Include a cache in snapshots (services call this at import time)."""
+    _sections[section.name] = section
+
+
+def _index_file(mapped: _MappedFile, now: float) -> Dict[str, Dict[bytes, _Location]]:
+    magic, version, section_count, _ = mapped.unpack(_HEADER, 0)
+    if magic != MAGIC:
+        raise SnapshotError("Not a cache snapshot")
+    if version != VERSION:
+        raise SnapshotError(f"Unsupported snapshot version {version}")
+    offset = _HEADER.size
+    indexes: Dict[str, Dict[bytes, _Location]] = {}
+    for _ in range(section_count):
+        (name_length,) = mapped.unpack(_NAME_LENGTH, offset)
+        name = mapped.read(offset + _NAME_LENGTH.size, name_length).decode("utf-8")
+        offset += _NAME_LENGTH.size + name_length
+        (count,) = mapped.unpack(_ENTRY_COUNT, offset)
+        offset += _ENTRY_COUNT.size
+        index = indexes.setdefault(name, {})
+        for _ in range(count):
+            expires_at, key_length, value_length = mapped.unpack(_ENTRY, offset)
+            key_offset = offset + _ENTRY.size
+            offset = key_offset + key_length + value_length
+            if expires_at > now:
+                index[mapped.read(key_offset, key_length)] = (
+                    key_offset + key_length, value_length, expires_at,
+                )
+    if offset > len(mapped):
+        raise SnapshotError("Snapshot is truncated")
+    return indexes
+
+
+def load_caches(path: Optional[str] = None) -> int:
+    """
+    Attach the snapshot at ``path`` to the registered caches.
+
+    Returns the number of unexpired entries made available; a missing or
+    unusable snapshot yields 0 and the caches simply start cold.
+    """
+    try:
+        mapped = _MappedFile(path or CACHE_SNAPSHOT_PATH)
+    except (OSError, ValueError):
+        return 0  # Missing or empty file.
+    try:
+        indexes = _index_file(mapped, time.time())
+    except (SnapshotError, struct.error, UnicodeDecodeError):
+        mapped.close()
+        return 0
+
+    mapped.acquire()  # Held until every section has attached.
+    available = 0
+    for name, section in _sections.items():
+        index = indexes.get(name, {})
+        section.attach(mapped, index)
+        available += len(index)
+    mapped.release()
+    return available
+
+
+def save_caches(path: Optional[str] = None) -> int:
+    """
+    Write every registered cache to ``path`` and return the number of entries.
+
+    Entries from a previously loaded snapshot that were never requested are
+    carried over. The file is written next to the target and renamed into
+    place, so concurrent workers and readers never see a partial snapshot.
+    """
+    path = path or CACHE_SNAPSHOT_PATH
+    now = time.time()
+    sections = [(name, section.entries(now)) for name, section in _sections.items()]
+    for section in _sections.values():
+        section.detach()  # Unmap the old file before it is replaced.
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as handle:
+        handle.write(_HEADER.pack(MAGIC, VERSION, len(sections), now))
+        for name, entries in sections:
+            encoded_name = name.encode("utf-8")
+            handle.write(_NAME_LENGTH.pack(len(encoded_name)) + encoded_name)
+            handle.write(_ENTRY_COUNT.pack(len(entries)))
+            for raw_key, raw_value, expires_at in entries:
+                handle.write(_ENTRY.pack(expires_at, len(raw_key), len(raw_value)))
+                handle.write(raw_key)
+                handle.write(raw_value)
+    os.replace(temporary, path)
+    return sum(len(entries) for _, entries in sections)
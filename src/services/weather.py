@@ -1,11 +1,56 @@
 """Weather service utilities built on top of Open-Meteo."""
 from __future__ import annotations
 
-from typing import Any, Dict, Iterable, Tuple
+import asyncio
+import math
+import re
+import sqlite3
+import sys
+import struct
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing
+from datetime import datetime, time as dt_time, timedelta, timezone, tzinfo
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 import requests
 
+from src import db
+from src.config import env_float, env_int, env_str
+from src.metrics import SHARED_CACHE_LOOKUPS, STALE_FORECASTS_SERVED, track_cache
+from src.services.cache import TTLCache
+from src.services.conditions import (
+    CONDITIONS,
+    MAYBE_PROBABILITY,
+    RAIN_MM,
+    RAIN_PROBABILITY,
+    WindowIndex,
+    evaluate_matrix,
+)
+from src.services import snapshot
 from src.services.messages import pick_message
+from src.services.resilience import (
+    DeadlineExceeded,
+    Upstream,
+    server_deadline,
+    wait_within_deadline,
+)
+from src.services.singleflight import AsyncSingleFlight, SingleFlight
 
 
 class WeatherServiceError(RuntimeError):
@@ -18,83 +63,939 @@ _HORIZON_MAP: Dict[str, int] = {
     "3h": 3,
     "6h": 6,
 }
+_HOURS_HORIZON = re.compile(r"([1-9][0-9]{0,3})h")
 
-_WEATHER_URL = "https://api.open-meteo.com/v1/forecast"
+# Overridable so load tests can point at a local stand-in (benchmarks/stub_upstream.py).
+_WEATHER_URL = env_str("RAINTODAY_WEATHER_URL", "https://api.open-meteo.com/v1/forecast")
+
+# Forecasts are cached per grid cell; nearby coordinates share one upstream fetch.
+FORECAST_GRID_RESOLUTION = env_float("RAINTODAY_FORECAST_GRID_DEGREES", 0.05)
+# Open-Meteo refreshes its models hourly, so entries never outlive the current hour.
+FORECAST_TTL_SECONDS = env_float("RAINTODAY_FORECAST_TTL_SECONDS", 3600.0)
+FORECAST_CACHE_SIZE = env_int("RAINTODAY_FORECAST_CACHE_SIZE", 2048)
+# Past expiry, a cached forecast is still served for this long while one
+# background refresh runs; after that requests wait for a fresh fetch.
+FORECAST_STALE_SECONDS = env_float("RAINTODAY_FORECAST_STALE_SECONDS", 600.0)
+# While Open-Meteo is failing, forecasts up to this far past expiry are
+# served instead of an error.
+FORECAST_STALE_IF_ERROR_SECONDS = env_float("RAINTODAY_FORECAST_STALE_IF_ERROR_SECONDS", 3 * 3600.0)
+# Threads refreshing stale forecasts for the sync API.
+FORECAST_REVALIDATE_WORKERS = 4
+# Two days, so horizons starting late in the local day still have hours ahead.
+FORECAST_DAYS = env_int("RAINTODAY_FORECAST_DAYS", 2)
+# Longest "<N>h" horizon; windows are cut short where the forecast ends.
+MAX_HORIZON_HOURS = 24 * FORECAST_DAYS
+# Batch requests ask Open-Meteo for many coordinates per call; the chunk size
+# keeps URLs reasonably short and the cap bounds upstream load per batch.
+BATCH_CHUNK_SIZE = env_int("RAINTODAY_BATCH_CHUNK_SIZE", 50)
+BATCH_MAX_CONCURRENCY = env_int("RAINTODAY_BATCH_MAX_CONCURRENCY", 4)
+# Parsed series are kept in whole percent and hundredths of a millimetre, the
+# units /forecast sends, so clients summing them as integers reach the same
+# answer as /rain. Open-Meteo's own steps (1 %, 0.1 mm) are unchanged.
+COMPACT_PROBABILITY_SCALE = 1
+COMPACT_PRECIPITATION_SCALE = 100
+
+GridCell = Tuple[int, int]
+# (lat, lon, horizon) as sent by the client.
+RainQuery = Tuple[float, float, str]
+
+
+class HourlyForecast:
+    """Hourly precipitation series for one grid cell, covering every horizon.
+
+    Both series live in one packed ``array('d')``, probabilities first, a
+    fraction of the memory of float tuples. The series attributes are
+    zero-copy memoryviews, so ``forecast.precipitation[:hours]`` does not copy.
+    ``start_time`` is the Unix time of the first hour and ``timezone`` the
+    location's IANA zone, when the payload had them. The window index is
+    built on first use. Instances must not be modified once cached.
+    """
+
+    __slots__ = ("_values", "_split", "utc_offset_seconds", "start_time", "timezone", "_windows")
+
+    def __init__(
+        self,
+        precipitation_probability: Iterable[float],
+        precipitation: Iterable[float],
+        utc_offset_seconds: int = 0,
+        start_time: Optional[float] = None,
+        timezone: Optional[str] = None,
+    ) -> None:
+        self._values = array("d", precipitation_probability)
+        self._split = len(self._values)
+        self._values.extend(precipitation)
+        self.utc_offset_seconds = utc_offset_seconds
+        self.start_time = start_time
+        self.timezone = timezone
+        self._windows: Optional[WindowIndex] = None
+
+    @classmethod
+    def from_packed(
+        cls,
+        values: array[float],
+        split: int,
+        utc_offset_seconds: int = 0,
+        start_time: Optional[float] = None,
+        timezone: Optional[str] = None,
+    ) -> HourlyForecast:
+        """Wrap ``values`` without copying: probabilities, then precipitation from ``split``."""
+        forecast = cls.__new__(cls)
+        forecast._values, forecast._split = values, split
+        forecast.utc_offset_seconds, forecast.start_time = utc_offset_seconds, start_time
+        forecast.timezone, forecast._windows = timezone, None
+        return forecast
+
+    @property
+    def precipitation_probability(self) -> memoryview:
+        return memoryview(self._values)[:self._split]
+
+    @property
+    def precipitation(self) -> memoryview:
+        return memoryview(self._values)[self._split:]
+
+    def __len__(self) -> int:
+        """Hours covered by the longer of the two series."""
+        return max(self._split, len(self._values) - self._split)
+
+    def windows(self) -> WindowIndex:
+        """Constant-time conditions for any ``[start, stop)`` range of hours."""
+        windows = self._windows
+        if windows is None:
+            # Concurrent first calls may both build it; either result is the same.
+            windows = WindowIndex(self.precipitation_probability, self.precipitation)
+            self._windows = windows
+        return windows
+
+    def packed(self) -> array[float]:
+        """The shared buffer: probabilities followed by precipitation."""
+        return self._values
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, HourlyForecast):
+            return NotImplemented
+        return (
+            self._split == other._split
+            and self._values == other._values
+            and self.utc_offset_seconds == other.utc_offset_seconds
+            and self.start_time == other.start_time
+            and self.timezone == other.timezone
+        )
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return (
+            f"HourlyForecast({self.precipitation_probability.tolist()!r}, "
+            f"{self.precipitation.tolist()!r}, {self.utc_offset_seconds!r}, "
+            f"{self.start_time!r}, {self.timezone!r})"
+        )
+
+
+# (forecast, fresh_until). The cache keeps entries past ``fresh_until`` for
+# as long as they may still be served stale.
+CachedForecast = Tuple[HourlyForecast, float]
+
+_forecast_cache: TTLCache[GridCell, CachedForecast] = TTLCache(FORECAST_CACHE_SIZE)
+_forecast_flight: SingleFlight[GridCell, CachedForecast] = SingleFlight()
+_async_forecast_flight: AsyncSingleFlight[GridCell, CachedForecast] = AsyncSingleFlight()
+_upstream = Upstream("forecast")
+_served_while_revalidating = STALE_FORECASTS_SERVED.labels("revalidating")
+_served_on_error = STALE_FORECASTS_SERVED.labels("upstream_error")
+_shared_hits = SHARED_CACHE_LOOKUPS.labels("forecast", "hit")
+_shared_misses = SHARED_CACHE_LOOKUPS.labels("forecast", "miss")
+track_cache("forecast", _forecast_cache.stats)
+
+_SNAPSHOT_CELL = struct.Struct("<ii")
+# fresh_until, start_time (NaN when unknown), utc_offset_seconds, the
+# probability, precipitation and timezone name lengths; then the timezone
+# name (UTF-8) and the packed series.
+_SNAPSHOT_FORECAST = struct.Struct("<ddiIIH")
+
+
+def _encode_snapshot_entry(entry: CachedForecast) -> bytes:
+    forecast, fresh_until = entry
+    start_time = math.nan if forecast.start_time is None else forecast.start_time
+    zone = (forecast.timezone or "").encode("utf-8")
+    header = _SNAPSHOT_FORECAST.pack(
+        fresh_until,
+        start_time,
+        forecast.utc_offset_seconds,
+        len(forecast.precipitation_probability),
+        len(forecast.precipitation),
+        len(zone),
+    )
+    values = forecast.packed()
+    if sys.byteorder == "big":
+        values = array("d", values)
+        values.byteswap()
+    return header + zone + values.tobytes()
+
+
+def _decode_snapshot_entry(raw: bytes) -> CachedForecast:
+    fresh_until, start_time, offset, probability_count, precipitation_count, zone_length = (
+        _SNAPSHOT_FORECAST.unpack_from(raw)
+    )
+    series_offset = _SNAPSHOT_FORECAST.size + zone_length
+    zone = raw[_SNAPSHOT_FORECAST.size:series_offset].decode("utf-8")
+    values = array("d")
+    values.frombytes(raw[series_offset:])
+    if len(values) != probability_count + precipitation_count:
+        raise ValueError("Forecast entry has the wrong length")
+    if sys.byteorder == "big":
+        values.byteswap()
+    forecast = HourlyForecast.from_packed(
+        values,
+        probability_count,
+        offset,
+        None if math.isnan(start_time) else start_time,
+        sys.intern(zone) if zone else None,
+    )
+    return forecast, fresh_until
+
+
+# Cells only mean the same place at the same grid size, so it names the
+# section, as does the entry layout version so older entries are not misread.
+_ENTRY_FORMAT = f"forecast.v3@{FORECAST_GRID_RESOLUTION!r}"
+snapshot.register(snapshot.CacheSection(
+    _ENTRY_FORMAT,
+    _forecast_cache,
+    lambda cell: _SNAPSHOT_CELL.pack(*cell),
+    _encode_snapshot_entry,
+    _decode_snapshot_entry,
+))
+
+# Cells with a background refresh queued or running, shared by both APIs.
+_revalidating: Set[GridCell] = set()
+_revalidating_lock = threading.Lock()
+_revalidator: Optional[ThreadPoolExecutor] = None
+# Strong references; the event loop only keeps weak ones to running tasks.
+_revalidation_tasks: "Set[asyncio.Task[None]]" = set()
 
 
 def _resolve_horizon(horizon: str) -> Tuple[str, int]:
-    """Return the canonical horizon name and hours window."""
+    """Return the canonical horizon name and hours window.
+
+    Besides the named horizons any ``<N>h`` is accepted, capped at
+    ``MAX_HORIZON_HOURS``; anything else means "today".
+    """
     if horizon in _HORIZON_MAP:
         return horizon, _HORIZON_MAP[horizon]
+    match = _HOURS_HORIZON.fullmatch(horizon)
+    if match:
+        hours = min(int(match.group(1)), MAX_HORIZON_HOURS)
+        return f"{hours}h", hours
     return "today", _HORIZON_MAP["today"]
 
 
+def _zone(forecast: HourlyForecast) -> tzinfo:
+    """The location's timezone, or its fixed UTC offset when the zone is unknown here."""
+    if forecast.timezone:
+        try:
+            return ZoneInfo(forecast.timezone)
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    return timezone(timedelta(seconds=forecast.utc_offset_seconds))
+
+
+def _current_hour(forecast: HourlyForecast, now: float) -> int:
+    """Index of the hour containing ``now``; 0 for forecasts without a time axis."""
+    if forecast.start_time is None:
+        return 0
+    # Open-Meteo applies one UTC offset to the whole response, so the hourly
+    # axis is uniform and the index is plain arithmetic.
+    return min(max(int((now - forecast.start_time) // 3600), 0), len(forecast))
+
+
+def _window_end(
+    forecast: HourlyForecast,
+    horizon_name: str,
+    hours: int,
+    now: float,
+    start: int,
+) -> int:
+    """End (exclusive) of the window starting at hour ``start``.
+
+    "today" runs to the next local midnight in the location's own timezone,
+    so it covers 23 or 25 hours on DST change days. Forecasts without a time
+    axis are read from their first hour, as they were before anchoring.
+    """
+    if forecast.start_time is None:
+        return hours
+    if horizon_name == "today":
+        local = datetime.fromtimestamp(now, _zone(forecast))
+        midnight = datetime.combine(local.date() + timedelta(days=1), dt_time(), local.tzinfo)
+        stop = math.ceil((midnight.timestamp() - forecast.start_time) / 3600)
+    else:
+        stop = start + hours
+    return max(start, min(stop, len(forecast)))
+
+
+def _grid_cell(lat: float, lon: float) -> GridCell:
+    """Quantize coordinates onto the forecast cache grid."""
+    return (
+        round(lat / FORECAST_GRID_RESOLUTION),
+        round(lon / FORECAST_GRID_RESOLUTION),
+    )
+
+
+def _cell_center(cell: GridCell) -> Tuple[float, float]:
+    return (
+        round(cell[0] * FORECAST_GRID_RESOLUTION, 4),
+        round(cell[1] * FORECAST_GRID_RESOLUTION, 4),
+    )
+
+
+def _forecast_expiry(now: float) -> float:
+    """Expire at the next top of the hour, or after the TTL if that is sooner."""
+    next_model_run = (now // 3600 + 1) * 3600
+    return min(now + FORECAST_TTL_SECONDS, next_model_run)
+
+
 def _build_params(lat: float, lon: float) -> Dict[str, float | int | str]:
     return {
         "latitude": lat,
         "longitude": lon,
         "hourly": "precipitation_probability,precipitation",
-        "forecast_days": 1,
+        "forecast_days": FORECAST_DAYS,
         "timezone": "auto",
     }
 
 
-def _safe_sequence(raw: Any) -> Iterable[float]:
-    if isinstance(raw, list):
-        return [float(item) for item in raw if isinstance(item, (int, float))]
-    return []
-
+def _build_batch_params(cells: Sequence[GridCell]) -> Dict[str, float | int | str]:
+    """Multi-location params: Open-Meteo takes comma-separated coordinates."""
+    centers = [_cell_center(cell) for cell in cells]
+    params = _build_params(0.0, 0.0)
+    params["latitude"] = ",".join(str(lat) for lat, _ in centers)
+    params["longitude"] = ",".join(str(lon) for _, lon in centers)
+    return params
 
-def _determine_condition(
-    precip_prob: Iterable[float],
-    precip_mm: Iterable[float],
-) -> Tuple[bool, str]:
-    max_prob = max(precip_prob, default=0.0)
-    total_mm = sum(precip_mm)
 
-    if max_prob > 60 or total_mm > 0.5:
-        return True, "rain"
-    if 30 < max_prob <= 60:
-        return False, "maybe"
-    return False, "no_rain"
+def _safe_sequence(raw: Any, scale: int) -> Iterator[float]:
+    """Lazily yield an hourly series, one value per hour, in ``1 / scale`` steps.
 
+    A missing or non-finite hour becomes 0.0 (no rain) rather than being
+    dropped, so index ``i`` stays ``start_time + i * 3600`` in both series.
+    """
+    if isinstance(raw, list):
+        for item in raw:
+            if isinstance(item, (int, float)) and math.isfinite(item):
+                yield round(item * scale) / scale
+            else:
+                yield 0.0
 
-def get_rain_forecast(lat: float, lon: float, horizon: str) -> Dict[str, Any]:
-    """Fetch and evaluate weather data for the given coordinates."""
-    horizon_name, hours = _resolve_horizon(horizon)
-    params = _build_params(lat, lon)
 
+def _start_time(hourly: Dict[str, Any], offset: int) -> Optional[float]:
+    """Unix time of the first hour; Open-Meteo reports local ISO times or Unix times."""
+    times = hourly.get("time")
+    first = times[0] if isinstance(times, list) and times else None
+    if isinstance(first, (int, float)) and not isinstance(first, bool):
+        return float(first)
+    if not isinstance(first, str):
+        return None
     try:
-        response = requests.get(_WEATHER_URL, params=params, timeout=5)
-    except Exception as exc:  # noqa: BLE001
-        raise WeatherServiceError("Weather API error") from exc
+        local = datetime.fromisoformat(first)
+    except ValueError:
+        return None
+    if local.tzinfo is not None:
+        return local.timestamp()
+    return local.replace(tzinfo=timezone.utc).timestamp() - offset
+
+
+def _parse_forecast(payload: Any) -> HourlyForecast:
+    """Pack the cached hourly series straight from a decoded Open-Meteo payload."""
+    if not isinstance(payload, dict):
+        payload = {}
+    hourly = payload.get("hourly", {})
+    if not isinstance(hourly, dict):
+        hourly = {}
+    offset = payload.get("utc_offset_seconds", 0)
+    offset = offset if isinstance(offset, int) else 0
+    zone = payload.get("timezone")
+    return HourlyForecast(
+        _safe_sequence(
+            hourly.get("precipitation_probability", []), COMPACT_PROBABILITY_SCALE
+        ),
+        _safe_sequence(hourly.get("precipitation", []), COMPACT_PRECIPITATION_SCALE),
+        offset,
+        _start_time(hourly, offset),
+        sys.intern(zone) if isinstance(zone, str) and zone else None,
+    )
 
+
+def _decode_json(response: Any) -> Any:
+    """Validate an upstream response (requests or httpx) and decode its JSON."""
     status_code = getattr(response, "status_code", 200)
     if status_code >= 400:
         raise WeatherServiceError("Weather API returned an error (status >= 400)")
 
     try:
-        payload = response.json()
+        return response.json()
     except Exception as exc:  # noqa: BLE001
         raise WeatherServiceError("Failed to decode weather response") from exc
 
-    hourly = payload.get("hourly", {}) if isinstance(payload, dict) else {}
-    precip_prob = list(
-        _safe_sequence(hourly.get("precipitation_probability", []))
-    )[:hours]
-    precip_mm = list(
-        _safe_sequence(hourly.get("precipitation", []))
-    )[:hours]
 
-    will_rain, condition = _determine_condition(precip_prob, precip_mm)
-    message = pick_message(condition)
+def _decode_forecast_response(response: Any) -> HourlyForecast:
+    return _parse_forecast(_decode_json(response))
+
+
+def _decode_batch_response(response: Any, count: int) -> List[HourlyForecast]:
+    """Decode a multi-location response into one forecast per requested cell.
+
+    Open-Meteo returns a list of per-location payloads in request order, or a
+    single object when only one location was requested.
+    """
+    payload = _decode_json(response)
+    payloads = payload if isinstance(payload, list) else [payload]
+    if len(payloads) != count:
+        raise WeatherServiceError("Weather API returned the wrong number of locations")
+    return [_parse_forecast(item) for item in payloads]
+
+
+def _request(params: Dict[str, float | int | str]) -> Any:
+    """GET the forecast API within the request's deadline and circuit breaker."""
+    try:
+        return _upstream.call_sync(
+            lambda timeout: requests.get(_WEATHER_URL, params=params, timeout=timeout)
+        )
+    except Exception as exc:  # noqa: BLE001
+        raise WeatherServiceError("Weather API error") from exc
+
+
+async def _request_async(params: Dict[str, float | int | str]) -> Any:
+    """Async variant of :func:`_request`; hedged and retried through the shared pools."""
+    try:
+        return await _upstream.get(_WEATHER_URL, params)
+    except Exception as exc:  # noqa: BLE001
+        raise WeatherServiceError("Weather API error") from exc
+
+
+def _fetch_forecast(lat: float, lon: float) -> HourlyForecast:
+    """Request the hourly series for one location from Open-Meteo."""
+    return _decode_forecast_response(_request(_build_params(lat, lon)))
+
+
+async def _fetch_forecast_async(lat: float, lon: float) -> HourlyForecast:
+    """Async variant of :func:`_fetch_forecast` using the shared upstream pools."""
+    return _decode_forecast_response(await _request_async(_build_params(lat, lon)))
+
+
+async def _fetch_cells_async(cells: Sequence[GridCell]) -> List[HourlyForecast]:
+    """Fetch several grid cells in one multi-location upstream request.
+
+    Cells another worker fetched recently are taken from the shared cache and
+    left out of the request.
+    """
+    entries = await asyncio.to_thread(_load_shared, cells, time.time())
+    missing = [cell for cell in cells if cell not in entries]
+    if missing:
+        response = await _request_async(_build_batch_params(missing))
+        fetched = list(zip(missing, _decode_batch_response(response, len(missing))))
+        fresh_until = _store(fetched, time.time())
+        entries.update((cell, (forecast, fresh_until)) for cell, forecast in fetched)
+    return [entries[cell][0] for cell in cells]
+
+
+def _retain_until(fresh_until: float) -> float:
+    """How long an entry is kept: for as long as it may still be served stale."""
+    return fresh_until + max(FORECAST_STALE_SECONDS, FORECAST_STALE_IF_ERROR_SECONDS)
+
+
+def _shared_key(cell: GridCell) -> str:
+    return f"{_ENTRY_FORMAT}:{cell[0]},{cell[1]}"
+
+
+def _store(fetched: Sequence[Tuple[GridCell, HourlyForecast]], now: float) -> float:
+    """Cache fresh forecasts in this process and in the cache shared by all workers.
+
+    Returns the time until which they are fresh.
+    """
+    fresh_until = _forecast_expiry(now)
+    expires_at = _retain_until(fresh_until)
+    for cell, forecast in fetched:
+        _forecast_cache.set(cell, (forecast, fresh_until), expires_at)
+    # Written by a background thread, so the request that fetched them never
+    # waits on SQLite's write lock.
+    db.store_forecasts_later([
+        (_shared_key(cell), _encode_snapshot_entry((forecast, fresh_until)), expires_at)
+        for cell, forecast in fetched
+    ])
+    return fresh_until
+
+
+def _load_shared(cells: Sequence[GridCell], now: float) -> Dict[GridCell, CachedForecast]:
+    """Fresh entries for ``cells`` that any worker on the host stored.
+
+    Every entry found, stale ones included, replaces this worker's copy so a
+    failed refresh can still fall back to it.
+    """
+    keys = [_shared_key(cell) for cell in cells]
+    try:
+        rows = db.load_forecasts(keys, now)
+    except sqlite3.Error:
+        rows = {}
+    fresh: Dict[GridCell, CachedForecast] = {}
+    for cell, key in zip(cells, keys):
+        raw = rows.get(key)
+        try:
+            entry = None if raw is None else _decode_snapshot_entry(raw)
+        except (ValueError, struct.error, UnicodeDecodeError):
+            entry = None
+        if entry is None:
+            continue
+        _forecast_cache.set(cell, entry, _retain_until(entry[1]))
+        if now < entry[1]:
+            fresh[cell] = entry
+    _shared_hits.inc(len(fresh))
+    _shared_misses.inc(len(cells) - len(fresh))
+    return fresh
+
+
+def _refresh_cell(cell: GridCell) -> CachedForecast:
+    entry = _load_shared((cell,), time.time()).get(cell)
+    if entry is None:
+        forecast = _fetch_forecast(*_cell_center(cell))
+        entry = forecast, _store(((cell, forecast),), time.time())
+    return entry
+
+
+async def _refresh_cell_async(cell: GridCell) -> CachedForecast:
+    # Shared by every request waiting for the cell, so not bound by any one's deadline.
+    with server_deadline():
+        shared = await asyncio.to_thread(_load_shared, (cell,), time.time())
+        entry = shared.get(cell)
+        if entry is None:
+            forecast = await _fetch_forecast_async(*_cell_center(cell))
+            entry = forecast, _store(((cell, forecast),), time.time())
+    return entry
+
+
+async def _join_refresh(cell: GridCell) -> CachedForecast:
+    """Wait for the cell's shared refresh, for no longer than this request's deadline."""
+    try:
+        return await wait_within_deadline(
+            lambda: _async_forecast_flight.do(cell, lambda: _refresh_cell_async(cell))
+        )
+    except DeadlineExceeded as exc:
+        raise WeatherServiceError("Weather API error") from exc
+
+
+def _serve_without_waiting(entry: CachedForecast, now: float) -> bool:
+    """True for fresh entries and for stale ones still inside the stale window."""
+    return now < entry[1] + FORECAST_STALE_SECONDS
+
+
+def _stale_on_error(entry: Optional[CachedForecast], now: float) -> Optional[CachedForecast]:
+    """The stale entry to serve when a refresh failed, if it is not too old."""
+    if entry is None or now >= entry[1] + FORECAST_STALE_IF_ERROR_SECONDS:
+        return None
+    _served_on_error.inc()
+    return entry
+
+
+def _claim_revalidation(cells: Iterable[GridCell]) -> List[GridCell]:
+    """Mark cells as being refreshed; returns those not already claimed."""
+    with _revalidating_lock:
+        claimed = [cell for cell in cells if cell not in _revalidating]
+        _revalidating.update(claimed)
+    return claimed
+
+
+def _release_revalidation(cells: Iterable[GridCell]) -> None:
+    with _revalidating_lock:
+        _revalidating.difference_update(cells)
+
+
+def _revalidate_cell(cell: GridCell) -> None:
+    try:
+        _forecast_flight.do(cell, lambda: _refresh_cell(cell))
+    except WeatherServiceError:
+        pass  # The stale entry stays in service; the next request retries.
+    finally:
+        _release_revalidation((cell,))
+
+
+def _revalidate(cell: GridCell) -> None:
+    """Refresh a stale cell on a background thread, once at a time per cell."""
+    global _revalidator
+    if not _claim_revalidation((cell,)):
+        return
+    with _revalidating_lock:
+        if _revalidator is None:
+            _revalidator = ThreadPoolExecutor(
+                FORECAST_REVALIDATE_WORKERS, thread_name_prefix="forecast-revalidate"
+            )
+        executor = _revalidator
+    executor.submit(_revalidate_cell, cell)
+
 
+async def _revalidate_cells_async(cells: List[GridCell]) -> None:
+    try:
+        # Fetched chunks are stored as they arrive; failed ones keep the stale
+        # entries. The refresh outlives the request that noticed the staleness.
+        with server_deadline():
+            async with aclosing(_fetch_chunks(cells)) as chunks:
+                async for _ in chunks:
+                    pass
+    finally:
+        _release_revalidation(cells)
+
+
+def _revalidate_async(cells: Iterable[GridCell]) -> None:
+    """Refresh stale cells in a background task, batched like ``/rain/batch``."""
+    claimed = _claim_revalidation(cells)
+    if claimed:
+        task = asyncio.ensure_future(_revalidate_cells_async(claimed))
+        _revalidation_tasks.add(task)
+        task.add_done_callback(_revalidation_tasks.discard)
+
+
+def _cached_forecast(lat: float, lon: float) -> CachedForecast:
+    """Return the cached entry for the grid cell containing the coordinates.
+
+    Stale-while-revalidate: a forecast within ``FORECAST_STALE_SECONDS`` of
+    expiry is returned at once and refreshed in the background. Older ones
+    wait for a fetch, and fall back to the stale copy (up to
+    ``FORECAST_STALE_IF_ERROR_SECONDS``) if Open-Meteo fails. Concurrent
+    misses for the same cell share one upstream fetch, and a fresh forecast
+    another worker on the host fetched is reused instead of fetching again.
+    """
+    cell = _grid_cell(lat, lon)
+    entry = _forecast_cache.get(cell)
+    now = time.time()
+    if entry is not None and _serve_without_waiting(entry, now):
+        if now >= entry[1]:
+            _served_while_revalidating.inc()
+            _revalidate(cell)
+        return entry
+    try:
+        return _forecast_flight.do(cell, lambda: _refresh_cell(cell))
+    except WeatherServiceError:
+        # The shared cache may have supplied an entry this worker lacked.
+        stale = _stale_on_error(_forecast_cache.get(cell), now)
+        if stale is None:
+            raise
+        return stale
+
+
+async def _cached_forecast_async(lat: float, lon: float) -> CachedForecast:
+    """Async variant of :func:`_cached_forecast`."""
+    cell = _grid_cell(lat, lon)
+    entry = _forecast_cache.get(cell)
+    now = time.time()
+    if entry is not None and _serve_without_waiting(entry, now):
+        if now >= entry[1]:
+            _served_while_revalidating.inc()
+            _revalidate_async((cell,))
+        return entry
+    try:
+        return await _join_refresh(cell)
+    except WeatherServiceError:
+        stale = _stale_on_error(_forecast_cache.get(cell), now)
+        if stale is None:
+            raise
+        return stale
+
+
+def _respond(
+    condition: str,
+    lat: float,
+    lon: float,
+    horizon_name: str,
+    hours: int,
+) -> Dict[str, Any]:
     return {
-        "will_rain": will_rain,
+        "will_rain": condition == "rain",
         "condition": condition,
-        "message": message,
+        "message": pick_message(condition),
         "lat": lat,
         "lon": lon,
         "horizon": horizon_name,
         "hours": hours,
     }
+
+
+class RainAnswer:
+    """A ``/rain`` answer whose HTTP cache validators are known before it is evaluated.
+
+    The ETag names the grid cell, the horizon, the forecast fetch (by the
+    hourly model refresh it is fresh until) and the evaluated window, which
+    is everything the condition depends on. Messages are picked at random, so
+    the tag is weak.
+    """
+
+    __slots__ = (
+        "lat", "lon", "horizon_name", "_forecast", "_fresh_until", "_start", "_stop", "_now",
+    )
+
+    def __init__(
+        self,
+        entry: CachedForecast,
+        lat: float,
+        lon: float,
+        horizon_name: str,
+        hours: int,
+        now: float,
+    ) -> None:
+        self._forecast, self._fresh_until = entry
+        self.lat = lat
+        self.lon = lon
+        self.horizon_name = horizon_name
+        self._now = now
+        self._start = _current_hour(self._forecast, now)
+        self._stop = _window_end(self._forecast, horizon_name, hours, now, self._start)
+
+    @property
+    def etag(self) -> str:
+        lat_index, lon_index = _grid_cell(self.lat, self.lon)
+        return (
+            f'W/"{lat_index}.{lon_index}-{self.horizon_name}-{int(self._fresh_until)}'
+            f'-{self._start}.{self._stop}"'
+        )
+
+    @property
+    def expires(self) -> float:
+        """When the forecast goes stale or the window moves to the next hour."""
+        expires = self._fresh_until
+        if self._forecast.start_time is not None:
+            expires = min(expires, self._forecast.start_time + (self._start + 1) * 3600)
+        return expires
+
+    @property
+    def max_age(self) -> int:
+        return max(0, int(self.expires - self._now))
+
+    @property
+    def cache_control(self) -> str:
+        # Shared caches may bridge refreshes and outages the way this cache does.
+        return (
+            f"public, max-age={self.max_age}"
+            f", stale-while-revalidate={int(FORECAST_STALE_SECONDS)}"
+            f", stale-if-error={int(FORECAST_STALE_IF_ERROR_SECONDS)}"
+        )
+
+    def result(self) -> Dict[str, Any]:
+        """Evaluate the window and build the response body."""
+        condition = self._forecast.windows().condition(self._start, self._stop)
+        return _respond(condition, self.lat, self.lon, self.horizon_name, self._stop - self._start)
+
+    def compact(self) -> CompactForecast:
+        """The same forecast, from the same hour on, for evaluating other horizons."""
+        return CompactForecast((self._forecast, self._fresh_until), self.lat, self.lon, self._now)
+
+
+class CompactForecast(RainAnswer):
+    """The hourly series from the current hour on, for clients that evaluate horizons.
+
+    Probabilities are whole percent and precipitation whole multiples of
+    ``1 / COMPACT_PRECIPITATION_SCALE`` mm, the steps the parsed series are
+    already kept in, and ``rules`` gives the thresholds in the same units.
+    ``today_hours`` is the "today" window, which depends on the location's
+    timezone; the body is valid until ``valid_until``, when the current hour
+    ends or the forecast goes stale. One message is picked per condition.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, entry: CachedForecast, lat: float, lon: float, now: float) -> None:
+        super().__init__(entry, lat, lon, "today", _HORIZON_MAP["today"], now)
+
+    @property
+    def etag(self) -> str:
+        lat_index, lon_index = _grid_cell(self.lat, self.lon)
+        return f'W/"{lat_index}.{lon_index}-forecast-{int(self._fresh_until)}-{self._start}"'
+
+    def result(self) -> Dict[str, Any]:
+        forecast, start = self._forecast, self._start
+        scale = COMPACT_PRECIPITATION_SCALE
+        return {
+            "lat": self.lat,
+            "lon": self.lon,
+            "valid_until": int(self.expires),
+            "today_hours": self._stop - start,
+            "precipitation_probability": [
+                round(value * COMPACT_PROBABILITY_SCALE)
+                for value in forecast.precipitation_probability[start:]
+            ],
+            "precipitation": [round(value * scale) for value in forecast.precipitation[start:]],
+            "rules": {
+                "rain_probability": RAIN_PROBABILITY,
+                "maybe_probability": MAYBE_PROBABILITY,
+                "rain_precipitation": round(RAIN_MM * scale),
+            },
+            "messages": {condition: pick_message(condition) for condition in CONDITIONS},
+        }
+
+
+def rain_answer(lat: float, lon: float, horizon: str) -> RainAnswer:
+    """Resolve the forecast for the given coordinates without evaluating it yet."""
+    horizon_name, hours = _resolve_horizon(horizon)
+    entry = _cached_forecast(lat, lon)
+    return RainAnswer(entry, lat, lon, horizon_name, hours, time.time())
+
+
+async def rain_answer_async(lat: float, lon: float, horizon: str) -> RainAnswer:
+    """Async variant of :func:`rain_answer` for use inside the event loop."""
+    horizon_name, hours = _resolve_horizon(horizon)
+    entry = await _cached_forecast_async(lat, lon)
+    return RainAnswer(entry, lat, lon, horizon_name, hours, time.time())
+
+
+async def compact_forecast_async(lat: float, lon: float) -> CompactForecast:
+    """Resolve the forecast for the given coordinates for client-side evaluation."""
+    entry = await _cached_forecast_async(lat, lon)
+    return CompactForecast(entry, lat, lon, time.time())
+
+
+def get_rain_forecast(lat: float, lon: float, horizon: str) -> Dict[str, Any]:
+    """Fetch and evaluate weather data for the given coordinates."""
+    return rain_answer(lat, lon, horizon).result()
+
+
+async def get_rain_forecast_async(lat: float, lon: float, horizon: str) -> Dict[str, Any]:
+    """Async variant of :func:`get_rain_forecast` for use inside the event loop."""
+    return (await rain_answer_async(lat, lon, horizon)).result()
+
+
+class _BatchPlan:
+    """Batch queries grouped by the grid cell that answers them."""
+
+    def __init__(self, queries: Sequence[RainQuery]) -> None:
+        self.queries = queries
+        self.by_cell: Dict[GridCell, List[int]] = {}
+        self.horizons: Dict[str, int] = {}
+        for index, (lat, lon, horizon) in enumerate(queries):
+            self.by_cell.setdefault(_grid_cell(lat, lon), []).append(index)
+            horizon_name, hours = _resolve_horizon(horizon)
+            self.horizons[horizon_name] = hours
+
+    def results(
+        self,
+        cells: Sequence[GridCell],
+        forecasts: Sequence[HourlyForecast],
+        now: float,
+    ) -> Iterator[Dict[str, Any]]:
+        """Answer every query of ``cells``, evaluating all of them in one matrix pass."""
+        starts = [_current_hour(forecast, now) for forecast in forecasts]
+        spans = {
+            name: [
+                _window_end(forecast, name, hours, now, start) - start
+                for forecast, start in zip(forecasts, starts)
+            ]
+            for name, hours in self.horizons.items()
+        }
+        conditions = evaluate_matrix(
+            [
+                forecast.precipitation_probability[start:]
+                for forecast, start in zip(forecasts, starts)
+            ],
+            [forecast.precipitation[start:] for forecast, start in zip(forecasts, starts)],
+            spans,
+        )
+        for position, cell in enumerate(cells):
+            for index in self.by_cell[cell]:
+                lat, lon, horizon = self.queries[index]
+                horizon_name, _ = _resolve_horizon(horizon)
+                condition = conditions[horizon_name][position]
+                hours = spans[horizon_name][position]
+                yield {"index": index, **_respond(condition, lat, lon, horizon_name, hours)}
+
+    def errors(self, cell: GridCell) -> Iterator[Dict[str, Any]]:
+        for index in self.by_cell[cell]:
+            lat, lon, horizon = self.queries[index]
+            yield {
+                "index": index,
+                "lat": lat,
+                "lon": lon,
+                "horizon": _resolve_horizon(horizon)[0],
+                "error": "Weather API error",
+            }
+
+
+ChunkResult = Tuple[List[GridCell], Optional[List[HourlyForecast]]]
+
+
+async def _fetch_chunks(cells: List[GridCell]) -> AsyncGenerator[ChunkResult, None]:
+    """Fetch cells in multi-location chunks, yielding each chunk as it completes.
+
+    At most ``BATCH_MAX_CONCURRENCY`` chunks are in flight; a failed chunk is
+    yielded with ``None`` in place of its forecasts.
+    """
+    slots = asyncio.Semaphore(max(1, BATCH_MAX_CONCURRENCY))
+    size = max(1, BATCH_CHUNK_SIZE)
+
+    async def fetch(chunk: List[GridCell]) -> ChunkResult:
+        async with slots:
+            try:
+                return chunk, await _fetch_cells_async(chunk)
+            except WeatherServiceError:
+                return chunk, None
+
+    tasks = [
+        asyncio.ensure_future(fetch(cells[start:start + size]))
+        for start in range(0, len(cells), size)
+    ]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # The client may stop reading mid-stream; don't leave fetches behind.
+        for task in tasks:
+            task.cancel()
+
+
+def _chunk_results(
+    plan: _BatchPlan,
+    chunk: List[GridCell],
+    forecasts: Optional[List[HourlyForecast]],
+    now: float,
+) -> Iterator[Dict[str, Any]]:
+    """Results for a fetched chunk; a failed chunk falls back to stale forecasts."""
+    answered: List[GridCell] = []
+    answers: List[HourlyForecast] = []
+    for position, cell in enumerate(chunk):
+        entry = (
+            (forecasts[position], now) if forecasts is not None
+            else _stale_on_error(_forecast_cache.get(cell), now)
+        )
+        if entry is None:
+            yield from plan.errors(cell)
+        else:
+            answered.append(cell)
+            answers.append(entry[0])
+    yield from plan.results(answered, answers, now)
+
+
+async def iter_rain_forecasts_async(queries: Sequence[RainQuery]) -> AsyncIterator[Dict[str, Any]]:
+    """Evaluate many locations, yielding each result as soon as it is known.
+
+    Queries are deduplicated by grid cell. Cached cells (including stale ones,
+    which are refreshed in the background) are answered first and the rest are
+    fetched with Open-Meteo multi-location requests. Results arrive out of
+    order, so each carries the ``index`` of its query; queries whose chunk
+    failed get a stale forecast if one is recent enough, or an ``error`` entry.
+    """
+    plan = _BatchPlan(queries)
+    missing: List[GridCell] = []
+    stale: List[GridCell] = []
+    cached: List[GridCell] = []
+    cached_forecasts: List[HourlyForecast] = []
+    now = time.time()
+    for cell in plan.by_cell:
+        entry = _forecast_cache.get(cell)
+        if entry is None or not _serve_without_waiting(entry, now):
+            missing.append(cell)
+            continue
+        if now >= entry[1]:
+            _served_while_revalidating.inc()
+            stale.append(cell)
+        cached.append(cell)
+        cached_forecasts.append(entry[0])
+    if stale:
+        _revalidate_async(stale)
+    for result in plan.results(cached, cached_forecasts, now):
+        yield result
+
+    async with aclosing(_fetch_chunks(missing)) as chunks:
+        async for chunk, forecasts in chunks:
+            for result in _chunk_results(plan, chunk, forecasts, now):
+                yield result
@@ -0,0 +1,389 @@
+const resultDiv = document.getElementById('result');
+const rainBtn = document.getElementById('rain-btn');
+// theme selector removed; default accent applied below
+const heading = document.querySelector('h1');
+const citySearchBtn = document.getElementById('city-search-btn');
+const cityInputEl = document.getElementById('city-input');
+const horizonSliderEl = document.getElementById('horizon-slider');
+const horizonLabelEl = document.getElementById('horizon-label');
+  const bgClasses = ['bg-indigo-100', 'bg-blue-200', 'bg-yellow-100', 'bg-gray-200'];
+
+  function setBackground(condition, message) {
+    const map = { rain: 'bg-gray-200', maybe: 'bg-yellow-100', no_rain: 'bg-blue-200' };
+    let picked = map[condition];
+    if (!picked && typeof message === 'string') {
+      const m = message.toLowerCase();
+      if (m.includes('yes') || m.includes('umbrella') || m.includes('rain')) picked = map.rain;
+      else if (m.includes('maybe') || m.includes('chance')) picked = map.maybe;
+      else picked = map.no_rain;
+    }
+    document.body.classList.remove(...bgClasses);
+    document.body.classList.add(picked || 'bg-indigo-100');
+  }
+
+
+  // Horizon slider logic
+  const horizonSlider = horizonSliderEl;
+  const horizonLabel = horizonLabelEl;
+  const horizonOptions = [
+    { label: 'Today', value: 'today' },
+    { label: '1h', value: '1h' },
+    { label: '3h', value: '3h' },
+    { label: '6h', value: '6h' }
+  ];
+  function updateHorizonLabel() {
+    const idx = parseInt(horizonSlider.value, 10);
+    horizonLabel.textContent = horizonOptions[idx].label;
+  }
+  horizonSlider.addEventListener('input', () => {
+    updateHorizonLabel();
+    onHorizonChange();
+  });
+  updateHorizonLabel();
+
+  // Theme / accent switching (keeps body background logic intact)
+  function setAccent(theme) {
+    const map = {
+      indigo: {
+        heading: ['text-indigo-700'],
+        rainBtn: ['bg-indigo-600', 'hover:bg-indigo-700'],
+        searchBtn: ['bg-indigo-500', 'hover:bg-indigo-600'],
+        slider: ['accent-indigo-600'],
+        label: ['text-indigo-700'],
+        focusRing: 'focus:ring-indigo-400'
+      }
+    };
+
+    // Remove any known accent classes
+const allHeading = ['text-indigo-700'];
+const allBtnPrimary = ['bg-indigo-600','hover:bg-indigo-700'];
+const allBtnSecondary = ['bg-indigo-500','hover:bg-indigo-600'];
+const allSlider = ['accent-indigo-600'];
+const allLabel = ['text-indigo-700'];
+const allRings = ['focus:ring-indigo-400'];
+
+    heading.classList.remove(...allHeading);
+    rainBtn.classList.remove(...allBtnPrimary);
+    citySearchBtn.classList.remove(...allBtnSecondary);
+    horizonSlider.classList.remove(...allSlider);
+    horizonLabel.classList.remove(...allLabel);
+    cityInputEl.classList.remove(...allRings);
+
+    const chosen = map[theme] || map.indigo;
+    heading.classList.add(...chosen.heading);
+    rainBtn.classList.add(...chosen.rainBtn);
+    citySearchBtn.classList.add(...chosen.searchBtn);
+    horizonSlider.classList.add(...chosen.slider);
+    horizonLabel.classList.add(...chosen.label);
+    cityInputEl.classList.add(chosen.focusRing);
+  }
+
+// Initialize with default accent
+setAccent('indigo');
+
+  // City search logic (used by the collapsible controls). One request
+  // resolves the city and checks its weather on the server.
+  async function handleCityFormSubmit(e) {
+    e.preventDefault();
+    const city = document.getElementById('city-input').value.trim();
+    if (!city) {
+      setResultText('Please enter a city name.');
+      return;
+    }
+    setResultText('Checking the weather...');
+    const signal = startLookup();
+    try {
+      const horizon = currentHorizon();
+      const url = `/rain/by-city?city=${encodeURIComponent(city)}&horizon=${horizon}`;
+      const res = await fetch(url, { signal });
+      if (!res.ok) throw new Error('City weather fetch failed');
+      const data = await res.json();
+      // Update large result area
+      setResult(data.message ?? 'No data', data.condition);
+      hourly = data.forecast ?? null;
+      // The slider may have moved while the answer was on its way.
+      if (hourly && currentHorizon() !== horizon) showHorizon();
+    } catch (err) {
+      if (signal.aborted) return;
+      setResultText('Could not find city or fetch weather.');
+      setBackground(null, '');
+    }
+  }
+  document.getElementById('city-form').addEventListener('submit', handleCityFormSubmit);
+
+  // City autocomplete: debounced lookups against the offline gazetteer.
+  // A prefix that returned fewer than SUGGEST_LIMIT cities is complete, so
+  // longer prefixes are filtered locally instead of asking the server again.
+  // Filtering uses the server's matched keys (a city may have matched by its
+  // ASCII name), and only ASCII prefixes, where both normalizations agree.
+  const SUGGEST_LIMIT = 8;
+  const suggestionCache = new Map();
+  const suggestionList = document.getElementById('city-suggestions');
+  let suggestTimer = null;
+
+  function normalizeCity(text) {
+    return text.normalize('NFD').replace(/[\u0300-\u036f]/g, '').toLowerCase().replace(/\s+/g, ' ').trim();
+  }
+
+  function cachedSuggestions(prefix) {
+    if (suggestionCache.has(prefix)) return suggestionCache.get(prefix);
+    if (!/^[\x20-\x7e]+$/.test(prefix)) return null;
+    for (let end = prefix.length - 1; end > 0; end--) {
+      const shorter = suggestionCache.get(prefix.slice(0, end));
+      if (shorter && shorter.length < SUGGEST_LIMIT) {
+        return shorter.filter((city) => (city.matches || []).some((key) => key.startsWith(prefix)));
+      }
+    }
+    return null;
+  }
+
+  function renderSuggestions(cities) {
+    suggestionList.replaceChildren(...cities.map((city) => {
+      const option = document.createElement('option');
+      option.value = city.name;
+      option.label = `${city.name}, ${city.country}`;
+      return option;
+    }));
+  }
+
+  async function updateSuggestions() {
+    const prefix = normalizeCity(cityInputEl.value);
+    if (prefix.length < 2) return renderSuggestions([]);
+    let cities = cachedSuggestions(prefix);
+    if (!cities) {
+      try {
+        const res = await fetch(`/geocode/suggest?q=${encodeURIComponent(prefix)}&limit=${SUGGEST_LIMIT}`);
+        if (!res.ok) return;
+        cities = await res.json();
+        suggestionCache.set(prefix, cities);
+      } catch (err) {
+        return;
+      }
+    }
+    // Ignore responses for prefixes the user has already typed past.
+    if (normalizeCity(cityInputEl.value) === prefix) renderSuggestions(cities);
+  }
+
+  cityInputEl.addEventListener('input', () => {
+    clearTimeout(suggestTimer);
+    suggestTimer = setTimeout(updateSuggestions, 120);
+  });
+
+  // Utility to set the main result area text
+  function setResultText(text) {
+    const msgEl = document.getElementById('result-message');
+    const subEl = document.getElementById('result-sub');
+    if (msgEl) msgEl.textContent = text;
+    if (subEl) subEl.textContent = '';
+  }
+
+  function setResult(message, condition) {
+    const msgEl = document.getElementById('result-message');
+    const subEl = document.getElementById('result-sub');
+    if (msgEl) msgEl.textContent = message;
+    if (subEl) subEl.textContent = '';
+    setBackground(condition, message);
+  }
+
+  // Client-side horizons: each lookup brings the location's hourly series
+  // (from /forecast, or inside the /rain/by-city answer), and the page
+  // evaluates the selected horizon from it with the server's rules, so moving
+  // the slider asks nothing of the server. A new lookup aborts whatever the
+  // previous one still has in flight, so late answers never overwrite it.
+  let lookup = null;
+  let hourly = null;
+
+  function startLookup() {
+    if (lookup) lookup.abort();
+    lookup = new AbortController();
+    hourly = null;
+    return lookup.signal;
+  }
+
+  function currentHorizon() {
+    return horizonOptions[parseInt(horizonSlider.value, 10)].value;
+  }
+
+  function evaluateHorizon(forecast, horizon) {
+    // Integer units (percent, hundredths of a mm), so the sums are exact.
+    const hours = horizon === 'today' ? forecast.today_hours : parseInt(horizon, 10);
+    const peak = Math.max(0, ...forecast.precipitation_probability.slice(0, hours));
+    const total = forecast.precipitation.slice(0, hours).reduce((sum, value) => sum + value, 0);
+    const rules = forecast.rules;
+    if (peak > rules.rain_probability || total > rules.rain_precipitation) return 'rain';
+    if (peak > rules.maybe_probability) return 'maybe';
+    return 'no_rain';
+  }
+
+  function showHorizon() {
+    const condition = evaluateHorizon(hourly, currentHorizon());
+    setResult(hourly.messages[condition], condition);
+  }
+
+  // One request per position: /forecast answers every horizon, and /rain is
+  // only asked for the selected one when it fails.
+  async function checkPosition(lat, lon, signal) {
+    try {
+      const res = await fetch(`/forecast?lat=${lat}&lon=${lon}`, { signal });
+      if (res.ok) {
+        hourly = await res.json();
+        showHorizon();
+        return;
+      }
+    } catch (err) {
+      if (signal.aborted) throw err;
+    }
+    const res = await fetch(`/rain?lat=${lat}&lon=${lon}&horizon=${currentHorizon()}`, { signal });
+    if (!res.ok) throw new Error('Weather API error');
+    const data = await res.json();
+    setResult(data.message ?? 'No data', data.condition);
+  }
+
+  function onHorizonChange() {
+    if (!hourly) return;
+    if (Date.now() / 1000 >= hourly.valid_until) {
+      // The hour has moved on since the series was fetched; get the current one.
+      checkPosition(hourly.lat, hourly.lon, startLookup()).catch(() => {});
+      return;
+    }
+    showHorizon();
+  }
+
+  // Auto-check logic: attempt geolocation on load (with timeout), otherwise reveal refine controls
+const controlsPanel = document.getElementById('controls-panel');
+// Ensure controls panel is collapsed by default
+if (controlsPanel) controlsPanel.classList.add('panel-collapsed');
+  const refineToggle = document.getElementById('refine-toggle');
+  const tryAgainBtn = document.getElementById('try-again-btn');
+
+  function showControls(toggle) {
+    if (!controlsPanel) return;
+    const isOpen = controlsPanel.classList.contains('panel-open');
+    const shouldOpen = typeof toggle === 'boolean' ? toggle : !isOpen;
+    controlsPanel.classList.toggle('panel-open', shouldOpen);
+    controlsPanel.classList.toggle('panel-collapsed', !shouldOpen);
+    if (shouldOpen) document.getElementById('city-input').focus();
+  }
+
+  if (refineToggle) {
+    refineToggle.addEventListener('click', () => showControls());
+  }
+
+  // Close controls on Escape key
+  document.addEventListener('keydown', (e) => {
+    if (e.key === 'Escape') showControls(false);
+  });
+
+  if (tryAgainBtn) {
+    tryAgainBtn.addEventListener('click', () => {
+      attemptAutoCheck();
+    });
+  }
+
+  async function attemptAutoCheck() {
+    setResultText('Checking location...');
+    // Small helper to wrap getCurrentPosition in a promise with timeout
+    function getPosition(options = {}) {
+      return new Promise((resolve, reject) => {
+        if (!navigator.geolocation) return reject(new Error('no_geolocation'));
+        let timedOut = false;
+        const timer = setTimeout(() => {
+          timedOut = true;
+          reject(new Error('timeout'));
+        }, 7000);
+        navigator.geolocation.getCurrentPosition(
+          (pos) => {
+            if (timedOut) return;
+            clearTimeout(timer);
+            resolve(pos);
+          },
+          (err) => {
+            if (timedOut) return;
+            clearTimeout(timer);
+            reject(err);
+          },
+          options
+        );
+      });
+    }
+
+    try {
+      const pos = await getPosition({ enableHighAccuracy: false, maximumAge: 0 });
+      const lat = pos.coords.latitude.toFixed(4);
+      const lon = pos.coords.longitude.toFixed(4);
+      setResultText('Checking the weather...');
+      await checkPosition(lat, lon, startLookup());
+    } catch (err) {
+      if (err && err.name === 'AbortError') return;
+      // If geolocation fails or times out, show refine controls
+      if (err && err.code === err.PERMISSION_DENIED) {
+        setResultText('Location access denied. Use "Refine" to enter a city.');
+      } else if (err && err.message === 'timeout') {
+        setResultText('Location timed out. Use "Refine" or try again.');
+      } else {
+        setResultText('Location not available. Use "Refine" to enter a city.');
+      }
+      showControls(false);
+    }
+  }
+
+  // Try auto-check on load
+  window.addEventListener('load', () => {
+    attemptAutoCheck();
+  });
+
+  document.getElementById('rain-btn').addEventListener('click', () => {
+    resultDiv.textContent = '';
+    if (!navigator.geolocation) {
+      resultDiv.textContent = 'Geolocation is not supported by your browser.';
+      return;
+    }
+    resultDiv.textContent = 'Getting your location...';
+    navigator.geolocation.getCurrentPosition(
+      (position) => {
+        const lat = position.coords.latitude.toFixed(4);
+        const lon = position.coords.longitude.toFixed(4);
+        resultDiv.textContent = 'Checking the weather...';
+        const horizonIdx = parseInt(horizonSlider.value, 10);
+        const horizon = horizonOptions[horizonIdx].value;
+        fetch(`/rain?lat=${lat}&lon=${lon}&horizon=${horizon}`)
+          .then((response) => {
+            if (!response.ok) throw new Error('API error');
+            return response.json();
+          })
+          .then((data) => {
+            resultDiv.innerHTML = `<div class=\"inline-block px-3 py-2 rounded-lg bg-white/70 shadow-sm fade-in-up\"><span class=\"font-bold text-lg\">${(data.message ?? 'No data')}</span></div>`;
+            setBackground(data.condition, data.message);
+          })
+          .catch(() => {
+            resultDiv.textContent = 'Could not fetch weather data.';
+            setBackground(null, '');
+          });
+      },
+      (err) => {
+        // Fallback: prompt for city if denied
+        if (err.code === err.PERMISSION_DENIED) {
+          resultDiv.textContent = 'Location access denied. Please enter your city above.';
+          document.getElementById('city-input').focus();
+        } else {
+          resultDiv.textContent = 'Unable to retrieve your location.';
+        }
+      }
+    );
+  });
+
+  async function recordVisit() {
+    try {
+      // Record the visit and get updated counts
+      const response = await fetch('/visit', { method: 'POST' });
+      if (!response.ok) throw new Error('Failed to record visit');
+      const stats = await response.json();
+      document.getElementById('total-visits').textContent = stats.total_visits;
+      document.getElementById('today-visits').textContent = stats.today_visits;
+    } catch (error) {
+      console.error('Error recording visit:', error);
+    }
+  }
+
+  // Record visit on page load
+  window.onload = () => recordVisit();
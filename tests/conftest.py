@@ -1,11 +1,51 @@
+import asyncio
 
-# Add your project-specific fixtures here
-# Example for FastAPI:
-#
-# import pytest
-# from fastapi.testclient import TestClient
-# from src.main import app
-#
-# @pytest.fixture(scope="session")
-# def client():
-#     return TestClient(app)
+import httpx
+import pytest
+
+from src import db
+from src.services import gazetteer, geocode, messages, snapshot
+from src.services import http as http_client
+from src.services import weather
+
+
+def _clear_caches():
+    weather._forecast_cache.clear()
+    geocode._lookup_cache.clear()
+    messages._catalog.clear()
+    db._stats_snapshot.clear()
+    weather._upstream.breaker.reset()
+    geocode._upstream.breaker.reset()
+
+
+@pytest.fixture(autouse=True)
+def reset_service_caches(monkeypatch, tmp_path):
+    """Start every test with empty in-process caches and a private cache database.
+
+    The offline gazetteer is emptied so geocoding tests exercise the upstream
+    path; gazetteer tests install their own index.
+    """
+    monkeypatch.setattr(db, "CACHE_DB_PATH", str(tmp_path / "cache.db"))
+    monkeypatch.setattr(snapshot, "CACHE_SNAPSHOT_PATH", str(tmp_path / "cache.snapshot"))
+    monkeypatch.setattr(gazetteer, "_index", gazetteer.Gazetteer([]))
+    db.init_cache_db()
+    _clear_caches()
+    yield
+    db.close_forecast_writer()
+    _clear_caches()
+    db.close_connections()
+
+
+@pytest.fixture
+def mock_upstream(monkeypatch):
+    """Route the shared async upstream clients through an ``httpx`` handler.
+
+    Usage: ``mock_upstream(lambda request: httpx.Response(200, json={...}))``.
+    """
+
+    def install(handler):
+        client = http_client.build_async_client(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(http_client, "_pools", [(client, asyncio.Semaphore(8))])
+        return client
+
+    return install
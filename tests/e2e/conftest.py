@@ -1,6 +1,8 @@
 """
 Pytest configuration and fixtures for end-to-end tests.
 """
+import time
+
 import pytest
 from playwright.sync_api import Page, expect
 
@@ -23,5 +25,30 @@ def app_page(page: Page, base_url: str) -> Page:
     return page
 
 
+@pytest.fixture
+def forecast_body():
+    """
+    Build a /forecast body (also embedded in /rain/by-city) with the server's
+    rules, valid for the next hour.
+
+    Usage: ``forecast_body([10, 40, 90], rain="Umbrella time!")``; each
+    condition's message defaults to its name.
+    """
+
+    def build(probability, **messages):
+        return {
+            "lat": 51.5074,
+            "lon": -0.1278,
+            "valid_until": int(time.time()) + 3600,
+            "today_hours": len(probability),
+            "precipitation_probability": probability,
+            "precipitation": [0] * len(probability),
+            "rules": {"rain_probability": 60, "maybe_probability": 30, "rain_precipitation": 50},
+            "messages": {c: messages.get(c, c) for c in ("rain", "maybe", "no_rain")},
+        }
+
+    return build
+
+
 # Configure default timeout for E2E tests
 expect.set_options(timeout=10_000)  # 10 seconds
@@ -1,13 +1,14 @@
 """
 E2E: Auto-check geolocation on load (granted, denied, timeout, try again)
 """
+import json
 import pytest
 from playwright.sync_api import Page, expect, Route
 import re
 
 
 @pytest.mark.e2e
-def test_autocheck_geolocation_granted(page: Page, base_url: str):
+def test_autocheck_geolocation_granted(page: Page, base_url: str, forecast_body):
     """Auto-check on load: geolocation granted, show result auto."""
     context = page.context
     # Grant permission and set geolocation at context level,
@@ -15,19 +16,50 @@ def test_autocheck_geolocation_granted(page: Page, base_url: str):
     context.grant_permissions(["geolocation"])
     context.set_geolocation({"latitude": 51.5074, "longitude": -0.1278})
     p = context.new_page()
-
-    def handle_rain(route: Route):
+    weather_requests = []
+    p.on(
+        "request",
+        lambda request: weather_requests.append(request.url)
+        if re.search(r"/(rain|forecast)\b", request.url) else None,
+    )
+
+    def handle_forecast(route: Route):
         route.fulfill(
             status=200,
             content_type="application/json",
-            body='{"condition": "no_rain", "message": "Sunny skies!"}'
+            body=json.dumps(forecast_body([10, 20, 5] + [0] * 21, no_rain="Sunny skies!")),
         )
-    p.route("**/rain?*", handle_rain)
+    p.route("**/forecast?*", handle_forecast)
     p.goto(base_url)
     result_msg = p.locator("#result-message")
     expect(result_msg).to_contain_text("Sunny skies!", timeout=5000)
     body = p.locator("body")
     expect(body).to_have_class(re.compile(r"bg-blue-200"))
+    # Every horizon comes from that one response.
+    p.locator("#horizon-slider").fill("2")
+    expect(result_msg).to_contain_text("Sunny skies!")
+    assert len(weather_requests) == 1
+    assert "/forecast?lat=51.5074&lon=-0.1278" in weather_requests[0]
+
+
+@pytest.mark.e2e
+def test_autocheck_falls_back_to_rain_when_forecast_fails(page: Page, base_url: str):
+    """Auto-check on load: /forecast errors, so the selected horizon comes from /rain."""
+    context = page.context
+    context.grant_permissions(["geolocation"])
+    context.set_geolocation({"latitude": 51.5074, "longitude": -0.1278})
+    p = context.new_page()
+
+    p.route("**/forecast?*", lambda route: route.fulfill(status=502, body="Weather API error"))
+    p.route("**/rain?*", lambda route: route.fulfill(
+        status=200,
+        content_type="application/json",
+        body='{"condition": "rain", "message": "Umbrella time!"}'
+    ))
+    p.goto(base_url)
+    result_msg = p.locator("#result-message")
+    expect(result_msg).to_contain_text("Umbrella time!", timeout=5000)
+    expect(p.locator("body")).to_have_class(re.compile(r"bg-gray-200"))
 
 
 @pytest.mark.e2e
@@ -10,13 +10,6 @@ from playwright.sync_api import Page, expect, Route
 def test_background_rain_condition(app_page: Page) -> None:
     """Test that rain condition changes background to gray."""
 
-    def handle_geocode(route: Route) -> None:
-        route.fulfill(
-            status=200,
-            content_type="application/json",
-            body='{"lat": 51.5074, "lon": -0.1278, "city": "London"}'
-        )
-
     def handle_rain(route: Route) -> None:
         route.fulfill(
             status=200,
@@ -24,8 +17,7 @@ def test_background_rain_condition(app_page: Page) -> None:
             body='{"condition": "rain", "message": "Yes, it will rain!"}'
         )
 
-    app_page.route("**/geocode?*", handle_geocode)
-    app_page.route("**/rain?*", handle_rain)
+    app_page.route("**/rain/by-city?*", handle_rain)
 
     # Open the refine panel
     refine_toggle = app_page.locator("#refine-toggle")
@@ -51,13 +43,6 @@ def test_background_rain_condition(app_page: Page) -> None:
 def test_background_no_rain_condition(app_page: Page) -> None:
     """Test that no_rain condition changes background to blue."""
 
-    def handle_geocode(route: Route) -> None:
-        route.fulfill(
-            status=200,
-            content_type="application/json",
-            body='{"lat": 40.7128, "lon": -74.0060, "city": "New York"}'
-        )
-
     def handle_rain(route: Route) -> None:
         route.fulfill(
             status=200,
@@ -65,8 +50,7 @@ def test_background_no_rain_condition(app_page: Page) -> None:
             body='{"condition": "no_rain", "message": "No rain today!"}'
         )
 
-    app_page.route("**/geocode?*", handle_geocode)
-    app_page.route("**/rain?*", handle_rain)
+    app_page.route("**/rain/by-city?*", handle_rain)
 
     # Open the refine panel
     refine_toggle = app_page.locator("#refine-toggle")
@@ -92,13 +76,6 @@ def test_background_no_rain_condition(app_page: Page) -> None:
 def test_background_maybe_condition(app_page: Page) -> None:
     """Test that maybe condition changes background to yellow."""
 
-    def handle_geocode(route: Route) -> None:
-        route.fulfill(
-            status=200,
-            content_type="application/json",
-            body='{"lat": 48.8566, "lon": 2.3522, "city": "Paris"}'
-        )
-
     def handle_rain(route: Route) -> None:
         route.fulfill(
             status=200,
@@ -106,8 +83,7 @@ def test_background_maybe_condition(app_page: Page) -> None:
             body='{"condition": "maybe", "message": "There might be a chance of rain."}'
         )
 
-    app_page.route("**/geocode?*", handle_geocode)
-    app_page.route("**/rain?*", handle_rain)
+    app_page.route("**/rain/by-city?*", handle_rain)
 
     # Open the refine panel
     refine_toggle = app_page.locator("#refine-toggle")
@@ -133,13 +109,6 @@ def test_background_maybe_condition(app_page: Page) -> None:
 def test_background_transitions_between_conditions(app_page: Page) -> None:
     """Test that background changes correctly when conditions change."""
 
-    def handle_geocode(route: Route) -> None:
-        route.fulfill(
-            status=200,
-            content_type="application/json",
-            body='{"lat": 51.5074, "lon": -0.1278, "city": "London"}'
-        )
-
     # Start with rain condition
     def handle_rain_first(route: Route) -> None:
         route.fulfill(
@@ -148,8 +117,7 @@ def test_background_transitions_between_conditions(app_page: Page) -> None:
             body='{"condition": "rain", "message": "Rainy day!"}'
         )
 
-    app_page.route("**/geocode?*", handle_geocode)
-    app_page.route("**/rain?*", handle_rain_first)
+    app_page.route("**/rain/by-city?*", handle_rain_first)
 
     # Open the refine panel
     refine_toggle = app_page.locator("#refine-toggle")
@@ -176,8 +144,8 @@ def test_background_transitions_between_conditions(app_page: Page) -> None:
             body='{"condition": "no_rain", "message": "All clear now!"}'
         )
 
-    app_page.unroute("**/rain?*")
-    app_page.route("**/rain?*", handle_no_rain)
+    app_page.unroute("**/rain/by-city?*")
+    app_page.route("**/rain/by-city?*", handle_no_rain)
 
     # Second search - no rain
     city_input.fill("London")
@@ -10,15 +10,7 @@ from playwright.sync_api import Page, expect, Route
 def test_city_search_flow(app_page: Page) -> None:
     """Test searching for a city and getting weather results."""
 
-    # Mock the geocode endpoint
-    def handle_geocode(route: Route) -> None:
-        route.fulfill(
-            status=200,
-            content_type="application/json",
-            body='{"lat": 51.5074, "lon": -0.1278, "city": "London"}'
-        )
-
-    # Mock the rain endpoint
+    # Mock the combined city-to-rain endpoint
     def handle_rain(route: Route) -> None:
         route.fulfill(
             status=200,
@@ -26,8 +18,7 @@ def test_city_search_flow(app_page: Page) -> None:
             body='{"condition": "no_rain", "message": "No rain expected today!"}'
         )
 
-    app_page.route("**/geocode?*", handle_geocode)
-    app_page.route("**/rain?*", handle_rain)
+    app_page.route("**/rain/by-city?*", handle_rain)
 
     # Open the refine panel
     refine_toggle = app_page.locator("#refine-toggle")
@@ -70,11 +61,11 @@ def test_city_search_empty_input(app_page: Page) -> None:
 def test_city_search_geocode_failure(app_page: Page) -> None:
     """Test handling of geocoding API failure."""
 
-    # Mock geocode endpoint with error
+    # The city lookup fails
     def handle_geocode_error(route: Route) -> None:
         route.fulfill(status=404, body="Not found")
 
-    app_page.route("**/geocode?*", handle_geocode_error)
+    app_page.route("**/rain/by-city?*", handle_geocode_error)
 
     # Open the refine panel
     refine_toggle = app_page.locator("#refine-toggle")
@@ -96,14 +87,7 @@ def test_city_search_geocode_failure(app_page: Page) -> None:
 def test_city_search_with_special_characters(app_page: Page) -> None:
     """Test city search with special characters and spaces."""
 
-    # Mock the endpoints
-    def handle_geocode(route: Route) -> None:
-        route.fulfill(
-            status=200,
-            content_type="application/json",
-            body='{"lat": 48.8566, "lon": 2.3522, "city": "Paris"}'
-        )
-
+    # Mock the combined city-to-rain endpoint
     def handle_rain(route: Route) -> None:
         route.fulfill(
             status=200,
@@ -111,8 +95,7 @@ def test_city_search_with_special_characters(app_page: Page) -> None:
             body='{"condition": "maybe", "message": "Maybe some drizzle?"}'
         )
 
-    app_page.route("**/geocode?*", handle_geocode)
-    app_page.route("**/rain?*", handle_rain)
+    app_page.route("**/rain/by-city?*", handle_rain)
 
     # Open the refine panel
     refine_toggle = app_page.locator("#refine-toggle")
@@ -1,6 +1,9 @@
 """
 End-to-end tests for horizon slider functionality.
 """
+import json
+import re
+
 import pytest
 from playwright.sync_api import Page, expect, Route
 
@@ -38,13 +41,6 @@ def test_horizon_affects_rain_query(app_page: Page) -> None:
     # Track the horizon parameter in requests
     requests_received: list[str] = []
 
-    def handle_geocode(route: Route) -> None:
-        route.fulfill(
-            status=200,
-            content_type="application/json",
-            body='{"lat": 40.7128, "lon": -74.0060, "city": "New York"}'
-        )
-
     def handle_rain(route: Route) -> None:
         # Capture the horizon parameter from the URL
         url = route.request.url
@@ -55,8 +51,7 @@ def test_horizon_affects_rain_query(app_page: Page) -> None:
             body='{"condition": "rain", "message": "Yes, bring an umbrella!"}'
         )
 
-    app_page.route("**/geocode?*", handle_geocode)
-    app_page.route("**/rain?*", handle_rain)
+    app_page.route("**/rain/by-city?*", handle_rain)
 
     # Open the refine panel
     refine_toggle = app_page.locator("#refine-toggle")
@@ -92,13 +87,6 @@ def test_horizon_1h_parameter(app_page: Page) -> None:
 
     requests_received: list[str] = []
 
-    def handle_geocode(route: Route) -> None:
-        route.fulfill(
-            status=200,
-            content_type="application/json",
-            body='{"lat": 51.5074, "lon": -0.1278, "city": "London"}'
-        )
-
     def handle_rain(route: Route) -> None:
         requests_received.append(route.request.url)
         route.fulfill(
@@ -107,8 +95,7 @@ def test_horizon_1h_parameter(app_page: Page) -> None:
             body='{"condition": "no_rain", "message": "Clear skies ahead!"}'
         )
 
-    app_page.route("**/geocode?*", handle_geocode)
-    app_page.route("**/rain?*", handle_rain)
+    app_page.route("**/rain/by-city?*", handle_rain)
 
     # Open the refine panel
     refine_toggle = app_page.locator("#refine-toggle")
@@ -132,3 +119,54 @@ def test_horizon_1h_parameter(app_page: Page) -> None:
     # Verify horizon=1h was sent
     assert len(requests_received) > 0
     assert "horizon=1h" in requests_received[0]
+
+
+@pytest.mark.e2e
+def test_search_is_one_request_and_slider_moves_none(app_page: Page, forecast_body) -> None:
+    """A city search asks once; the slider re-evaluates the returned series locally."""
+    weather_requests: list[str] = []
+    app_page.on(
+        "request",
+        lambda request: weather_requests.append(request.url)
+        if re.search(r"/(rain|forecast)\b", request.url) else None,
+    )
+
+    def handle_rain(route: Route) -> None:
+        # 1h dry, 3h reaches 40% (maybe), 6h reaches 90% (rain).
+        forecast = forecast_body(
+            [10, 40, 20, 10, 90, 10] + [0] * 18,
+            rain="Umbrella time!", maybe="Maybe take a jacket.", no_rain="Dry.",
+        )
+        route.fulfill(
+            status=200,
+            content_type="application/json",
+            body=json.dumps({
+                "condition": "no_rain", "message": "Dry.", "name": "London",
+                "lat": 51.5074, "lon": -0.1278, "forecast": forecast,
+            }),
+        )
+
+    app_page.route("**/rain/by-city?*", handle_rain)
+
+    app_page.locator("#refine-toggle").click()
+    slider = app_page.locator("#horizon-slider")
+    slider.fill("1")
+    app_page.locator("#city-input").fill("London")
+    app_page.locator("#city-search-btn").click()
+
+    result_message = app_page.locator("#result-message")
+    expect(result_message).to_have_text("Dry.", timeout=5000)
+    assert len(weather_requests) == 1
+    assert "/rain/by-city?" in weather_requests[0]
+
+    slider.fill("2")
+    expect(result_message).to_have_text("Maybe take a jacket.")
+    expect(app_page.locator("body")).to_have_class(re.compile(r"bg-yellow-100"))
+    slider.fill("3")
+    expect(result_message).to_have_text("Umbrella time!")
+    slider.fill("0")
+    expect(result_message).to_have_text("Umbrella time!")
+    slider.fill("1")
+    expect(result_message).to_have_text("Dry.")
+
+    assert len(weather_requests) == 1
@@ -24,3 +24,34 @@ def test_homepage_contains_key_elements():
     assert "id=\"refine-toggle\"" in html or 'id="refine-toggle"' in html
     assert "id=\"controls-panel\"" in html or 'id="controls-panel"' in html
     assert "id=\"result-message\"" in html or 'id="result-message"' in html
+
+
+@pytest.mark.integration
+def test_homepage_is_served_compressed_and_revalidated():
+    response = client.get("/", headers={"Accept-Encoding": "gzip"})
+    revalidated = client.get(
+        "/", headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]}
+    )
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-type"] == "text/html; charset=utf-8"
+    assert response.headers["cache-control"] == "no-cache"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+
+
+@pytest.mark.integration
+def test_homepage_assets_are_fingerprinted_and_immutable():
+    html = client.get("/").text
+    script_url = html.split('<script src="')[-1].split('"')[0]
+
+    script = client.get(script_url)
+    plain = client.get("/static/app.js")
+
+    assert script_url.startswith("/static/app.") and script_url != "/static/app.js"
+    assert script.status_code == 200
+    assert script.headers["cache-control"] == "public, max-age=31536000, immutable"
+    assert plain.headers["cache-control"] == "no-cache"
+    assert script.text == plain.text
+    assert client.get("/static/app.000000000000.js").status_code == 404
@@ -61,6 +61,18 @@ def test_stats_endpoint_read_only():
             conn.close()
 
 
+@pytest.mark.integration
+def test_stats_endpoint_revalidates_unchanged_counts():
+    response = client.get("/stats")
+    revalidated = client.get("/stats", headers={"If-None-Match": response.headers["etag"]})
+    client.post("/visit")
+    changed = client.get("/stats", headers={"If-None-Match": response.headers["etag"]})
+
+    assert response.headers["cache-control"].startswith("public, max-age=")
+    assert revalidated.status_code == 304
+    assert changed.status_code == 200
+
+
 @pytest.mark.integration
 def test_visit_endpoint_increments():
     """Test that /visit endpoint increments counters and returns new counts."""
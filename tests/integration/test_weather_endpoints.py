@@ -1,33 +1,30 @@
+import asyncio
+import json
+
+import httpx
 import pytest
 from fastapi.testclient import TestClient
 
+from src import main
 from src.main import app
-from src.services import geocode as geocode_service
+from src.services import gazetteer, resilience
 from src.services import weather as weather_service
 
 
 client = TestClient(app)
 
 
-class _DummyResponse:
-    def __init__(self, payload, status_code=200):
-        self._payload = payload
-        self.status_code = status_code
-
-    def json(self):
-        return self._payload
-
-
 @pytest.mark.integration
-def test_geocode_success(monkeypatch):
-    def fake_get(url, params, timeout):
-        return _DummyResponse({
+def test_geocode_success(mock_upstream):
+    def handler(request):
+        assert request.url.params["name"] == "London"
+        return httpx.Response(200, json={
             "results": [
                 {"latitude": 51.5074, "longitude": -0.1278, "name": "London"}
             ]
         })
 
-    monkeypatch.setattr(geocode_service.requests, "get", fake_get)
+    mock_upstream(handler)
 
     response = client.get("/geocode", params={"city": "London"})
     assert response.status_code == 200
@@ -36,38 +33,74 @@ def test_geocode_success(monkeypatch):
 
 
 @pytest.mark.integration
-def test_geocode_not_found(monkeypatch):
-    def fake_get(url, params, timeout):
-        return _DummyResponse({"results": []})
+def test_geocode_is_cacheable_and_revalidates(mock_upstream):
+    mock_upstream(lambda request: httpx.Response(200, json={
+        "results": [{"latitude": 48.85, "longitude": 2.35, "name": "Paris"}]
+    }))
+
+    response = client.get("/geocode", params={"city": "Paris"})
+    revalidated = client.get(
+        "/geocode", params={"city": "Paris"}, headers={"If-None-Match": response.headers["etag"]}
+    )
+
+    assert response.headers["cache-control"] == "public, max-age=2592000"
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["etag"] == response.headers["etag"]
 
-    monkeypatch.setattr(geocode_service.requests, "get", fake_get)
+
+@pytest.mark.integration
+def test_geocode_not_found(mock_upstream):
+    mock_upstream(lambda request: httpx.Response(200, json={"results": []}))
 
     response = client.get("/geocode", params={"city": "Nowhereville"})
     assert response.status_code == 404
+    assert response.headers["cache-control"] == "public, max-age=3600"
 
 
 @pytest.mark.integration
-def test_geocode_service_error(monkeypatch):
-    def fake_get(url, params, timeout):
-        raise RuntimeError("boom")
+def test_geocode_service_error(mock_upstream):
+    def handler(request):
+        raise httpx.ConnectError("boom", request=request)
 
-    monkeypatch.setattr(geocode_service.requests, "get", fake_get)
+    mock_upstream(handler)
 
     response = client.get("/geocode", params={"city": "Paris"})
     assert response.status_code == 502
 
 
 @pytest.mark.integration
-def test_rain_endpoint_reports_rain(monkeypatch):
-    def fake_get(url, params, timeout):
-        return _DummyResponse({
-            "hourly": {
-                "precipitation_probability": [80, 90, 95],
-                "precipitation": [0.7, 1.1, 0.5],
-            }
-        })
+def test_geocode_suggest_serves_prefix_matches_offline(mock_upstream, monkeypatch):
+    def handler(request):  # pragma: no cover - must not be called
+        raise AssertionError("suggestions must not reach the upstream API")
 
-    monkeypatch.setattr(weather_service.requests, "get", fake_get)
+    mock_upstream(handler)
+    monkeypatch.setattr(gazetteer, "_index", None)  # load the bundled sample
+
+    response = client.get("/geocode/suggest", params={"q": "lond", "limit": 2})
+    assert response.status_code == 200
+    cities = response.json()
+    assert len(cities) == 2
+    assert cities[0]["name"] == "London"
+    assert cities[0]["country"] == "GB"
+    assert {"lat", "lon", "population"} <= set(cities[0])
+    assert cities[0]["matches"] == ["london"]
+
+
+@pytest.mark.integration
+def test_geocode_suggest_rejects_bad_limit():
+    response = client.get("/geocode/suggest", params={"q": "lon", "limit": 0})
+    assert response.status_code == 422
+
+
+@pytest.mark.integration
+def test_rain_endpoint_reports_rain(mock_upstream, monkeypatch):
+    mock_upstream(lambda request: httpx.Response(200, json={
+        "hourly": {
+            "precipitation_probability": [80, 90, 95],
+            "precipitation": [0.7, 1.1, 0.5],
+        }
+    }))
     monkeypatch.setattr(weather_service, "pick_message", lambda condition: f"msg:{condition}")
 
     response = client.get("/rain", params={"lat": 40.7128, "lon": -74.0060, "horizon": "3h"})
@@ -80,11 +113,194 @@ def test_rain_endpoint_reports_rain(monkeypatch):
 
 
 @pytest.mark.integration
-def test_rain_endpoint_handles_service_error(monkeypatch):
-    def fake_get(url, params, timeout):
-        return _DummyResponse({}, status_code=500)
+def test_rain_endpoint_answers_conditional_requests_without_evaluating(
+    mock_upstream, monkeypatch
+):
+    requested = []
+    mock_upstream(lambda request: requested.append(request) or httpx.Response(200, json={
+        "hourly": {"precipitation_probability": [80, 90, 95]}
+    }))
+    picked = []
+    monkeypatch.setattr(weather_service, "pick_message", picked.append)
+    params = {"lat": 40.0, "lon": -74.0, "horizon": "3h"}
+
+    first = client.get("/rain", params=params)
+    etag = first.headers["etag"]
+    repeat = client.get("/rain", params=params, headers={"If-None-Match": f'"other", {etag}'})
+    other_horizon = client.get(
+        "/rain", params={**params, "horizon": "1h"}, headers={"If-None-Match": etag}
+    )
 
-    monkeypatch.setattr(weather_service.requests, "get", fake_get)
+    assert first.status_code == 200
+    max_age = int(first.headers["cache-control"].split("max-age=")[1].split(",")[0])
+    assert 0 < max_age <= weather_service.FORECAST_TTL_SECONDS
+    assert (repeat.status_code, repeat.content) == (304, b"")
+    assert repeat.headers["etag"] == etag
+    assert other_horizon.status_code == 200
+    assert picked == ["rain", "rain"]
+    assert len(requested) == 1
+
+
+@pytest.mark.integration
+def test_rain_endpoint_handles_service_error(mock_upstream):
+    mock_upstream(lambda request: httpx.Response(500, json={}))
 
     response = client.get("/rain", params={"lat": 0.0, "lon": 0.0, "horizon": "today"})
     assert response.status_code == 502
+
+
+@pytest.mark.integration
+def test_rain_endpoint_honours_client_budget(mock_upstream):
+    calls = []
+    mock_upstream(lambda request: calls.append(request) or httpx.Response(200, json={}))
+
+    response = client.get(
+        "/rain",
+        params={"lat": 0.0, "lon": 0.0, "horizon": "today"},
+        headers={"X-Request-Budget-Ms": "0"},
+    )
+
+    assert response.status_code == 502
+    assert calls == []
+
+
+@pytest.mark.integration
+def test_rain_by_city_geocodes_and_evaluates_in_one_request(mock_upstream, monkeypatch):
+    requested = []
+
+    def handler(request):
+        requested.append(request.url.path)
+        if "search" in request.url.path:
+            return httpx.Response(200, json={
+                "results": [{"latitude": 52.52, "longitude": 13.41, "name": "Berlin"}]
+            })
+        return httpx.Response(200, json={"hourly": {"precipitation_probability": [5, 10]}})
+
+    mock_upstream(handler)
+    monkeypatch.setattr(weather_service, "pick_message", lambda condition: f"msg:{condition}")
+
+    response = client.get("/rain/by-city", params={"city": "Berlin", "horizon": "1h"})
+    revalidated = client.get(
+        "/rain/by-city",
+        params={"city": "Berlin", "horizon": "1h"},
+        headers={"If-None-Match": response.headers["etag"]},
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["name"], data["lat"], data["lon"]) == ("Berlin", 52.52, 13.41)
+    assert (data["condition"], data["message"]) == ("no_rain", "msg:no_rain")
+    # The series the page evaluates other horizons from comes along.
+    assert (data["forecast"]["lat"], data["forecast"]["lon"]) == (52.52, 13.41)
+    assert data["forecast"]["precipitation_probability"] == [5, 10]
+    assert data["forecast"]["messages"]["rain"] == "msg:rain"
+    assert revalidated.status_code == 304
+    assert len(requested) == 2
+
+
+@pytest.mark.integration
+def test_rain_by_city_unknown_city(mock_upstream):
+    mock_upstream(lambda request: httpx.Response(200, json={"results": []}))
+
+    response = client.get("/rain/by-city", params={"city": "Nowhereville"})
+    assert response.status_code == 404
+    assert response.headers["cache-control"] == "public, max-age=3600"
+
+
+@pytest.mark.integration
+def test_forecast_endpoint_serves_every_horizon_in_one_response(mock_upstream):
+    requested = []
+    mock_upstream(lambda request: requested.append(request) or httpx.Response(200, json={
+        "hourly": {"precipitation_probability": [20, 40, 70], "precipitation": [0.1, 0.2, 0.0]}
+    }))
+
+    response = client.get("/forecast", params={"lat": 30.0, "lon": 31.0})
+    revalidated = client.get(
+        "/forecast",
+        params={"lat": 30.0, "lon": 31.0},
+        headers={"If-None-Match": response.headers["etag"]},
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["precipitation_probability"] == [20, 40, 70]
+    assert data["precipitation"] == [10, 20, 0]
+    assert data["rules"]["rain_precipitation"] == 50
+    assert set(data["messages"]) == {"rain", "maybe", "no_rain"}
+    assert "max-age=" in response.headers["cache-control"]
+    assert revalidated.status_code == 304
+    assert len(requested) == 1
+
+
+@pytest.mark.integration
+def test_short_client_budgets_do_not_open_the_breaker(mock_upstream):
+    async def handler(request):
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"hourly": {"precipitation_probability": [10]}})
+
+    mock_upstream(handler)
+    params = {"lat": 20.0, "lon": 20.0, "horizon": "today"}
+
+    impatient = [
+        client.get("/rain", params=params, headers={"X-Request-Budget-Ms": "10"})
+        for _ in range(weather_service._upstream.breaker.threshold + 1)
+    ]
+    patient = client.get("/rain", params=params)
+
+    assert {response.status_code for response in impatient} == {502}
+    assert not weather_service._upstream.breaker.is_open
+    assert patient.status_code == 200
+
+
+@pytest.mark.integration
+def test_metrics_expose_route_and_upstream_latency(mock_upstream):
+    mock_upstream(lambda request: httpx.Response(503, json={}))
+    errors = main.metrics.UPSTREAM_ERRORS.labels("forecast", "status")
+    before = errors.value()
+
+    client.get("/rain", params={"lat": 10.0, "lon": 10.0, "horizon": "today"})
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert errors.value() == before + resilience.HEDGE_MAX_ATTEMPTS  # Every retry is recorded.
+    assert 'raintoday_http_request_duration_seconds_count{route="/rain"}' in response.text
+    assert 'raintoday_upstream_request_duration_seconds_bucket{api="forecast",le="+Inf"}' in (
+        response.text
+    )
+
+
+@pytest.mark.integration
+def test_rain_batch_streams_ndjson(mock_upstream, monkeypatch):
+    def handler(request):
+        count = len(request.url.params["latitude"].split(","))
+        payload = {"hourly": {"precipitation_probability": [10], "precipitation": [0.0]}}
+        return httpx.Response(200, json=[payload] * count if count > 1 else payload)
+
+    mock_upstream(handler)
+    monkeypatch.setattr(weather_service, "pick_message", lambda condition: f"msg:{condition}")
+
+    response = client.post("/rain/batch", json=[
+        {"lat": 51.5, "lon": -0.12, "horizon": "1h"},
+        {"lat": 40.7, "lon": -74.0},
+    ])
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(line["index"] for line in lines) == [0, 1]
+    assert all(line["message"] == "msg:no_rain" for line in lines)
+    assert {line["horizon"] for line in lines} == {"1h", "today"}
+
+
+@pytest.mark.integration
+def test_rain_batch_rejects_oversized_batches(monkeypatch):
+    monkeypatch.setattr(main, "RAIN_BATCH_MAX_LOCATIONS", 1)
+
+    response = client.post("/rain/batch", json=[{"lat": 0, "lon": 0}, {"lat": 1, "lon": 1}])
+    assert response.status_code == 413
+
+
+@pytest.mark.integration
+def test_rain_batch_validates_body():
+    response = client.post("/rain/batch", json=[{"lat": "north"}])
+    assert response.status_code == 422
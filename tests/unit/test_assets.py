@@ -0,0 +1,90 @@
+import gzip
+import os
+
+import pytest
+
+from src import assets
+
+PAGE = '<html><script src="/static/app.js"></script><p>{}</p></html>'
+
+
+def _write(directory, name, text):
+    path = directory / name
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def static(tmp_path):
+    _write(tmp_path, "index.html", PAGE.format("hello " * 50))
+    _write(tmp_path, "app.js", "console.log('rain');\n" * 20)
+    return tmp_path
+
+
+@pytest.mark.unit
+def test_pages_link_fingerprinted_assets(static):
+    bundle = assets.AssetBundle(static)
+
+    script, script_immutable = bundle.get("app.js")
+    page, _ = bundle.get("index.html")
+    _, html, _ = page.encoded("")
+
+    assert not script_immutable
+    assert script.url.startswith("/static/app.") and script.url.endswith(".js")
+    assert f'src="{script.url}"'.encode() in html
+    assert bundle.get(script.url.removeprefix("/static/")) == (script, True)
+    assert script.media_type == "text/javascript; charset=utf-8"
+    assert bundle.get("missing.js") is None
+
+
+@pytest.mark.unit
+def test_encoding_follows_accept_encoding(static, monkeypatch):
+    monkeypatch.setattr(assets, "brotli", None)
+    page, _ = assets.AssetBundle(static).get("index.html")
+
+    encoding, body, etag = page.encoded("deflate, gzip;q=0.5")
+    identity = page.encoded("gzip;q=0, br")
+
+    assert encoding == "gzip"
+    assert gzip.decompress(body) == identity[1]
+    assert identity[0] == "identity"
+    assert etag != identity[2]
+
+
+@pytest.mark.unit
+def test_brotli_is_preferred_when_installed(static, monkeypatch):
+    class FakeBrotli:
+        @staticmethod
+        def compress(body, quality):
+            return b"br:" + body[:10]
+
+    monkeypatch.setattr(assets, "brotli", FakeBrotli)
+    page, _ = assets.AssetBundle(static).get("index.html")
+
+    assert page.encoded("gzip, br")[0] == "br"
+    assert page.encoded("*")[0] == "br"
+    assert page.encoded("gzip")[0] == "gzip"
+
+
+@pytest.mark.unit
+def test_incompressible_files_are_served_as_is(tmp_path):
+    _write(tmp_path, "tiny.txt", "x")
+    tiny, _ = assets.AssetBundle(tmp_path).get("tiny.txt")
+
+    assert not tiny.compressed
+    assert tiny.encoded("gzip, br")[0] == "identity"
+
+
+@pytest.mark.unit
+def test_changes_are_only_picked_up_in_reload_mode(static):
+    fixed = assets.AssetBundle(static)
+    reloading = assets.AssetBundle(static, reload=True)
+    old_url = fixed.get("app.js")[0].url
+
+    script = _write(static, "app.js", "console.log('sun');\n")
+    os.utime(script, ns=(0, 10**9))
+
+    assert fixed.get("app.js")[0].url == old_url
+    new_url = reloading.get("app.js")[0].url
+    assert new_url != old_url
+    assert f'"{new_url}"'.encode() in reloading.get("index.html")[0].encoded("")[1]
@@ -0,0 +1,14 @@
+import pytest
+
+from benchmarks.suite import compare
+
+
+@pytest.mark.unit
+def test_compare_flags_only_regressions_beyond_threshold():
+    baseline = {"fast": 10.0, "steady": 10.0, "slow": 10.0}
+    results = {"fast": 5.0, "steady": 14.9, "slow": 15.1, "new": 99.0}
+
+    regressions = compare(results, baseline, threshold=0.5)
+
+    assert len(regressions) == 1
+    assert regressions[0].startswith("slow: 15.10 us/op vs baseline 10.00")
@@ -0,0 +1,51 @@
+import pytest
+
+from src.services.cache import TTLCache
+
+
+class _Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.unit
+def test_ttl_cache_expires_entries():
+    clock = _Clock()
+    cache = TTLCache(maxsize=4, clock=clock)
+    cache.set("a", 1, expires_at=1010.0)
+
+    assert cache.get("a") == 1
+    clock.now = 1010.0
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+@pytest.mark.unit
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, clock=_Clock())
+    cache.set("a", 1, expires_at=2000.0)
+    cache.set("b", 2, expires_at=2000.0)
+    assert cache.get("a") == 1
+
+    cache.set("c", 3, expires_at=2000.0)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+@pytest.mark.unit
+def test_ttl_cache_counts_hits_and_misses():
+    clock = _Clock()
+    cache = TTLCache(maxsize=4, clock=clock)
+    cache.set("a", 1, expires_at=1010.0)
+
+    cache.get("a")
+    cache.get("b")
+    clock.now = 1010.0
+    cache.get("a")
+
+    assert cache.stats() == (1, 2, 0)
@@ -0,0 +1,105 @@
+import random
+
+import pytest
+
+from src.services import conditions
+
+HORIZONS = {"today": 24, "1h": 1, "3h": 3, "6h": 6, "none": 0, "week": 168}
+
+# Values at and around every threshold, including sums that only land on
+# 0.5 mm when added exactly.
+_PROBABILITIES = [0.0, 29.9, 30.0, 30.1, 59.9, 60.0, 60.1, 100.0]
+_AMOUNTS = [0.0, 0.1, 0.2, 0.25, 0.3, 0.5, 0.1 + 0.2, 1e-9, 3.0]
+
+
+def _random_rows(rng, count):
+    probability, precipitation = [], []
+    for _ in range(count):
+        probability.append([
+            rng.choice(_PROBABILITIES) if rng.random() < 0.5 else rng.uniform(0, 100)
+            for _ in range(rng.randint(0, 30))
+        ])
+        precipitation.append([
+            rng.choice(_AMOUNTS) if rng.random() < 0.7 else rng.uniform(0, 0.3)
+            for _ in range(rng.randint(0, 30))
+        ])
+    return probability, precipitation
+
+
+def _scalar(probability, precipitation):
+    return {
+        name: [
+            conditions.determine_condition(prob[:hours], mm[:hours])[1]
+            for prob, mm in zip(probability, precipitation)
+        ]
+        for name, hours in HORIZONS.items()
+    }
+
+
+@pytest.fixture(params=["python", "numpy"])
+def backend(request, monkeypatch):
+    if request.param == "python":
+        monkeypatch.setattr(conditions, "np", None)
+    else:
+        pytest.importorskip("numpy")
+        monkeypatch.setattr(conditions, "NUMPY_MIN_ROWS", 0)
+    return request.param
+
+
+@pytest.mark.unit
+def test_determine_condition_thresholds():
+    assert conditions.determine_condition([61], [0.0]) == (True, "rain")
+    assert conditions.determine_condition([10], [0.3, 0.3]) == (True, "rain")
+    assert conditions.determine_condition([60], [0.0]) == (False, "maybe")
+    assert conditions.determine_condition([30], [0.0]) == (False, "no_rain")
+    assert conditions.determine_condition([], []) == (False, "no_rain")
+    # 0.1 + 0.2 + 0.2 is exactly 0.5 mm, which is not more than 0.5.
+    assert conditions.determine_condition([0], [0.1, 0.2, 0.2]) == (False, "no_rain")
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("seed", range(20))
+def test_evaluate_matrix_matches_scalar_rule(backend, seed):
+    rng = random.Random(seed)
+    probability, precipitation = _random_rows(rng, rng.randint(0, 80))
+
+    assert conditions.evaluate_matrix(probability, precipitation, HORIZONS) == _scalar(
+        probability, precipitation
+    )
+
+
+@pytest.mark.unit
+def test_evaluate_matrix_rejects_mismatched_rows(backend):
+    with pytest.raises(ValueError):
+        conditions.evaluate_matrix([[10.0]], [], HORIZONS)
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("seed", range(10))
+def test_window_index_matches_scalar_rule_for_every_window(seed):
+    rng = random.Random(seed)
+    (probability,), (precipitation,) = _random_rows(rng, 1)
+    windows = conditions.WindowIndex(probability, precipitation)
+    length = max(len(probability), len(precipitation))
+
+    for start in range(length + 1):
+        for stop in range(start, length + 3):
+            expected = conditions.determine_condition(
+                probability[start:stop], precipitation[start:stop]
+            )[1]
+            assert windows.condition(start, stop) == expected, (start, stop)
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("seed", range(5))
+def test_evaluate_matrix_accepts_hours_per_row(backend, seed):
+    rng = random.Random(seed)
+    probability, precipitation = _random_rows(rng, rng.randint(1, 60))
+    limits = [rng.randint(0, 30) for _ in probability]
+
+    result = conditions.evaluate_matrix(probability, precipitation, {"mixed": limits})
+
+    assert result["mixed"] == [
+        conditions.determine_condition(prob[:limit], mm[:limit])[1]
+        for prob, mm, limit in zip(probability, precipitation, limits)
+    ]
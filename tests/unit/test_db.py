@@ -1,9 +1,22 @@
+import os
+import sqlite3
 import threading
+import time
 from datetime import date, timedelta
 
 import pytest
 
-from src.db import _get_connection, get_visit_stats, increment_visits, init_db
+from src import db
+from src.db import (
+    _get_connection,
+    get_visit_stats,
+    increment_visits,
+    init_db,
+    load_forecasts,
+    load_geocode,
+    store_forecasts,
+    store_geocode,
+)
 
 
 @pytest.fixture(autouse=True)
@@ -33,6 +46,17 @@ def test_increment_visits():
     assert stats2["today_visits"] == stats["today_visits"] + 1
 
 
+@pytest.mark.unit
+def test_visit_commits_record_write_lock_wait():
+    lock_wait, busy = db._write_metrics["stats"]
+    before = lock_wait.count()
+
+    increment_visits()
+
+    assert lock_wait.count() == before + 1
+    assert busy.value() == 0
+
+
 @pytest.mark.unit
 def test_increment_visits_concurrency():
     """Test multiple concurrent increments work with minimal lock contention.
@@ -127,3 +151,401 @@ def test_get_visit_stats_when_row_missing():
 
     assert stats["total_visits"] == 0
     assert stats["today_visits"] == 0
+
+
+@pytest.mark.unit
+def test_geocode_cache_round_trip_and_expiry():
+    store_geocode("paris", {"lat": 48.85, "lon": 2.35, "name": "Paris"}, expires_at=2000.0)
+    store_geocode("atlantis", None, expires_at=2000.0)
+
+    assert load_geocode("paris", now=1000.0) == (
+        {"lat": 48.85, "lon": 2.35, "name": "Paris"},
+        2000.0,
+    )
+    assert load_geocode("atlantis", now=1000.0) == (None, 2000.0)
+    assert load_geocode("paris", now=2000.0) is None
+    assert load_geocode("unknown", now=1000.0) is None
+
+
+@pytest.mark.unit
+def test_forecast_cache_round_trip_and_expiry():
+    store_forecasts([("a", b"\x01\x02", 4e9), ("b", b"", 3e9)])
+    store_forecasts([("a", b"\x03", 4e9)])
+
+    assert load_forecasts(["a", "b", "missing"], now=2e9) == {"a": b"\x03", "b": b""}
+    assert load_forecasts(["a", "b"], now=3e9) == {"a": b"\x03"}
+    assert load_forecasts([], now=2e9) == {}
+
+
+@pytest.mark.unit
+def test_forecast_cache_lookups_span_parameter_chunks(monkeypatch):
+    monkeypatch.setattr(db, "SQLITE_MAX_LOOKUP_KEYS", 2)
+    store_forecasts([(str(index), bytes([index]), 4e9) for index in range(5)])
+
+    assert load_forecasts([str(index) for index in range(6)], now=0.0) == {
+        str(index): bytes([index]) for index in range(5)
+    }
+
+
+@pytest.mark.unit
+def test_forecast_writes_prune_expired_rows(monkeypatch):
+    monkeypatch.setattr(db, "_next_forecast_prune", float("inf"))
+    store_forecasts([("old", b"x", 1.0)])
+    monkeypatch.setattr(db, "_next_forecast_prune", 0.0)
+
+    store_forecasts([("new", b"y", 4e9)])
+
+    conn = _get_connection(db.CACHE_DB_PATH)
+    try:
+        keys = [row[0] for row in conn.execute("SELECT key FROM forecast_cache")]
+    finally:
+        conn.close()
+    assert keys == ["new"]
+
+
+@pytest.mark.unit
+def test_concurrent_forecast_writers_share_one_table():
+    def write(worker):
+        for index in range(20):
+            store_forecasts([(f"{worker}:{index}", b"z", 4e9)])
+
+    threads = [threading.Thread(target=write, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    keys = [f"{worker}:{index}" for worker in range(4) for index in range(20)]
+    assert len(load_forecasts(keys, now=0.0)) == 80
+
+
+@pytest.mark.unit
+def test_forecast_writer_coalesces_queued_writes_and_flushes_on_close(monkeypatch):
+    store = db.store_forecasts
+    started, release = threading.Event(), threading.Event()
+    batches = []
+
+    def slow_store(entries):
+        batches.append(list(entries))
+        started.set()
+        release.wait()
+        store(entries)
+
+    monkeypatch.setattr(db, "store_forecasts", slow_store)
+    db.store_forecasts_later([("a", b"1", 4e9)])
+    started.wait()
+    # Queued while the first write holds the lock: committed together.
+    db.store_forecasts_later([("b", b"2", 4e9)])
+    db.store_forecasts_later([("c", b"3", 4e9)])
+    release.set()
+    db.close_forecast_writer()
+
+    assert batches == [[("a", b"1", 4e9)], [("b", b"2", 4e9), ("c", b"3", 4e9)]]
+    assert load_forecasts(["a", "b", "c"], now=0.0) == {"a": b"1", "b": b"2", "c": b"3"}
+
+
+@pytest.mark.unit
+def test_closing_the_forecast_writer_does_not_wait_out_the_delay(monkeypatch):
+    monkeypatch.setattr(db, "FORECAST_WRITE_DELAY_SECONDS", 60.0)
+    db.store_forecasts_later([("a", b"1", 4e9)])
+
+    started = time.perf_counter()
+    db.close_forecast_writer()
+
+    assert time.perf_counter() - started < 5.0
+    assert load_forecasts(["a"], now=0.0) == {"a": b"1"}
+
+
+@pytest.mark.unit
+def test_forecast_writer_drops_failed_writes_and_keeps_going(monkeypatch):
+    store = db.store_forecasts
+    failures = [sqlite3.OperationalError("database is locked")]
+
+    def flaky_store(entries):
+        if failures:
+            raise failures.pop()
+        store(entries)
+
+    monkeypatch.setattr(db, "store_forecasts", flaky_store)
+    db.store_forecasts_later([("lost", b"x", 4e9)])
+    db.close_forecast_writer()
+    db.store_forecasts_later([("kept", b"y", 4e9)])
+    db.close_forecast_writer()
+
+    assert load_forecasts(["lost", "kept"], now=0.0) == {"kept": b"y"}
+
+
+@pytest.mark.unit
+def test_pooled_connection_is_reused_per_thread_and_tuned():
+    with db._pooled_connection() as first:
+        pass
+    with db._pooled_connection() as second:
+        assert second is first
+        assert second.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        assert second.execute("PRAGMA temp_store").fetchone()[0] == 2  # MEMORY
+
+    other = []
+
+    def borrow():
+        with db._pooled_connection() as conn:
+            other.append(conn)
+
+    thread = threading.Thread(target=borrow)
+    thread.start()
+    thread.join()
+    assert other[0] is not first
+
+
+@pytest.mark.unit
+def test_close_connections_reconnects_lazily():
+    increment_visits()
+    with db._pooled_connection() as before:
+        pass
+
+    db.close_connections()
+
+    stats = increment_visits()
+    with db._pooled_connection() as after:
+        assert after is not before
+    assert stats["total_visits"] == 2
+
+
+@pytest.mark.unit
+def test_pooled_connection_rolls_back_failed_operations():
+    with pytest.raises(RuntimeError):
+        with db._pooled_connection() as conn:
+            conn.execute("UPDATE visit_stats SET total_visits = 999 WHERE id = 1")
+            raise RuntimeError("boom")
+
+    assert get_visit_stats()["total_visits"] == 0
+
+
+@pytest.mark.unit
+def test_concurrent_increments_are_group_committed_with_exact_positions(monkeypatch):
+    batches = []
+    original = db._apply_visits
+
+    def recording_apply(batch):
+        batches.append(len(batch))
+        original(batch)
+
+    monkeypatch.setattr(db, "_apply_visits", recording_apply)
+    barrier = threading.Barrier(50)
+    results = []
+
+    def do_increment():
+        barrier.wait()
+        results.append(increment_visits())
+
+    threads = [threading.Thread(target=do_increment) for _ in range(50)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sorted(r["total_visits"] for r in results) == list(range(1, 51))
+    assert sorted(r["today_visits"] for r in results) == list(range(1, 51))
+    assert sum(batches) == 50
+    assert len(batches) < 50
+    assert get_visit_stats() == {"total_visits": 50, "today_visits": 50}
+
+
+@pytest.mark.unit
+def test_batch_straddling_midnight_resets_today_count():
+    yesterday = (date.today() - timedelta(days=1)).isoformat()
+    today = date.today().isoformat()
+    batch = [db._VisitRequest(day) for day in (yesterday, yesterday, today, today, today)]
+
+    db._apply_visits(batch)
+
+    assert [r.result for r in batch] == [
+        {"total_visits": 1, "today_visits": 1},
+        {"total_visits": 2, "today_visits": 2},
+        {"total_visits": 3, "today_visits": 1},
+        {"total_visits": 4, "today_visits": 2},
+        {"total_visits": 5, "today_visits": 3},
+    ]
+
+
+@pytest.mark.unit
+def test_close_visit_writer_flushes_pending_increments(monkeypatch):
+    release = threading.Event()
+    original = db._apply_visits
+
+    def slow_apply(batch):
+        release.wait()
+        original(batch)
+
+    monkeypatch.setattr(db, "_apply_visits", slow_apply)
+    threads = [threading.Thread(target=increment_visits) for _ in range(5)]
+    for t in threads:
+        t.start()
+
+    closer = threading.Thread(target=db.close_visit_writer)
+    closer.start()
+    release.set()
+    closer.join()
+    for t in threads:
+        t.join()
+
+    assert get_visit_stats()["total_visits"] == 5
+
+
+@pytest.mark.unit
+def test_writer_errors_reach_every_caller_in_the_batch(monkeypatch):
+    def failing_apply(batch):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(db, "_apply_visits", failing_apply)
+
+    with pytest.raises(sqlite3.OperationalError):
+        increment_visits()
+
+
+@pytest.fixture
+def sharded(monkeypatch, tmp_path):
+    monkeypatch.setattr(db, "VISIT_SHARDS", 3)
+    init_db()
+    return tmp_path
+
+
+def _set_shard(shard, total, today_count, last_updated):
+    conn = _get_connection(db._shard_path(shard))
+    conn.execute(
+        "UPDATE visit_stats SET total_visits = ?, today_visits = ?, last_updated = ? WHERE id = 1",
+        (total, today_count, last_updated),
+    )
+    conn.commit()
+    conn.close()
+
+
+@pytest.mark.unit
+def test_sharded_increments_write_own_shard_and_sum_on_read(sharded, monkeypatch):
+    _set_shard(0, 100, 10, date.today().isoformat())
+    monkeypatch.setattr(db, "_own_shard", lambda: 2)
+
+    stats = increment_visits()
+
+    assert (sharded / "stats.shard1.db").exists()
+    assert (sharded / "stats.shard2.db").exists()
+    assert stats == {"total_visits": 101, "today_visits": 11}
+    assert get_visit_stats() == stats
+    conn = _get_connection(db._shard_path(2))
+    assert conn.execute("SELECT total_visits FROM visit_stats").fetchone()[0] == 1
+    conn.close()
+
+
+@pytest.mark.unit
+def test_each_worker_claims_a_shard_of_its_own(sharded):
+    preferred = os.getpid() % 3
+    other_worker = db._lock_shard(preferred)
+    more_workers = []
+    try:
+        assert db._own_shard() == (preferred + 1) % 3
+        assert db._own_shard() == (preferred + 1) % 3  # The claim is kept.
+
+        db._release_shard()
+        more_workers = [db._lock_shard(shard) for shard in range(3) if shard != preferred]
+        assert db._own_shard() == preferred  # Every shard is taken: share one.
+    finally:
+        for fd in [other_worker, *more_workers]:
+            os.close(fd)
+        db._release_shard()
+
+
+@pytest.mark.unit
+def test_sharded_today_ignores_shards_not_updated_today(sharded):
+    yesterday = (date.today() - timedelta(days=1)).isoformat()
+    _set_shard(0, 50, 5, date.today().isoformat())
+    _set_shard(1, 30, 30, yesterday)
+
+    assert get_visit_stats() == {"total_visits": 80, "today_visits": 5}
+
+
+@pytest.mark.unit
+def test_init_db_folds_orphaned_shards_into_primary(sharded, monkeypatch):
+    today = date.today().isoformat()
+    yesterday = (date.today() - timedelta(days=1)).isoformat()
+    _set_shard(0, 10, 1, yesterday)
+    _set_shard(1, 20, 2, today)
+    _set_shard(2, 30, 3, yesterday)
+
+    monkeypatch.setattr(db, "VISIT_SHARDS", 1)
+    init_db()
+
+    assert not (sharded / "stats.shard1.db").exists()
+    assert not (sharded / "stats.shard2.db").exists()
+    assert get_visit_stats() == {"total_visits": 60, "today_visits": 2}
+
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def snapshot(monkeypatch):
+    clock = _FakeClock()
+    monkeypatch.setattr(db, "_stats_snapshot", db.StatsSnapshot(clock=clock))
+    monkeypatch.setattr(db, "STATS_REFRESH_SECONDS", 5.0)
+    return clock
+
+
+@pytest.mark.unit
+def test_get_visit_stats_is_served_from_memory_between_refreshes(snapshot, monkeypatch):
+    assert get_visit_stats() == {"total_visits": 0, "today_visits": 0}
+
+    def fail(today):  # pragma: no cover - must not be called
+        raise AssertionError("stats read from SQLite inside the refresh interval")
+
+    monkeypatch.setattr(db, "_read_visit_stats", fail)
+    snapshot.now = 4.9
+    assert get_visit_stats() == {"total_visits": 0, "today_visits": 0}
+
+
+@pytest.mark.unit
+def test_increment_visits_publishes_committed_counts(snapshot, monkeypatch):
+    get_visit_stats()
+    stats = increment_visits()
+
+    monkeypatch.setattr(db, "_read_visit_stats", lambda today: (0, 0))
+    assert get_visit_stats() == stats
+
+
+@pytest.mark.unit
+def test_snapshot_refresh_picks_up_other_writers(snapshot):
+    assert get_visit_stats()["total_visits"] == 0
+    conn = _get_connection()
+    conn.execute("UPDATE visit_stats SET total_visits = 42, today_visits = 7 WHERE id = 1")
+    conn.commit()
+    conn.close()
+
+    assert get_visit_stats()["total_visits"] == 0
+    snapshot.now = 5.0
+    assert get_visit_stats() == {"total_visits": 42, "today_visits": 7}
+
+
+@pytest.mark.unit
+def test_snapshot_reloads_when_the_day_changes(snapshot):
+    yesterday = (date.today() - timedelta(days=1)).isoformat()
+    db._stats_snapshot.publish(yesterday, 10, 10)
+
+    assert get_visit_stats() == {"total_visits": 0, "today_visits": 0}
+
+
+@pytest.mark.unit
+def test_snapshot_discards_reload_that_raced_with_publish(snapshot, monkeypatch):
+    today = date.today().isoformat()
+
+    def racing_read(day):
+        db._stats_snapshot.publish(today, 11, 11)
+        return 10, 10
+
+    monkeypatch.setattr(db, "_read_visit_stats", racing_read)
+    get_visit_stats()
+    monkeypatch.setattr(db, "_read_visit_stats", lambda day: (0, 0))
+
+    assert get_visit_stats() == {"total_visits": 11, "today_visits": 11}
@@ -0,0 +1,151 @@
+import zipfile
+
+import pytest
+
+from scripts import build_gazetteer
+from src.services import gazetteer, geocode
+
+
+def _row(name, lat, lon, country, population, ascii_name="", geoname_id=""):
+    columns = [""] * 19
+    columns[0] = str(geoname_id)
+    columns[1] = name
+    columns[2] = ascii_name or name
+    columns[4] = str(lat)
+    columns[5] = str(lon)
+    columns[6] = "P"
+    columns[8] = country
+    columns[14] = str(population)
+    return "\t".join(columns)
+
+
+@pytest.fixture
+def sample_tsv(tmp_path):
+    path = tmp_path / "cities.tsv"
+    path.write_text(
+        "\n".join(
+            [
+                _row("London", 42.9834, -81.233, "CA", 346765),
+                _row("London", 51.5085, -0.1257, "GB", 8961989),
+                _row("Londrina", -23.3103, -51.1628, "BR", 575377),
+                _row("São Paulo", -23.5475, -46.6361, "BR", 10021295, "Sao Paulo"),
+                _row("Kraków", 50.0614, 19.9366, "PL", 755050, "Krakow"),
+                "not\ta\tvalid\trow",
+            ]
+        )
+        + "\n",
+        encoding="utf-8",
+    )
+    return path
+
+
+@pytest.fixture
+def index(sample_tsv, monkeypatch):
+    loaded = gazetteer.Gazetteer.from_tsv(sample_tsv)
+    monkeypatch.setattr(gazetteer, "_index", loaded)
+    return loaded
+
+
+@pytest.mark.unit
+def test_from_tsv_skips_malformed_rows(index):
+    assert len(index) == 5
+
+
+@pytest.mark.unit
+def test_lookup_prefers_most_populous_match(index):
+    city = index.lookup("london")
+    assert city is not None
+    assert city["country"] == "GB"
+    assert city["lat"] == 51.5085
+
+
+@pytest.mark.unit
+def test_lookup_matches_accents_case_and_spacing(index):
+    assert index.lookup("  SAO   paulo ")["name"] == "São Paulo"
+    assert index.lookup("krakow")["name"] == "Kraków"
+    assert index.lookup("Lond") is None
+
+
+@pytest.mark.unit
+def test_suggest_ranks_prefix_matches_by_population(index):
+    names = [(city["name"], city["country"]) for city in index.suggest("lon")]
+    assert names == [("London", "GB"), ("Londrina", "BR"), ("London", "CA")]
+
+
+@pytest.mark.unit
+def test_suggest_lists_the_keys_each_city_matched(tmp_path):
+    path = tmp_path / "cities.tsv"
+    path.write_text(
+        _row("Bruxelles", 50.8505, 4.3488, "BE", 1019022, "Brussels") + "\n"
+        + _row("Bruges", 51.2089, 3.2242, "BE", 118284) + "\n",
+        encoding="utf-8",
+    )
+    cities = gazetteer.Gazetteer.from_tsv(path).suggest("br")
+    assert [(city["name"], city["matches"]) for city in cities] == [
+        ("Bruxelles", ["brussels", "bruxelles"]),
+        ("Bruges", ["bruges"]),
+    ]
+    # Narrowing to "brus" locally keeps Bruxelles through its ASCII name.
+    assert [city["name"] for city in cities
+            if any(key.startswith("brus") for key in city["matches"])] == ["Bruxelles"]
+
+
+@pytest.mark.unit
+def test_suggest_respects_limit_and_blank_prefix(index):
+    assert len(index.suggest("lon", limit=1)) == 1
+    assert index.suggest("   ") == []
+    assert index.suggest("zzz") == []
+
+
+@pytest.mark.unit
+def test_get_gazetteer_loads_lazily_from_configured_path(sample_tsv, monkeypatch):
+    monkeypatch.setenv("RAINTODAY_GAZETTEER_PATH", str(sample_tsv))
+    monkeypatch.setattr(gazetteer, "_index", None)
+
+    assert gazetteer.lookup_city("Londrina")["country"] == "BR"
+
+
+@pytest.mark.unit
+def test_get_gazetteer_missing_file_falls_back_to_empty(tmp_path, monkeypatch):
+    monkeypatch.setenv("RAINTODAY_GAZETTEER_PATH", str(tmp_path / "missing.tsv"))
+    monkeypatch.setattr(gazetteer, "_index", None)
+
+    assert gazetteer.lookup_city("London") is None
+    assert gazetteer.suggest_cities("Lon") == []
+
+
+@pytest.mark.unit
+def test_search_city_answers_from_gazetteer_without_upstream(index, monkeypatch):
+    def fail(*args, **kwargs):  # pragma: no cover - must not be called
+        raise AssertionError("upstream should not be queried")
+
+    monkeypatch.setattr(geocode.requests, "get", fail)
+
+    assert geocode.search_city("london") == {"lat": 51.5085, "lon": -0.1257, "name": "London"}
+
+
+@pytest.mark.unit
+def test_build_script_extracts_geonames_dump_with_ids(tmp_path):
+    dump = [
+        _row("London", 51.5085, -0.1257, "GB", 8961989, geoname_id=2643743),
+        _row("Kraków", 50.0614, 19.9366, "PL", 755050, "Krakow", geoname_id=3094802),
+        _row("Tinyville", 1.0, 1.0, "XX", 900, geoname_id=1),
+        _row("No Id", 2.0, 2.0, "XX", 50000),
+    ]
+    london = dump[0].split("\t")
+    london[3] = "Londres,Londra"
+    dump[0] = "\t".join(london)
+    source = tmp_path / "cities15000.zip"
+    with zipfile.ZipFile(source, "w") as archive:
+        archive.writestr("cities15000.txt", "\n".join(dump) + "\n")
+    output = tmp_path / "cities.tsv"
+
+    assert build_gazetteer.main(
+        ["--source", str(source), "--output", str(output), "--min-population", "1000"]
+    ) == 0
+
+    lines = output.read_text(encoding="utf-8").splitlines()
+    assert [line.split("\t")[0] for line in lines] == ["2643743", "3094802"]
+    assert lines[0].split("\t")[3] == ""  # Alternate names are not indexed.
+    built = gazetteer.Gazetteer.from_tsv(output)
+    assert built.lookup("krakow")["country"] == "PL"
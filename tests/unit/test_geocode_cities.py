@@ -1,5 +1,10 @@
+import asyncio
+import time
+
+import httpx
 import pytest
 
+from src import db
 from src.services import geocode
 
 
@@ -75,3 +80,127 @@ def test_geocode_rejects_malformed_payload(monkeypatch):
 
     with pytest.raises(geocode.GeocodeServiceError):
         geocode.search_city("Lisbon")
+
+
+@pytest.mark.unit
+def test_search_city_async_returns_first_result(mock_upstream):
+    mock_upstream(lambda request: httpx.Response(200, json={
+        "results": [{"latitude": 48.8566, "longitude": 2.3522, "name": "Paris"}],
+    }))
+
+    result = asyncio.run(geocode.search_city_async("Paris"))
+
+    assert result == {"lat": 48.8566, "lon": 2.3522, "name": "Paris"}
+
+
+@pytest.mark.unit
+def test_search_city_async_maps_404_to_not_found(mock_upstream):
+    mock_upstream(lambda request: httpx.Response(404))
+
+    with pytest.raises(geocode.CityNotFoundError):
+        asyncio.run(geocode.search_city_async("Atlantis"))
+
+
+@pytest.mark.unit
+def test_search_city_async_coalesces_equivalent_queries(mock_upstream):
+    calls = []
+
+    async def handler(request):
+        calls.append(request.url.params["name"])
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={
+            "results": [{"latitude": 51.5, "longitude": -0.12, "name": "London"}],
+        })
+
+    mock_upstream(handler)
+
+    async def main():
+        queries = ["London", "london ", " LONDON", "London"]
+        return await asyncio.gather(*(geocode.search_city_async(q) for q in queries))
+
+    results = asyncio.run(main())
+
+    assert len(calls) == 1
+    assert all(result["name"] == "London" for result in results)
+
+
+@pytest.mark.unit
+def test_normalize_city_name_folds_case_space_and_accents():
+    assert geocode.normalize_city_name("  São   Paulo ") == "sao paulo"
+    assert geocode.normalize_city_name("ZÜRICH") == geocode.normalize_city_name("zurich")
+
+
+@pytest.mark.unit
+def test_search_city_serves_repeats_from_memory(monkeypatch):
+    calls = []
+
+    def fake_get(url, params, timeout):
+        calls.append(params["name"])
+        return _DummyResponse(
+            {"results": [{"latitude": 47.37, "longitude": 8.54, "name": "Zürich"}]}
+        )
+
+    monkeypatch.setattr(geocode.requests, "get", fake_get)
+
+    first = geocode.search_city("Zürich")
+    second = geocode.search_city(" ZURICH ")
+
+    assert calls == ["Zürich"]
+    assert first == second == {"lat": 47.37, "lon": 8.54, "name": "Zürich"}
+
+
+@pytest.mark.unit
+def test_search_city_survives_restart_via_sqlite(monkeypatch):
+    calls = []
+
+    def fake_get(url, params, timeout):
+        calls.append(params["name"])
+        return _DummyResponse(
+            {"results": [{"latitude": 51.5, "longitude": -0.12, "name": "London"}]}
+        )
+
+    monkeypatch.setattr(geocode.requests, "get", fake_get)
+    geocode.search_city("London")
+
+    # Simulate a restart: the in-memory tier is gone, SQLite is not.
+    geocode._lookup_cache.clear()
+    result = geocode.search_city("london")
+
+    assert calls == ["London"]
+    assert result["name"] == "London"
+
+
+@pytest.mark.unit
+def test_search_city_caches_misses_with_shorter_ttl(monkeypatch):
+    calls = []
+
+    def fake_get(url, params, timeout):
+        calls.append(params["name"])
+        return _DummyResponse({"results": []})
+
+    monkeypatch.setattr(geocode.requests, "get", fake_get)
+    monkeypatch.setattr(geocode, "GEOCODE_NEGATIVE_TTL_SECONDS", 60.0)
+
+    for _ in range(3):
+        with pytest.raises(geocode.CityNotFoundError):
+            geocode.search_city("Lodnon")
+
+    assert calls == ["Lodnon"]
+    stored = db.load_geocode("lodnon", time.time())
+    assert stored is not None
+    assert stored[0] is None
+    assert stored[1] <= time.time() + 60.0
+
+
+@pytest.mark.unit
+def test_search_city_does_not_cache_service_errors(monkeypatch):
+    responses = [
+        _DummyResponse({}, status_code=500),
+        _DummyResponse({"results": [{"latitude": 1.0, "longitude": 2.0, "name": "Lima"}]}),
+    ]
+    monkeypatch.setattr(geocode.requests, "get", lambda *args, **kwargs: responses.pop(0))
+
+    with pytest.raises(geocode.GeocodeServiceError):
+        geocode.search_city("Lima")
+
+    assert geocode.search_city("Lima")["name"] == "Lima"
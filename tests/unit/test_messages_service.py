@@ -1,4 +1,6 @@
 import json
+import os
+import threading
 
 import pytest
 
@@ -47,3 +49,96 @@ def test_load_messages_filters_invalid_entries(tmp_path, monkeypatch):
     assert loaded["rain"] == ["Valid"]
     assert "maybe" not in loaded
     assert "extra" not in loaded
+
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def catalog_file(tmp_path, monkeypatch):
+    path = tmp_path / "messages.json"
+    path.write_text(json.dumps({"rain": ["First"]}), encoding="utf-8")
+    clock = _FakeClock()
+    monkeypatch.setattr(messages, "_messages_path", lambda: path)
+    monkeypatch.setattr(messages, "_catalog", messages.MessageCatalog(clock=clock))
+    monkeypatch.setattr(messages, "MESSAGES_CHECK_INTERVAL_SECONDS", 5.0)
+    monkeypatch.setattr(messages.random, "choice", lambda seq: seq[0])
+    return path, clock
+
+
+def _rewrite(path, payload):
+    path.write_text(payload, encoding="utf-8")
+    # Make sure the change is visible even on filesystems with coarse mtimes.
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.mark.unit
+def test_pick_message_does_not_reread_file_between_checks(catalog_file, monkeypatch):
+    path, clock = catalog_file
+    assert messages.pick_message("rain") == "First"
+
+    def fail(path):  # pragma: no cover - must not be called
+        raise AssertionError("catalog re-read inside the check interval")
+
+    monkeypatch.setattr(messages, "_read_catalog", fail)
+    clock.now = 4.9
+    assert messages.pick_message("rain") == "First"
+
+
+@pytest.mark.unit
+def test_pick_message_reloads_changed_file_after_interval(catalog_file):
+    path, clock = catalog_file
+    assert messages.pick_message("rain") == "First"
+
+    _rewrite(path, json.dumps({"rain": ["Second"]}))
+    assert messages.pick_message("rain") == "First"
+
+    clock.now = 5.0
+    assert messages.pick_message("rain") == "Second"
+
+
+@pytest.mark.unit
+def test_malformed_file_keeps_last_good_catalog(catalog_file):
+    path, clock = catalog_file
+    assert messages.pick_message("rain") == "First"
+
+    _rewrite(path, '{"rain": ["trunc')
+    clock.now = 5.0
+    assert messages.pick_message("rain") == "First"
+
+    _rewrite(path, json.dumps({"rain": ["Fixed"]}))
+    clock.now = 10.0
+    assert messages.pick_message("rain") == "Fixed"
+
+
+@pytest.mark.unit
+def test_concurrent_lookups_parse_file_once(catalog_file, monkeypatch):
+    reads = []
+    original = messages._read_catalog
+
+    def counting_read(path):
+        reads.append(path)
+        return original(path)
+
+    monkeypatch.setattr(messages, "_read_catalog", counting_read)
+    barrier = threading.Barrier(8)
+    results = []
+
+    def worker():
+        barrier.wait()
+        results.append(messages.pick_message("rain"))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["First"] * 8
+    assert len(reads) == 1
@@ -0,0 +1,89 @@
+import gc
+import threading
+
+import pytest
+
+from src.metrics import Callback, Counter, Histogram, Registry, _Family
+
+
+@pytest.mark.unit
+def test_counter_sums_per_thread_cells_at_scrape_time():
+    counter = Counter("jobs_total", "Jobs.", ("kind",), registry=Registry())
+    child = counter.labels("fast")
+
+    def work():
+        for _ in range(1000):
+            child.inc()
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    child.inc(0.5)
+
+    assert child.value() == 8000.5
+    assert counter.labels("fast") is child
+
+
+@pytest.mark.unit
+def test_exited_threads_are_folded_into_a_retired_total():
+    child = Counter("tasks_total", "Tasks.", registry=Registry()).labels()
+
+    for _ in range(50):
+        thread = threading.Thread(target=child.inc, args=(2.0,))
+        thread.start()
+        thread.join()
+    gc.collect()
+
+    assert child.value() == 100.0
+    assert len(child._cells._shards) == 0
+
+
+@pytest.mark.unit
+def test_histogram_buckets_are_cumulative_and_inclusive():
+    histogram = Histogram("wait_seconds", "Wait.", buckets=(0.1, 1.0), registry=Registry())
+    child = histogram.labels()
+    for value in (0.05, 0.1, 0.5, 3.0):
+        child.observe(value)
+
+    assert child.buckets()[:2] == [(0.1, 2), (1.0, 3)]
+    assert child.buckets()[-1][1] == child.count() == 4
+    assert child.sum() == pytest.approx(3.65)
+
+
+@pytest.mark.unit
+def test_registry_renders_prometheus_text_format():
+    registry = Registry()
+    Counter("hits_total", "Hits.", ("path",), registry=registry).labels('/a"b').inc(2)
+    Histogram("lat_seconds", "Latency.", buckets=(1.0,), registry=registry).labels().observe(0.25)
+    gauge = Callback("depth", "Queue depth.", "gauge", registry=registry)
+    gauge.add(lambda: [((), 3)])
+
+    assert registry.render() == (
+        "# HELP hits_total Hits.\n"
+        "# TYPE hits_total counter\n"
+        'hits_total{path="/a\\"b"} 2\n'
+        "# HELP lat_seconds Latency.\n"
+        "# TYPE lat_seconds histogram\n"
+        'lat_seconds_bucket{le="1"} 1\n'
+        'lat_seconds_bucket{le="+Inf"} 1\n'
+        "lat_seconds_sum 0.25\n"
+        "lat_seconds_count 1\n"
+        "# HELP depth Queue depth.\n"
+        "# TYPE depth gauge\n"
+        "depth 3\n"
+    )
+    with pytest.raises(ValueError):
+        Counter("hits_total", "Again.", registry=registry)
+
+
+@pytest.mark.unit
+def test_family_without_render_cannot_be_created():
+    class Gauge(_Family):
+        kind = "gauge"
+
+    registry = Registry()
+    with pytest.raises(TypeError):
+        Gauge("depth", "Queue depth.", registry=registry)
+    assert "depth" not in registry.render()
@@ -0,0 +1,211 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from benchmarks.stub_upstream import UpstreamBehavior, create_app
+from src.services import http as http_client
+from src.services import resilience, weather
+
+URL = "http://stub/v1/forecast"
+PARAMS = {"latitude": 1.0, "longitude": 2.0, "hourly": "precipitation", "forecast_days": 1}
+
+
+@pytest.fixture
+def stub_upstream(monkeypatch):
+    """Serve the shared upstream pools from the local Open-Meteo stub."""
+
+    def install(behavior):
+        transport = httpx.ASGITransport(app=create_app(behavior))
+        client = http_client.build_async_client(transport=transport)
+        monkeypatch.setattr(http_client, "_pools", [(client, asyncio.Semaphore(8))])
+
+    return install
+
+
+def _get(upstream, budget=None):
+    async def call():
+        if budget is None:
+            return await upstream.get(URL, PARAMS)
+        with resilience.deadline(budget):
+            return await upstream.get(URL, PARAMS)
+
+    return asyncio.run(call())
+
+
+@pytest.mark.unit
+def test_slow_attempt_is_hedged_and_first_answer_wins(mock_upstream, monkeypatch):
+    monkeypatch.setattr(resilience, "HEDGE_MAX_DELAY_SECONDS", 0.05)
+    calls = []
+
+    async def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            await asyncio.sleep(2)
+        return httpx.Response(200, json={"attempt": len(calls)})
+
+    mock_upstream(handler)
+    hedges = weather._upstream._hedges.value()
+
+    started = time.monotonic()
+    response = _get(weather._upstream, budget=3)
+
+    assert response.json() == {"attempt": 2}
+    assert time.monotonic() - started < 1
+    assert weather._upstream._hedges.value() == hedges + 1
+
+
+@pytest.mark.unit
+def test_failed_attempt_is_retried_after_backoff(mock_upstream):
+    statuses = iter([503, 200])
+    mock_upstream(lambda request: httpx.Response(next(statuses), json={}))
+    retries = weather._upstream._retries.value()
+
+    assert _get(weather._upstream).status_code == 200
+    assert weather._upstream._retries.value() == retries + 1
+
+
+@pytest.mark.unit
+def test_deadline_cuts_slow_upstream_short(stub_upstream):
+    stub_upstream(UpstreamBehavior(latency=5))
+
+    started = time.monotonic()
+    with pytest.raises(resilience.DeadlineExceeded):
+        _get(weather._upstream, budget=0.2)
+
+    assert time.monotonic() - started < 1
+
+
+@pytest.mark.unit
+def test_exhausted_budget_skips_the_upstream(mock_upstream):
+    calls = []
+    mock_upstream(lambda request: calls.append(request) or httpx.Response(200, json={}))
+
+    with pytest.raises(resilience.DeadlineExceeded):
+        _get(weather._upstream, budget=0)
+
+    assert calls == []
+
+
+@pytest.mark.unit
+def test_budget_reaches_sync_calls_in_worker_threads(monkeypatch):
+    timeouts = []
+
+    class Response:
+        status_code = 200
+
+        def json(self):
+            return {"hourly": {"precipitation_probability": [10]}}
+
+    def fake_get(url, params, timeout):
+        timeouts.append(timeout)
+        return Response()
+
+    monkeypatch.setattr(weather.requests, "get", fake_get)
+
+    async def run():
+        with resilience.deadline(0.5):
+            await asyncio.to_thread(weather.get_rain_forecast, 10.0, 10.0, "1h")
+
+    asyncio.run(run())
+
+    assert 0 < timeouts[0] <= 0.5
+
+
+@pytest.mark.unit
+def test_breaker_opens_fails_fast_and_recovers_after_a_probe(stub_upstream, monkeypatch):
+    breaker = weather._upstream.breaker
+    monkeypatch.setattr(breaker, "threshold", 2)
+    monkeypatch.setattr(breaker, "reset_seconds", 0.1)
+    monkeypatch.setattr(resilience, "HEDGE_MAX_ATTEMPTS", 1)
+    stub_upstream(UpstreamBehavior(latency=0, error_rate=1.0))
+
+    assert [_get(weather._upstream).status_code for _ in range(2)] == [500, 500]
+    with pytest.raises(resilience.CircuitOpenError):
+        _get(weather._upstream)
+
+    time.sleep(0.15)
+    stub_upstream(UpstreamBehavior(latency=0))
+    assert _get(weather._upstream).status_code == 200
+    assert not breaker.is_open
+
+
+@pytest.mark.unit
+def test_only_the_servers_own_budget_running_out_counts_against_the_breaker(
+    stub_upstream, monkeypatch
+):
+    breaker = weather._upstream.breaker
+    monkeypatch.setattr(breaker, "threshold", 1)
+    stub_upstream(UpstreamBehavior(latency=0.2))
+
+    for _ in range(3):
+        with pytest.raises(resilience.DeadlineExceeded):
+            _get(weather._upstream, budget=0.02)  # The client asked for 20 ms.
+    assert not breaker.is_open
+
+    monkeypatch.setattr(resilience, "REQUEST_BUDGET_SECONDS", 0.02)
+
+    async def within_server_budget():
+        with resilience.server_deadline():
+            return await weather._upstream.get(URL, PARAMS)
+
+    with pytest.raises(resilience.DeadlineExceeded):
+        asyncio.run(within_server_budget())
+    assert breaker.is_open
+
+
+@pytest.mark.unit
+def test_impatient_caller_does_not_cancel_the_shared_fetch(mock_upstream, monkeypatch):
+    monkeypatch.setattr(weather, "pick_message", lambda condition: condition)
+    calls = []
+
+    async def handler(request):
+        calls.append(request)
+        await asyncio.sleep(0.1)
+        return httpx.Response(200, json={"hourly": {"precipitation_probability": [90]}})
+
+    mock_upstream(handler)
+
+    async def impatient():
+        with resilience.deadline(0.01):
+            return await weather.get_rain_forecast_async(7.0, 7.0, "1h")
+
+    async def run():
+        return await asyncio.gather(
+            impatient(), weather.get_rain_forecast_async(7.0, 7.0, "1h"), return_exceptions=True
+        )
+
+    gave_up, waited = asyncio.run(run())
+
+    assert isinstance(gave_up, weather.WeatherServiceError)
+    assert waited["condition"] == "rain"
+    assert len(calls) == 1
+
+
+@pytest.mark.unit
+def test_open_breaker_serves_cached_forecast(monkeypatch):
+    monkeypatch.setattr(weather, "pick_message", lambda condition: condition)
+    forecast = weather.HourlyForecast((90.0,), (0.0,), 0)
+    now = time.time()
+    cell = weather._grid_cell(5.0, 5.0)
+    # Past the stale-while-revalidate window, so only stale-if-error serves it.
+    expired = now - weather.FORECAST_STALE_SECONDS - 60
+    weather._forecast_cache.set(cell, (forecast, expired), now + 3600)
+    for _ in range(weather._upstream.breaker.threshold):
+        weather._upstream.breaker.record(False)
+
+    result = asyncio.run(weather.get_rain_forecast_async(5.0, 5.0, "1h"))
+
+    assert result["condition"] == "rain"
+
+
+@pytest.mark.unit
+def test_hedge_delay_tracks_recent_p95(monkeypatch):
+    upstream = weather._upstream
+    monkeypatch.setattr(upstream, "_latencies", type(upstream._latencies)(maxlen=256))
+    assert upstream.hedge_delay() == resilience.HEDGE_MAX_DELAY_SECONDS
+
+    upstream._latencies.extend(index / 1000 for index in range(1, 101))
+
+    assert upstream.hedge_delay() == pytest.approx(0.095)
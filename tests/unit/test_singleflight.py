@@ -0,0 +1,91 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.services.singleflight import AsyncSingleFlight, SingleFlight
+
+
+def _run_concurrently(count, target):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+@pytest.mark.unit
+def test_single_flight_shares_one_call_between_threads():
+    flight = SingleFlight()
+    calls = []
+    results = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.1)
+        return "forecast"
+
+    _run_concurrently(10, lambda: results.append(flight.do("cell", fetch)))
+
+    assert len(calls) == 1
+    assert results == ["forecast"] * 10
+
+
+@pytest.mark.unit
+def test_single_flight_propagates_errors_to_every_waiter():
+    flight = SingleFlight()
+    errors = []
+
+    def fetch():
+        time.sleep(0.1)
+        raise RuntimeError("upstream down")
+
+    def call():
+        try:
+            flight.do("cell", fetch)
+        except RuntimeError as exc:
+            errors.append(str(exc))
+
+    _run_concurrently(5, call)
+
+    assert errors == ["upstream down"] * 5
+    # The failed flight is forgotten, so the next caller retries.
+    assert flight.do("cell", lambda: "recovered") == "recovered"
+
+
+@pytest.mark.unit
+def test_async_single_flight_shares_one_call():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "forecast"
+
+    async def main():
+        return await asyncio.gather(*(flight.do("cell", fetch) for _ in range(10)))
+
+    assert asyncio.run(main()) == ["forecast"] * 10
+    assert len(calls) == 1
+
+
+@pytest.mark.unit
+def test_async_single_flight_propagates_errors_and_survives_cancellation():
+    flight = AsyncSingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do("cell", fetch))
+        await asyncio.sleep(0)
+        followers = [asyncio.ensure_future(flight.do("cell", fetch)) for _ in range(3)]
+        leader.cancel()
+        return await asyncio.gather(*followers, return_exceptions=True)
+
+    outcomes = asyncio.run(main())
+
+    assert [str(outcome) for outcome in outcomes] == ["upstream down"] * 3
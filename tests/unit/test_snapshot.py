@@ -0,0 +1,85 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.services import geocode, snapshot, weather
+
+
+def _fill_caches():
+    now = time.time()
+    forecast = weather.HourlyForecast((10.0, 80.0), (0.0, 1.5, 0.2), 3600, now // 3600 * 3600)
+    weather._forecast_cache.set((100, -20), (forecast, now + 600), now + 7200)
+    geocode._lookup_cache.set("paris", {"lat": 48.85, "lon": 2.35, "name": "Paris"}, now + 3600)
+    geocode._lookup_cache.set("nowhere", geocode._NOT_FOUND, now + 3600)
+    return forecast, now
+
+
+@pytest.mark.unit
+def test_snapshot_round_trip_restores_entries_lazily(tmp_path):
+    path = str(tmp_path / "cache.snapshot")
+    forecast, now = _fill_caches()
+
+    assert snapshot.save_caches(path) == 3
+    weather._forecast_cache.clear()
+    geocode._lookup_cache.clear()
+
+    assert snapshot.load_caches(path) == 3
+    assert len(weather._forecast_cache) == 0
+    assert weather._forecast_cache.get((100, -20)) == (forecast, now + 600)
+    assert len(weather._forecast_cache) == 1
+    assert geocode.search_city("Paris") == {"lat": 48.85, "lon": 2.35, "name": "Paris"}
+    with pytest.raises(geocode.CityNotFoundError):
+        geocode.search_city("Nowhere")
+
+
+@pytest.mark.unit
+def test_snapshot_carries_over_entries_never_requested(tmp_path):
+    path = str(tmp_path / "cache.snapshot")
+    _fill_caches()
+    snapshot.save_caches(path)
+    weather._forecast_cache.clear()
+    geocode._lookup_cache.clear()
+
+    snapshot.load_caches(path)
+    assert snapshot.save_caches(path) == 3
+
+
+@pytest.mark.unit
+def test_snapshot_drops_expired_entries_on_load(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.snapshot")
+    _fill_caches()
+    snapshot.save_caches(path)
+    weather._forecast_cache.clear()
+    geocode._lookup_cache.clear()
+
+    # Geocode entries expire after an hour, the forecast entry after two.
+    monkeypatch.setattr(snapshot, "time", SimpleNamespace(time=lambda: time.time() + 5000))
+
+    assert snapshot.load_caches(path) == 1
+    assert geocode._lookup_cache.get("paris") is None
+    assert weather._forecast_cache.get((100, -20)) is not None
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("damage", ["truncate", "version", "garbage", "empty"])
+def test_unusable_snapshot_starts_cold(tmp_path, damage):
+    path = tmp_path / "cache.snapshot"
+    _fill_caches()
+    snapshot.save_caches(str(path))
+    weather._forecast_cache.clear()
+    data = path.read_bytes()
+    path.write_bytes({
+        "truncate": data[:-5],
+        "version": data[:4] + b"\x63\x00" + data[6:],
+        "garbage": b"not a snapshot at all, just text",
+        "empty": b"",
+    }[damage])
+
+    assert snapshot.load_caches(str(path)) == 0
+    assert weather._forecast_cache.get((100, -20)) is None
+
+
+@pytest.mark.unit
+def test_missing_snapshot_is_ignored(tmp_path):
+    assert snapshot.load_caches(str(tmp_path / "absent.snapshot")) == 0
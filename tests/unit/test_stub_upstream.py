@@ -0,0 +1,63 @@
+import asyncio
+import random
+
+import httpx
+import pytest
+
+from benchmarks.loadgen import parse_mix, percentile
+from benchmarks.stub_upstream import UpstreamBehavior, create_app, forecast_payload
+from src.services import weather
+
+
+def _get(app, path):
+    async def fetch():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://stub") as client:
+            return await client.get(path)
+
+    return asyncio.run(fetch())
+
+
+@pytest.mark.unit
+def test_stub_multi_location_forecast_decodes_like_open_meteo():
+    app = create_app(UpstreamBehavior(latency=0))
+
+    response = _get(app, "/v1/forecast?latitude=10,20&longitude=30,40&forecast_days=2")
+
+    forecasts = weather._decode_batch_response(response, 2)
+    assert [len(forecast.precipitation_probability) for forecast in forecasts] == [48, 48]
+    assert forecast_payload(10, 30, 48)["hourly"] == response.json()[0]["hourly"]
+
+
+@pytest.mark.unit
+def test_stub_rate_limit_and_errors():
+    limited = create_app(UpstreamBehavior(latency=0, rate_limit=1))
+    failing = create_app(UpstreamBehavior(latency=0, error_rate=1.0))
+
+    statuses = [_get(limited, "/v1/search?name=Paris").status_code for _ in range(3)]
+
+    assert statuses[0] == 200 and 429 in statuses[1:]
+    assert _get(failing, "/v1/search?name=Paris").status_code == 500
+
+
+@pytest.mark.unit
+def test_stub_latency_distributions():
+    rng = random.Random(1)
+    uniform = UpstreamBehavior(latency=0.1, latency_dist="uniform", jitter=0.05)
+
+    samples = [uniform.delay(rng) for _ in range(200)]
+
+    assert all(0.05 <= sample <= 0.15 for sample in samples)
+    assert UpstreamBehavior(latency=0.1).delay(rng) == 0.1
+
+
+@pytest.mark.unit
+def test_loadgen_mix_and_percentiles():
+    assert parse_mix("rain=7, geocode=2,stats") == {"rain": 7.0, "geocode": 2.0, "stats": 1.0}
+    with pytest.raises(ValueError):
+        parse_mix("rain=1,teapot=2")
+
+    values = [float(value) for value in range(1, 101)]
+    assert percentile(values, 0.5) == 50.0
+    assert percentile(values, 0.99) == 99.0
+    assert percentile([], 0.5) == 0.0
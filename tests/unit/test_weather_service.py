@@ -1,5 +1,15 @@
+import asyncio
+import random
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+import httpx
 import pytest
 
+from src import db
 from src.services import weather
 
 
@@ -96,3 +106,579 @@ def test_get_rain_forecast_raises_on_bad_json(monkeypatch):
 
     with pytest.raises(weather.WeatherServiceError):
         weather.get_rain_forecast(0.0, 0.0, "today")
+
+
+@pytest.mark.unit
+def test_get_rain_forecast_serves_all_horizons_from_one_fetch(monkeypatch):
+    payload = {
+        "utc_offset_seconds": 3600,
+        "hourly": {
+            "precipitation_probability": [10, 20, 45, 80, 10, 10],
+            "precipitation": [0.0, 0.0, 0.0, 0.0, 0.0, 0.0],
+        },
+    }
+    calls = []
+
+    def fake_get(url, params, timeout):
+        calls.append(params)
+        return _DummyResponse(payload)
+
+    monkeypatch.setattr(weather.requests, "get", fake_get)
+    monkeypatch.setattr(weather, "pick_message", lambda condition: condition)
+
+    one_hour = weather.get_rain_forecast(52.5200, 13.4050, "1h")
+    three_hours = weather.get_rain_forecast(52.5201, 13.4049, "3h")
+    six_hours = weather.get_rain_forecast(52.5200, 13.4050, "6h")
+
+    assert len(calls) == 1
+    assert one_hour["condition"] == "no_rain"
+    assert three_hours["condition"] == "maybe"
+    assert three_hours["lat"] == 52.5201
+    assert six_hours["condition"] == "rain"
+
+
+@pytest.mark.unit
+def test_get_rain_forecast_refetches_distant_cells(monkeypatch):
+    calls = []
+
+    def fake_get(url, params, timeout):
+        calls.append((params["latitude"], params["longitude"]))
+        return _DummyResponse({"hourly": {}})
+
+    monkeypatch.setattr(weather.requests, "get", fake_get)
+    monkeypatch.setattr(weather, "pick_message", lambda condition: condition)
+
+    weather.get_rain_forecast(52.52, 13.40, "today")
+    weather.get_rain_forecast(48.85, 2.35, "today")
+
+    assert calls == [(52.5, 13.4), (48.85, 2.35)]
+
+
+@pytest.mark.unit
+def test_forecast_expiry_aligns_with_hourly_model_refresh(monkeypatch):
+    monkeypatch.setattr(weather, "FORECAST_TTL_SECONDS", 3600.0)
+    assert weather._forecast_expiry(7200.0 + 1800.0) == 10800.0
+
+    monkeypatch.setattr(weather, "FORECAST_TTL_SECONDS", 600.0)
+    assert weather._forecast_expiry(7200.0 + 1800.0) == 7200.0 + 2400.0
+
+
+@pytest.mark.unit
+def test_get_rain_forecast_does_not_cache_errors(monkeypatch):
+    responses = [
+        _DummyResponse({}, status_code=500),
+        _DummyResponse({"hourly": {"precipitation_probability": [90]}}),
+    ]
+    monkeypatch.setattr(
+        weather.requests,
+        "get",
+        lambda *args, **kwargs: responses.pop(0),
+    )
+    monkeypatch.setattr(weather, "pick_message", lambda condition: condition)
+
+    with pytest.raises(weather.WeatherServiceError):
+        weather.get_rain_forecast(1.0, 1.0, "1h")
+
+    assert weather.get_rain_forecast(1.0, 1.0, "1h")["condition"] == "rain"
+
+
+@pytest.mark.unit
+def test_get_rain_forecast_async_uses_shared_client(mock_upstream, monkeypatch):
+    requested = []
+
+    def handler(request):
+        requested.append(dict(request.url.params))
+        return httpx.Response(200, json={
+            "hourly": {"precipitation_probability": [40], "precipitation": [0.0]},
+        })
+
+    mock_upstream(handler)
+    monkeypatch.setattr(weather, "pick_message", lambda condition: condition)
+
+    result = asyncio.run(weather.get_rain_forecast_async(40.0, -74.0, "1h"))
+
+    assert result["condition"] == "maybe"
+    assert requested[0]["latitude"] == "40.0"
+    assert requested[0]["hourly"] == "precipitation_probability,precipitation"
+
+
+@pytest.mark.unit
+def test_get_rain_forecast_async_wraps_transport_errors(mock_upstream):
+    def handler(request):
+        raise httpx.ReadTimeout("slow", request=request)
+
+    mock_upstream(handler)
+
+    with pytest.raises(weather.WeatherServiceError):
+        asyncio.run(weather.get_rain_forecast_async(0.0, 0.0, "today"))
+
+
+@pytest.mark.unit
+def test_get_rain_forecast_coalesces_concurrent_misses(monkeypatch):
+    calls = []
+
+    def slow_get(url, params, timeout):
+        calls.append(params)
+        time.sleep(0.1)
+        return _DummyResponse({"hourly": {"precipitation_probability": [70]}})
+
+    monkeypatch.setattr(weather.requests, "get", slow_get)
+    monkeypatch.setattr(weather, "pick_message", lambda condition: condition)
+
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(weather.get_rain_forecast(51.5, -0.12, "1h"))
+        )
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert [result["condition"] for result in results] == ["rain"] * 8
+
+
+def _collect(queries):
+    async def run():
+        return [result async for result in weather.iter_rain_forecasts_async(queries)]
+
+    return asyncio.run(run())
+
+
+def _multi_location_handler(requested, probability_for=lambda lat: 80):
+    def handler(request):
+        params = request.url.params
+        requested.append(params["latitude"])
+        lats = [float(lat) for lat in params["latitude"].split(",")]
+        payloads = [
+            {"hourly": {"precipitation_probability": [probability_for(lat)], "precipitation": [0]}}
+            for lat in lats
+        ]
+        return httpx.Response(200, json=payloads if len(payloads) > 1 else payloads[0])
+
+    return handler
+
+
+@pytest.mark.unit
+def test_batch_dedupes_queries_by_grid_cell(mock_upstream, monkeypatch):
+    requested = []
+    mock_upstream(_multi_location_handler(requested))
+    monkeypatch.setattr(weather, "pick_message", lambda condition: condition)
+
+    results = _collect([(51.5, -0.12, "1h"), (51.51, -0.121, "today"), (40.0, -74.0, "3h")])
+
+    assert len(requested) == 1
+    assert requested[0].count(",") == 1
+    assert sorted(result["index"] for result in results) == [0, 1, 2]
+    by_index = {result["index"]: result for result in results}
+    assert by_index[1]["horizon"] == "today"
+    assert by_index[1]["hours"] == 24
+    assert by_index[2]["lat"] == 40.0
+    assert all(result["condition"] == "rain" for result in results)
+
+
+@pytest.mark.unit
+def test_batch_matches_single_location_responses(mock_upstream, monkeypatch):
+    requested = []
+    mock_upstream(_multi_location_handler(requested, lambda lat: 45 if lat > 45 else 10))
+    monkeypatch.setattr(weather, "pick_message", lambda condition: f"msg:{condition}")
+
+    results = {
+        result["index"]: result for result in _collect([(50.0, 8.0, "6h"), (0.0, 0.0, "1h")])
+    }
+
+    weather._forecast_cache.clear()
+    assert {key: value for key, value in results[0].items() if key != "index"} == asyncio.run(
+        weather.get_rain_forecast_async(50.0, 8.0, "6h")
+    )
+    assert results[1]["condition"] == "no_rain"
+
+
+@pytest.mark.unit
+def test_batch_chunks_cells_and_caps_concurrency(mock_upstream, monkeypatch):
+    requested = []
+    in_flight = []
+    peak = []
+    handle = _multi_location_handler(requested)
+
+    async def handler(request):
+        in_flight.append(request)
+        peak.append(len(in_flight))
+        await asyncio.sleep(0.01)
+        in_flight.remove(request)
+        return handle(request)
+
+    mock_upstream(handler)
+    monkeypatch.setattr(weather, "BATCH_CHUNK_SIZE", 3)
+    monkeypatch.setattr(weather, "BATCH_MAX_CONCURRENCY", 2)
+
+    results = _collect([(float(lat), 0.0, "1h") for lat in range(10)])
+
+    assert len(results) == 10
+    assert sorted(len(lats.split(",")) for lats in requested) == [1, 3, 3, 3]
+    assert max(peak) == 2
+
+
+@pytest.mark.unit
+def test_batch_serves_cached_cells_without_upstream(mock_upstream, monkeypatch):
+    requested = []
+    mock_upstream(_multi_location_handler(requested))
+
+    _collect([(10.0, 10.0, "1h")])
+    results = _collect([(10.0, 10.0, "today"), (20.0, 20.0, "1h")])
+
+    assert len(requested) == 2
+    assert requested[1] == "20.0"
+    assert results[0]["index"] == 0
+
+
+@pytest.mark.unit
+def test_batch_reports_failed_chunks_per_location(mock_upstream, monkeypatch):
+    def handler(request):
+        if request.url.params["latitude"].startswith("1.0"):
+            return httpx.Response(500, json={})
+        return _multi_location_handler([])(request)
+
+    mock_upstream(handler)
+    monkeypatch.setattr(weather, "BATCH_CHUNK_SIZE", 1)
+
+    results = {result["index"]: result for result in _collect([(1.0, 1.0, "1h"), (2.0, 2.0, "1h")])}
+
+    assert results[0] == {
+        "index": 0, "lat": 1.0, "lon": 1.0, "horizon": "1h", "error": "Weather API error",
+    }
+    assert results[1]["condition"] == "rain"
+    assert weather._forecast_cache.get(weather._grid_cell(1.0, 1.0)) is None
+
+
+@pytest.mark.unit
+def test_parse_forecast_packs_series_in_one_buffer():
+    forecast = weather._parse_forecast({
+        "utc_offset_seconds": 7200,
+        "hourly": {
+            "time": ["2026-10-18T00:00", "2026-10-18T01:00", "2026-10-18T02:00"],
+            "precipitation_probability": [10, None, 30],
+            "precipitation": [0.1, float("nan"), 0.2],
+        },
+    })
+
+    assert forecast.precipitation_probability.tolist() == [10.0, 0.0, 30.0]
+    assert forecast.precipitation.tolist() == [0.1, 0.0, 0.2]
+    assert forecast.start_time == datetime(2026, 10, 17, 22, tzinfo=timezone.utc).timestamp()
+    window = forecast.precipitation[:1]
+    assert isinstance(window, memoryview)
+    assert window.obj is forecast.packed()
+    assert weather._parse_forecast({"hourly": {"time": ["not a time"]}}).start_time is None
+
+
+@pytest.mark.unit
+def test_gaps_in_the_series_keep_hours_on_the_time_axis():
+    start = datetime(2026, 10, 18, tzinfo=timezone.utc).timestamp()
+    forecast = weather._parse_forecast({
+        "hourly": {
+            "time": [start + hour * 3600 for hour in range(5)],
+            "precipitation_probability": [10, None, 10, 90, 10],
+            "precipitation": [0.0, 0.0, float("nan"), 0.0, 0.6],
+        },
+    })
+    at = start + 1800
+
+    def condition(horizon, hours, when=at):
+        return weather.RainAnswer((forecast, when), 0.0, 0.0, horizon, hours, when).result()
+
+    # The 90% hour is hour 3, so three hours from hour 0 stay dry...
+    assert condition("3h", 3)["condition"] == "no_rain"
+    assert condition("4h", 4)["condition"] == "rain"
+    # ...and the 0.6 mm hour is hour 4, not pulled forward by the NaN.
+    assert condition("1h", 1, start + 4 * 3600 + 60)["condition"] == "rain"
+    assert condition("1h", 1, start + 3 * 3600 + 60)["condition"] == "rain"
+    assert condition("1h", 1, start + 2 * 3600 + 60)["condition"] == "no_rain"
+
+
+def _day_forecast(probability, zone="Europe/Berlin", day=(2026, 10, 25)):
+    """A 48-hour forecast whose first hour is local midnight of ``day``."""
+    start = datetime(*day, tzinfo=ZoneInfo(zone)).timestamp()
+    offset = int(ZoneInfo(zone).utcoffset(datetime(*day)).total_seconds())
+    return weather.HourlyForecast(probability, [0.0] * 48, offset, start, zone), start
+
+
+@pytest.mark.unit
+def test_horizons_start_at_the_current_hour():
+    probability = [0.0] * 48
+    probability[5] = 90.0
+    forecast, start = _day_forecast(probability)
+
+    at = start + 5.5 * 3600
+    entry = forecast, start + 7 * 3600
+    one_hour = weather.RainAnswer(entry, 0.0, 0.0, "1h", 1, at).result()
+    twelve_hours = weather.RainAnswer(entry, 0.0, 0.0, "12h", 12, at + 3600).result()
+    past_the_end = weather.RainAnswer(entry, 0.0, 0.0, "48h", 48, at).result()
+
+    assert one_hour["condition"] == "rain"
+    assert twelve_hours["condition"] == "no_rain"
+    assert past_the_end["hours"] == 43
+
+
+@pytest.mark.unit
+def test_today_runs_to_local_midnight_across_dst_changes():
+    probability = [0.0] * 48
+    probability[24] = 90.0  # 23:00 local on the 25-hour day the clocks go back
+    forecast, start = _day_forecast(probability)
+    fixed_offset, _ = _day_forecast(probability)
+    fixed_offset.timezone = None
+
+    at = start + 600
+    today = weather.RainAnswer((forecast, at), 0.0, 0.0, "today", 24, at).result()
+    naive = weather.RainAnswer((fixed_offset, at), 0.0, 0.0, "today", 24, at).result()
+
+    assert (today["hours"], today["condition"]) == (25, "rain")
+    assert (naive["hours"], naive["condition"]) == (24, "no_rain")
+
+
+@pytest.mark.unit
+def test_rain_answer_validators_follow_the_forecast_and_the_window():
+    forecast, start = _day_forecast([0.0] * 48)
+    at = start + 5.75 * 3600
+
+    answer = weather.RainAnswer((forecast, start + 7 * 3600), 1.0, 2.0, "3h", 3, at)
+    later = weather.RainAnswer((forecast, start + 7 * 3600), 1.0, 2.0, "3h", 3, at + 3600)
+    refetched = weather.RainAnswer((forecast, start + 8 * 3600), 1.0, 2.0, "3h", 3, at)
+    stale = weather.RainAnswer((forecast, at - 60), 1.0, 2.0, "3h", 3, at)
+
+    assert answer.etag.startswith('W/"')
+    assert len({answer.etag, later.etag, refetched.etag}) == 3
+    assert answer.max_age == 900  # The window moves on at the top of the hour.
+    assert later.max_age == 900
+    assert stale.max_age == 0
+    assert "stale-while-revalidate=" in stale.cache_control
+
+
+def _client_condition(payload, hours):
+    """The frontend's evaluation of a /forecast payload."""
+    rules = payload["rules"]
+    peak = max(payload["precipitation_probability"][:hours], default=0)
+    total = sum(payload["precipitation"][:hours])
+    if peak > rules["rain_probability"] or total > rules["rain_precipitation"]:
+        return "rain"
+    return "maybe" if peak > rules["maybe_probability"] else "no_rain"
+
+
+@pytest.mark.unit
+def test_compact_forecast_evaluates_like_the_server(monkeypatch):
+    monkeypatch.setattr(weather, "pick_message", lambda condition: f"msg:{condition}")
+    rng = random.Random(3)
+    forecast, start = _day_forecast([float(rng.randrange(0, 75)) for _ in range(48)])
+    # Open-Meteo reports 0.1 mm steps; 0.1 + 0.2 + 0.2 sits exactly on the threshold.
+    precipitation = [rng.choice([0.0, 0.0, 0.1, 0.2]) for _ in range(48)]
+    forecast = weather.HourlyForecast(
+        forecast.precipitation_probability, precipitation, forecast.utc_offset_seconds,
+        start, forecast.timezone,
+    )
+    at = start + 2.5 * 3600
+
+    payload = weather.CompactForecast((forecast, start + 7 * 3600), 1.0, 2.0, at).result()
+
+    assert len(payload["precipitation_probability"]) == 46
+    assert all(isinstance(value, int) for value in payload["precipitation"])
+    assert payload["today_hours"] == 23  # Midnight is 25 hours after the start.
+    assert payload["valid_until"] == start + 3 * 3600
+    assert payload["messages"] == {c: f"msg:{c}" for c in ("rain", "maybe", "no_rain")}
+    for horizon, hours in [("today", payload["today_hours"])] + [
+        (f"{n}h", n) for n in range(1, 49)
+    ]:
+        expected = weather.RainAnswer((forecast, at), 1.0, 2.0, horizon, hours, at).result()
+        assert _client_condition(payload, hours) == expected["condition"], horizon
+
+
+@pytest.mark.unit
+def test_compact_forecast_agrees_with_rain_answer_at_the_thresholds(monkeypatch):
+    monkeypatch.setattr(weather, "pick_message", lambda condition: condition)
+    start = datetime(2026, 10, 18, tzinfo=timezone.utc).timestamp()
+    probability = [60.4, 60.5, 59.6, 30.2, 30.5, 29.6, 0.0, 0.0, 0.0, 0.0]
+    # 0.251 + 0.251 rounds to 0.5 mm and three 0.167 mm hours to 0.51 mm.
+    precipitation = [0.0, 0.0, 0.0, 0.0, 0.251, 0.251, 0.167, 0.167, 0.167, 0.004]
+    forecast = weather._parse_forecast({
+        "hourly": {
+            "time": [start + hour * 3600 for hour in range(10)],
+            "precipitation_probability": probability,
+            "precipitation": precipitation,
+        },
+    })
+    entry = forecast, start + 3600
+
+    answers = []
+    for hour in range(10):
+        at = start + hour * 3600 + 60
+        payload = weather.CompactForecast(entry, 0.0, 0.0, at).result()
+        for hours in range(1, 11 - hour):
+            expected = weather.RainAnswer(entry, 0.0, 0.0, f"{hours}h", hours, at).result()
+            assert _client_condition(payload, hours) == expected["condition"], (hour, hours)
+            answers.append(expected["condition"])
+
+    assert {"rain", "maybe", "no_rain"} <= set(answers)
+    window = weather.RainAnswer(entry, 0.0, 0.0, "2h", 2, start + 4 * 3600).result()
+    assert window["condition"] == "no_rain"  # 30.5% and 29.6% are both 30%
+    window = weather.RainAnswer(entry, 0.0, 0.0, "3h", 3, start + 6 * 3600).result()
+    assert window["condition"] == "rain"
+
+
+@pytest.mark.unit
+def test_resolve_horizon_accepts_any_hour_count():
+    assert weather._resolve_horizon("12h") == ("12h", 12)
+    assert weather._resolve_horizon("500h") == (
+        f"{weather.MAX_HORIZON_HOURS}h", weather.MAX_HORIZON_HOURS
+    )
+    assert weather._resolve_horizon("0h") == ("today", 24)
+    assert weather._resolve_horizon("soon") == ("today", 24)
+
+
+@pytest.mark.unit
+def test_batch_results_match_single_evaluation(monkeypatch):
+    monkeypatch.setattr(weather, "pick_message", lambda condition: condition)
+    rng = random.Random(7)
+    forecasts = [
+        _day_forecast([rng.choice([0.0, 45.0, 90.0]) for _ in range(48)], zone)[0]
+        for zone in ("Europe/Berlin", "America/New_York", "Asia/Kolkata", "UTC")
+    ]
+    now = forecasts[0].start_time + 13.2 * 3600
+    queries = [
+        (float(index), 0.0, horizon)
+        for index in range(len(forecasts))
+        for horizon in ("today", "1h", "7h", "30h")
+    ]
+    plan = weather._BatchPlan(queries)
+    cells = list(plan.by_cell)
+
+    results = sorted(plan.results(cells, forecasts, now), key=lambda item: item["index"])
+
+    for result, (lat, lon, horizon) in zip(results, queries):
+        forecast = forecasts[cells.index(weather._grid_cell(lat, lon))]
+        name, hours = weather._resolve_horizon(horizon)
+        expected = weather.RainAnswer((forecast, now), lat, lon, name, hours, now).result()
+        assert {k: v for k, v in result.items() if k != "index"} == expected
+
+
+@pytest.mark.unit
+def test_forecast_fetched_by_another_worker_is_reused(mock_upstream, monkeypatch):
+    calls = []
+
+    def fake_get(url, params, timeout):
+        calls.append(params)
+        return _DummyResponse({"hourly": {"precipitation_probability": [90]}})
+
+    requested = []
+    mock_upstream(_multi_location_handler(requested))
+    monkeypatch.setattr(weather.requests, "get", fake_get)
+    monkeypatch.setattr(weather, "pick_message", lambda condition: condition)
+    weather.get_rain_forecast(5.0, 5.0, "1h")
+    _collect([(6.0, 6.0, "1h")])
+    db.close_forecast_writer()
+
+    # Another worker starts with an empty in-process cache.
+    weather._forecast_cache.clear()
+    results = [
+        weather.get_rain_forecast(6.0, 6.0, "1h"),
+        asyncio.run(weather.get_rain_forecast_async(5.0, 5.0, "1h")),
+        *_collect([(5.0, 5.0, "1h"), (6.0, 6.0, "1h"), (7.0, 7.0, "1h")]),
+    ]
+
+    assert len(calls) == 1
+    assert requested == ["6.0", "7.0"]
+    assert [result["condition"] for result in results] == ["rain"] * 5
+
+
+@pytest.mark.unit
+def test_forecasts_survive_shared_cache_failures(monkeypatch):
+    def broken(*args):
+        raise sqlite3.OperationalError("database is locked")
+
+    calls = []
+
+    def fake_get(url, params, timeout):
+        calls.append(params)
+        return _DummyResponse({"hourly": {"precipitation_probability": [90]}})
+
+    monkeypatch.setattr(weather.db, "load_forecasts", broken)
+    monkeypatch.setattr(weather.db, "store_forecasts", broken)
+    monkeypatch.setattr(weather.requests, "get", fake_get)
+
+    assert weather.get_rain_forecast(5.0, 5.0, "1h")["will_rain"] is True
+    assert weather.get_rain_forecast(5.0, 5.0, "3h")["will_rain"] is True
+    assert len(calls) == 1
+
+
+def _seed_stale(lat, lon, probability, expired_for):
+    """Cache a forecast for the cell that expired ``expired_for`` seconds ago."""
+    forecast = weather.HourlyForecast((probability,), (0.0,), 0)
+    now = time.time()
+    cell = weather._grid_cell(lat, lon)
+    weather._forecast_cache.set(cell, (forecast, now - expired_for), now + 1e6)
+
+
+def _wait_for_revalidation():
+    deadline = time.monotonic() + 5
+    while weather._revalidating and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+@pytest.mark.unit
+def test_stale_forecast_is_served_while_one_background_refresh_runs(monkeypatch):
+    calls = []
+    release = threading.Event()
+
+    def slow_get(url, params, timeout):
+        calls.append(params)
+        release.wait(5)
+        return _DummyResponse({"hourly": {"precipitation_probability": [90]}})
+
+    monkeypatch.setattr(weather.requests, "get", slow_get)
+    monkeypatch.setattr(weather, "pick_message", lambda condition: condition)
+    _seed_stale(5.0, 5.0, 0, expired_for=60)
+
+    conditions = [weather.get_rain_forecast(5.0, 5.0, "1h")["condition"] for _ in range(3)]
+    release.set()
+    _wait_for_revalidation()
+
+    assert conditions == ["no_rain"] * 3
+    assert len(calls) == 1
+    assert weather.get_rain_forecast(5.0, 5.0, "1h")["condition"] == "rain"
+
+
+@pytest.mark.unit
+def test_stale_forecast_async_refreshes_in_background(mock_upstream, monkeypatch):
+    requested = []
+    mock_upstream(_multi_location_handler(requested))
+    monkeypatch.setattr(weather, "pick_message", lambda condition: condition)
+    _seed_stale(5.0, 5.0, 0, expired_for=60)
+
+    async def run():
+        first = await weather.get_rain_forecast_async(5.0, 5.0, "1h")
+        await asyncio.gather(*weather._revalidation_tasks)
+        return first, await weather.get_rain_forecast_async(5.0, 5.0, "1h")
+
+    first, second = asyncio.run(run())
+
+    assert (first["condition"], second["condition"]) == ("no_rain", "rain")
+    assert requested == ["5.0"]
+
+
+@pytest.mark.unit
+def test_upstream_errors_fall_back_to_stale_forecast_up_to_hard_limit(mock_upstream, monkeypatch):
+    mock_upstream(lambda request: httpx.Response(503, json={}))
+    monkeypatch.setattr(weather, "pick_message", lambda condition: condition)
+    monkeypatch.setattr(weather, "FORECAST_STALE_SECONDS", 60.0)
+    monkeypatch.setattr(weather, "FORECAST_STALE_IF_ERROR_SECONDS", 3600.0)
+    _seed_stale(5.0, 5.0, 90, expired_for=600)
+    _seed_stale(6.0, 6.0, 90, expired_for=7200)
+
+    result = asyncio.run(weather.get_rain_forecast_async(5.0, 5.0, "1h"))
+    batch = {item["index"]: item for item in _collect([(5.0, 5.0, "1h"), (6.0, 6.0, "1h")])}
+
+    assert result["condition"] == "rain"
+    assert batch[0]["condition"] == "rain"
+    assert batch[1]["error"] == "Weather API error"
+    with pytest.raises(weather.WeatherServiceError):
+        asyncio.run(weather.get_rain_forecast_async(6.0, 6.0, "1h"))